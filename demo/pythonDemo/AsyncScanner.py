@@ -0,0 +1,217 @@
+#
+# File      AsyncScanner.py
+#
+# Brief     asyncio interface to the barcode scanner
+#
+# Details   The scan functions block for as long as decoding takes (up to seconds at high effort levels), so
+#           calling them from a coroutine stalls the whole event loop. AsyncScanner runs the scans on its own
+#           executor threads and lets coroutines await them:
+#
+#               scanner = AsyncScanner(maxInFlight=8, timeout=2.0)
+#               item = await scanner.scan(pixels)                   # NumPy image, or pixels, width, height
+#               print(item.resultLen, item.results)
+#
+#               async for item in scanner.scanStream(frames):       # (async) iterable of images
+#                   print(item.index, item.results, item.error)
+#
+#           Results are ScanPipeline.PipelineResult objects. Images may be grayscale NumPy arrays, (pixels,
+#           width, height) tuples or image file names (loaded on the executor threads).
+#
+#           In-flight requests (queued or scanning) are bounded by maxInFlight: further calls wait without
+#           blocking the event loop, so a burst of requests or one slow image cannot pile up unbounded work.
+#           A call that times out or is cancelled before its scan started is removed from the queue; a scan
+#           already running in the library cannot be interrupted, and keeps its in-flight slot until it
+#           finishes, so timeouts never let more scans run than the executor has threads.
+#
+#           As for ScanPipeline, the library must be configured before scanning and all the executor threads
+#           share its configuration. Use a single worker (the default) unless the library is known to be
+#           reentrant for your configuration, and always with scanners that change the configuration
+#           (EffortScheduler, BarcodeTracker, ...).
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+
+import time
+import asyncio
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+import BarcodeScanner as MWB
+import MWResult as MWR
+import ImageLoader
+from ScanPipeline import PipelineResult
+
+# Marker for "use the scanner's default timeout"
+_DEFAULT = object()
+
+class AsyncScanner:
+
+    # workers     - number of executor threads scanning
+    # maxInFlight - maximum requests queued or scanning at once (default 2 per worker)
+    # timeout     - default timeout (seconds) of a request, None for no limit
+    # loader      - function returning (pixels, width, height) for an image file name (default
+    #               ImageLoader.loadGrayscale)
+    # scanner     - function (pixels, width, height) -> (resultLen, scanResults) used to scan (default
+    #               MWB.MWBscanGrayscaleImage)
+    # lazy        - decode the results lazily (see MWResult.MWResults)
+    def __init__(self, workers = 1, maxInFlight = None, timeout = None, loader = None, scanner = None, lazy = False):
+        self.workers = workers
+        self.maxInFlight = maxInFlight or workers * 2
+        self.timeout = timeout
+        self.loader = loader or ImageLoader.loadGrayscale
+        self.scanner = scanner or MWB.MWBscanGrayscaleImage
+        self.lazy = lazy
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="AsyncScanner")
+
+        # Created on first use, in the running event loop
+        self.semaphore = None
+
+        # Statistics
+        self.scans = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, excType, exc, tb):
+        self.close()
+
+    # Stop the executor (queued scans are cancelled; a scan in progress finishes in the background)
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    # Scan an image on an executor thread (called there)
+    def _work(self, item, image, width, height):
+        starTime = time.perf_counter()
+        if isinstance(image, str):
+            pixels, width, height = self.loader(image)
+        elif isinstance(image, tuple):
+            pixels, width, height = image
+        elif width is None:
+            pixels = image
+            height, width = image.shape[0:2]
+        else:
+            pixels = image
+        loadedTime = time.perf_counter()
+        item.loadTime = (loadedTime - starTime) * 1000
+
+        resultLen, scanResults = self.scanner(pixels, width, height)
+        item.resultLen = resultLen
+        if resultLen > 0:
+            item.results = MWR.MWResults(scanResults, self.lazy)
+        item.scanTime = (time.perf_counter() - loadedTime) * 1000
+        return item
+
+    # Run a request, waiting for an in-flight slot first. Errors (including timeouts and cancellation)
+    # are raised.
+    async def _request(self, index, image, width, height, timeout):
+        if timeout is _DEFAULT:
+            timeout = self.timeout
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.maxInFlight)
+        loop = asyncio.get_running_loop()
+        semaphore = self.semaphore
+
+        # The timeout covers the wait for a slot and the scan
+        deadline = None if timeout is None else loop.time() + timeout
+
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+        try:
+            future = self.executor.submit(self._work, PipelineResult(index, image), image, width, height)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        # The slot is released when the work is done (or cancelled before it started), not when the caller
+        # stops waiting
+        def done(f):
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                pass            # the event loop was closed
+        future.add_done_callback(done)
+
+        try:
+            item = await asyncio.wait_for(asyncio.wrap_future(future),
+                                          None if deadline is None else max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            future.cancel()
+            self.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            future.cancel()
+            self.cancelled += 1
+            raise
+        self.scans += 1
+        return item
+
+    # Scan an image: a grayscale NumPy array, pixels with width and height, a (pixels, width, height) tuple or
+    # an image file name. Returns a PipelineResult; raises asyncio.TimeoutError when the request (waiting for a
+    # slot and scanning) does not finish within timeout seconds (default: the scanner's timeout).
+    async def scan(self, image, width = None, height = None, timeout = _DEFAULT):
+        return await self._request(0, image, width, height, timeout)
+
+    # Scan a stream of images (an iterable or async iterable), yielding a PipelineResult per image, in input
+    # order (or in completion order if ordered is False). Up to maxInFlight images are scanned ahead; errors and
+    # timeouts are reported in PipelineResult.error rather than raised. Closing the generator early cancels
+    # the requests in progress.
+    async def scanStream(self, frames, ordered = True, timeout = _DEFAULT):
+        pending = collections.deque()
+
+        async def request(index, image):
+            try:
+                return await self._request(index, image, None, None, timeout)
+            except Exception as e:
+                item = PipelineResult(index, image)
+                item.error = e
+                return item
+
+        async def frameSource():
+            if hasattr(frames, '__aiter__'):
+                async for frame in frames:
+                    yield frame
+            else:
+                for frame in frames:
+                    yield frame
+
+        try:
+            index = 0
+            async for frame in frameSource():
+                # Bounded look-ahead: wait for a result before requesting more
+                while len(pending) >= self.maxInFlight:
+                    if ordered:
+                        yield await pending.popleft()
+                    else:
+                        done, waiting = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            pending.remove(task)
+                            yield task.result()
+
+                pending.append(asyncio.ensure_future(request(index, frame)))
+                index += 1
+
+            while pending:
+                if ordered:
+                    yield await pending.popleft()
+                else:
+                    done, waiting = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        pending.remove(task)
+                        yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    # The statistics as printable text
+    def report(self):
+        return ("Async scanner: %d scans, %d timed out, %d cancelled (%d workers, %d in flight at most)" %
+                (self.scans, self.timeouts, self.cancelled, self.workers, self.maxInFlight))
@@ -298,6 +298,85 @@ MWBsetDuplicate.restype = None
 MWPgetSupportedParsers.argtypes = None
 MWPgetSupportedParsers.restype = ctypes.c_int
 
+#
+# Image buffers - the scan functions accept any object supporting the buffer protocol (bytes, bytearray,
+#                 memoryview, mmap, NumPy arrays, etc.) and pass its memory straight to the library, so
+#                 there is no need to make a bytes copy of the image first (e.g. with PIL's tobytes()).
+#                 The buffer must be C-contiguous and hold at least width * height bytes of 8-bit
+#                 grayscale pixels; strided views (e.g. a cropped NumPy array) have to be copied by the
+#                 caller first (numpy.ascontiguousarray()).
+#
+
+# Py_buffer, as filled in by PyObject_GetBuffer (see the Python C API buffer protocol)
+class _PyBuffer(ctypes.Structure):
+    _fields_ = [('buf', ctypes.c_void_p),
+                ('obj', ctypes.c_void_p),
+                ('len', ctypes.c_ssize_t),
+                ('itemsize', ctypes.c_ssize_t),
+                ('readonly', ctypes.c_int),
+                ('ndim', ctypes.c_int),
+                ('format', ctypes.c_char_p),
+                ('shape', ctypes.POINTER(ctypes.c_ssize_t)),
+                ('strides', ctypes.POINTER(ctypes.c_ssize_t)),
+                ('suboffsets', ctypes.POINTER(ctypes.c_ssize_t)),
+                ('internal', ctypes.c_void_p)]
+
+_PyObject_GetBuffer = ctypes.pythonapi.PyObject_GetBuffer
+_PyObject_GetBuffer.argtypes = [ctypes.py_object, ctypes.POINTER(_PyBuffer), ctypes.c_int]
+_PyObject_GetBuffer.restype = ctypes.c_int
+
+_PyBuffer_Release = ctypes.pythonapi.PyBuffer_Release
+_PyBuffer_Release.argtypes = [ctypes.POINTER(_PyBuffer)]
+_PyBuffer_Release.restype = None
+
+# PyBUF_SIMPLE: request a plain contiguous block of bytes (works for read-only buffers too)
+_PyBUF_SIMPLE = 0
+
+# ImageBuffer
+#
+# Context manager that exports the memory of an image buffer for the duration of a library call without
+# copying it. While the context is open the exporting object is locked (e.g. a bytearray can not be
+# resized), so the pointer handed to the library stays valid.
+#
+# Raises BufferError if the image is not C-contiguous or is smaller than width * height bytes.
+#
+class ImageBuffer:
+
+    def __init__(self, image, width, height):
+        self.image = image
+        self.size = width * height
+        self.view = None
+
+    def __enter__(self):
+        # bytes objects are passed to the library as-is
+        if isinstance(self.image, bytes):
+            if len(self.image) < self.size:
+                raise BufferError('image buffer holds ' + str(len(self.image)) + ' bytes, expected ' + str(self.size))
+            return self.image
+
+        # Check the layout up front so we can give a meaningful error for strided views
+        try:
+            with memoryview(self.image) as mv:
+                contiguous = mv.c_contiguous
+                nbytes = mv.nbytes
+        except TypeError:
+            raise TypeError('image must be bytes or support the buffer protocol, not ' + type(self.image).__name__)
+
+        if not contiguous:
+            raise BufferError('image buffer is not C-contiguous; copy it first (e.g. numpy.ascontiguousarray())')
+        if nbytes < self.size:
+            raise BufferError('image buffer holds ' + str(nbytes) + ' bytes, expected ' + str(self.size))
+
+        self.view = _PyBuffer()
+        _PyObject_GetBuffer(self.image, ctypes.byref(self.view), _PyBUF_SIMPLE)
+        return self.view.buf
+
+    def __exit__(self, *exc):
+        if self.view is not None:
+            _PyBuffer_Release(ctypes.byref(self.view))
+            self.view = None
+        return False
+
 if platform.system() == 'Windows':
     #
     # Windows - the output buffers from the MWBscanGrayscaleImage, MWBscanGrayscaleRegions, MWPgetFormattedText,
@@ -313,7 +392,7 @@ if platform.system() == 'Windows':
     # MWBscanGrayscaleImage
     #
     # Wrapper function to get the scan results in a ctypes string buffer, but also verify that we
-    # didn't overrun the buffer.
+    # didn't overrun the buffer. The image may be any C-contiguous buffer (see ImageBuffer).
     #
     # This function returns a tuple:
     #  resultLen  - Negative for an error, otherwise the # of bytes in scanResult
@@ -321,7 +400,7 @@ if platform.system() == 'Windows':
     #               input for MWResult, the class for decoding the scan results 
     #
     # int MWBscanGrayscaleImage(uint8_t*  pp_image,  int lenX,  int lenY, uint8_t *pp_data)
-    _MWBscanGrayscaleImage.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.c_char_p]
+    _MWBscanGrayscaleImage.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_char_p]
     _MWBscanGrayscaleImage.restype = ctypes.c_int
     
     def MWBscanGrayscaleImage(grayScale, width, height):
@@ -333,7 +412,8 @@ if platform.system() == 'Windows':
         scanResults = ctypes.create_string_buffer(100000)
 
         # Check the image for barcode(s)
-        resultLen = _MWBscanGrayscaleImage(grayScale, width, height, scanResults)
+        with ImageBuffer(grayScale, width, height) as image:
+            resultLen = _MWBscanGrayscaleImage(image, width, height, scanResults)
 
         # Check to make sure we didn't overrun our buffer; if we did we have no choice but to throw an exception
         if resultLen > ctypes.sizeof(scanResults):
@@ -345,7 +425,8 @@ if platform.system() == 'Windows':
     #
     # Wrapper function to get the scan results in a ctypes string buffer, but also verify that we
     # didn't overrun the buffer. We also need to convert a python float array to a byte array of
-    # the float values (to pass to the scanner library function).
+    # the float values (to pass to the scanner library function); regionsData may also be given as
+    # the packed bytes already.
     #
     # This function returns a tuple:
     #  resultLen  - Negative for an error, otherwise the # of bytes in scanResult
@@ -354,7 +435,7 @@ if platform.system() == 'Windows':
     #
     # int MWBscanGrayscaleRegions(uint8_t*  pp_image,  int lenX,  int lenY, float* regionsData, int numberOfRegions, int maxThreads, uint8_t *pp_data)
     #
-    _MWBscanGrayscaleRegions.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.c_char_p]
+    _MWBscanGrayscaleRegions.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.c_char_p]
     _MWBscanGrayscaleRegions.restype = ctypes.c_int
 
     def MWBscanGrayscaleRegions(pp_image,  lenX,  lenY, regionsData, regionCount, maxThreads):
@@ -364,11 +445,12 @@ if platform.system() == 'Windows':
         # 150 codes in a single pass, a very large buffer could be required). For this reason, we are using a large buffer here.
         scanResults = ctypes.create_string_buffer(100000)
 
-        # Convert the float array to a byte array
-        regions = struct.pack("f" * len(regionsData), *regionsData)
+        # Convert the float array to a byte array (unless already packed, see MWRegions.RegionSet)
+        regions = regionsData if isinstance(regionsData, bytes) else struct.pack("f" * len(regionsData), *regionsData)
 
         # Check the image for barcode(s)
-        resultLen = _MWBscanGrayscaleRegions(pp_image, lenX, lenY, regions, regionCount, maxThreads, scanResults)
+        with ImageBuffer(pp_image, lenX, lenY) as image:
+            resultLen = _MWBscanGrayscaleRegions(image, lenX, lenY, regions, regionCount, maxThreads, scanResults)
 
         # Check to make sure we didn't overrun our buffer; if we did we have no choice but to throw an exception
         if resultLen > ctypes.sizeof(scanResults):
@@ -438,17 +520,37 @@ else:
     #         for all four functions
     #
 
+    # _copyAndFree
+    #
+    # Copies the library allocated results to a ctypes string buffer with a single memmove (slicing the
+    # POINTER(c_ubyte) instead would build a list of ints one byte at a time), then frees the library's
+    # buffer. resultLen may be a double (parser functions); zero or negative lengths give an empty buffer.
+    #
+    def _copyAndFree(buffer, resultLen):
+        rLen = int(resultLen)
+        if rLen > 0:
+            result = ctypes.create_string_buffer(rLen)
+            ctypes.memmove(result, buffer, rLen)
+        else:
+            result = ctypes.create_string_buffer(0)
+
+        libc.free(buffer)
+
+        return result
+
+
     # MWBscanGrayscaleImage
     #
     # Wrapper function to manage the dynamically allocated return results: we copy the returned data
-    # to a ctypes string buffer, then free the memory allocated by the barcode scanner's library.
+    # to a ctypes string buffer, then free the memory allocated by the barcode scanner's library. The
+    # image may be any C-contiguous buffer (see ImageBuffer).
     #
     # This function returns a tuple:
     #  resultLen  - Negative for an error, otherwise the # of bytes in scanResult
     #  scanResult - A ctypes string buffer (bytes); we return a scanResult as this is the expected
     #               input for MWResult, the class for decoding the scan results 
     #
-    _MWBscanGrayscaleImage.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.POINTER(ctypes.c_ubyte))]
+    _MWBscanGrayscaleImage.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.POINTER(ctypes.c_ubyte))]
     _MWBscanGrayscaleImage.restype = ctypes.c_int
 
     def MWBscanGrayscaleImage(grayScale, width, height):
@@ -457,24 +559,19 @@ else:
         
         # The barcode scanning library dynamically allocates the buffer for the return results (the
         # buffer parameter is a uint8_t **). Note that we are responsible for freeing this memory
-        resultLen = _MWBscanGrayscaleImage(grayScale, width, height, buffer)
+        with ImageBuffer(grayScale, width, height) as image:
+            resultLen = _MWBscanGrayscaleImage(image, width, height, buffer)
 
-        if resultLen > 0:
-            # Copy the results to a ctypes string buffer
-            scanResult = ctypes.create_string_buffer(resultLen)
-            scanResult[0:resultLen] = buffer[0:resultLen]
-        else:
-            scanResult = ctypes.create_string_buffer(0)
-        
-        # Free the memory returned by _MWBscanGrayscaleImage()
-        libc.free(buffer)
+        # Copy the results to a ctypes string buffer and free the memory returned by _MWBscanGrayscaleImage()
+        scanResult = _copyAndFree(buffer, resultLen)
         
         return resultLen, scanResult
 
     # MWBscanGrayscaleRegions
     #
     # Wrapper function to get the scan results in a ctypes string buffer, but also verify that we
-    # didn't overrun the buffer.
+    # didn't overrun the buffer. regionsData is a python float array, or the packed bytes of the
+    # float values.
     #
     # This function returns a tuple:
     #  resultLen  - Negative for an error, otherwise the # of bytes in scanResult
@@ -483,29 +580,23 @@ else:
     #
     # int MWBscanGrayscaleRegions(uint8_t*  pp_image,  int lenX,  int lenY, float* regionsData, int numberOfRegions, int maxThreads, uint8_t *pp_data)
     #
-    _MWBscanGrayscaleRegions.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.POINTER(ctypes.c_ubyte))]
+    _MWBscanGrayscaleRegions.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.POINTER(ctypes.c_ubyte))]
     _MWBscanGrayscaleRegions.restype = ctypes.c_int
 
     def MWBscanGrayscaleRegions(pp_image,  lenX,  lenY, regionsData, regionCount, maxThreads):
 
         buffer = ctypes.POINTER(ctypes.c_ubyte)()
         
-        # Convert the float array to a byte array
-        regions = struct.pack("f" * len(regionsData), *regionsData)
+        # Convert the float array to a byte array (unless already packed, see MWRegions.RegionSet)
+        regions = regionsData if isinstance(regionsData, bytes) else struct.pack("f" * len(regionsData), *regionsData)
 
         # The barcode scanning library dynamically allocates the buffer for the return results (the
         # buffer parameter is a uint8_t **). Note that we are responsible for freeing this memory
-        resultLen = _MWBscanGrayscaleRegions(pp_image, lenX, lenY, regions, regionCount, maxThreads, buffer)
+        with ImageBuffer(pp_image, lenX, lenY) as image:
+            resultLen = _MWBscanGrayscaleRegions(image, lenX, lenY, regions, regionCount, maxThreads, buffer)
 
-        if resultLen > 0:
-            # Copy the results to a ctypes string buffer
-            scanResult = ctypes.create_string_buffer(resultLen)
-            scanResult[0:resultLen] = buffer[0:resultLen]
-        else:
-            scanResult = ctypes.create_string_buffer(0)
-        
-        # Free the memory returned by _MWBscanGrayscaleRegions()
-        libc.free(buffer)
+        # Copy the results to a ctypes string buffer and free the memory returned by _MWBscanGrayscaleRegions()
+        scanResult = _copyAndFree(buffer, resultLen)
         
         return resultLen, scanResult
 
@@ -531,16 +622,8 @@ else:
         # buffer parameter is a uint8_t **). Note that we are responsible for freeing this memory
         resultLen = _MWPgetFormattedText(parserMask, parserInput, parserInputLen, buffer)
 
-        if resultLen > 0:
-            # Copy the results to a ctypes string buffer
-            rLen = int(resultLen)
-            parserResult = ctypes.create_string_buffer(rLen)
-            parserResult[0:rLen] = buffer[0:rLen]
-        else:
-            parserResult = ctypes.create_string_buffer(0)
-        
-        # Free the memory returned by _MWPgetFormattedText()
-        libc.free(buffer)
+        # Copy the results to a ctypes string buffer and free the memory returned by _MWPgetFormattedText()
+        parserResult = _copyAndFree(buffer, resultLen)
         
         return resultLen, parserResult
 
@@ -566,16 +649,8 @@ else:
         # buffer parameter is a uint8_t **). Note that we are responsible for freeing this memory
         resultLen = _MWPgetJSON(parserMask, parserInput, parserInputLen, buffer)
 
-        if resultLen > 0:
-            # Copy the results to a ctypes string buffer
-            rLen = int(resultLen)
-            parserResult = ctypes.create_string_buffer(rLen)
-            parserResult[0:rLen] = buffer[0:rLen]
-        else:
-            parserResult = ctypes.create_string_buffer(0)
-        
-        # Free the memory returned by _MWPgetJSON()
-        libc.free(buffer)
+        # Copy the results to a ctypes string buffer and free the memory returned by _MWPgetJSON()
+        parserResult = _copyAndFree(buffer, resultLen)
         
         return resultLen, parserResult
 
@@ -601,15 +676,8 @@ def MWBcreateRegionsFromTiles(tilesX, tilesY, overlap):
     # Create the regions (based on number of X & Y tiles)
     regionCount = _MWBcreateRegionsFromTiles(tilesX, tilesY, overlap, regionBuffer)
     
-    # Convert to a tuple
-    regions = struct.unpack("f" * nbrOfFloats, regionBuffer.raw)
-    
-    # Now copy to our flaot array
-    regionData = [0.0] * nbrOfFloats 
-    i = 0
-    for x in regions:
-        regionData[i] = x
-        i += 1
+    # Convert to our float array
+    regionData = list(struct.unpack("f" * nbrOfFloats, regionBuffer.raw))
 
     return regionCount, regionData
 
@@ -0,0 +1,241 @@
+#
+# File      BarcodeTracker.py
+#
+# Brief     Frame-to-frame barcode tracking for live decoding
+#
+# Details   A barcode that stays in view moves little from one frame to the next, yet a full-frame decode
+#           searches the whole image for it again on every frame. BarcodeTracker remembers the barcodes of
+#           recent frames and their locations. Once a barcode has been seen on a few consecutive frames
+#           (minHits), the next frames are first scanned only in a window around where it was, with a
+#           scanning rectangle (MWBsetScanningRect) or regions (MWBscanGrayscaleRegions). The full-frame
+#           decode is skipped as long as every tracked barcode is found in its window; when one is not, or
+#           every probeInterval frames (to pick up barcodes entering the view), the frame is scanned in full:
+#
+#               tracker = BarcodeTracker()
+#               resultLen, scanResults = tracker.scan(pixels, width, height)
+#               ...
+#               for result in tracker.newResults(results):      # not seen in the last 2 seconds
+#                   print(result.text)
+#               ...
+#               print(tracker.report())
+#               tracker.close()                                 # restores the duplicates timeout
+#
+#           or, as a context manager, with BarcodeTracker() as tracker: ...
+#
+#           Output suppression: newResults() returns only the barcodes that were not already seen within the
+#           last duplicatesTimeout seconds, like the decoder's own MWBsetDuplicatesTimeout: a barcode that
+#           stays in view is reported once, and again only after it was out of view for a while. The
+#           decoder's filter cannot be used while tracking, since it drops the repeated barcodes from the
+#           results, and their locations with them: the tracker sets the timeout to 0 and filters itself, and
+#           close() sets it back to the timeout applied with DecoderConfig before (trackers created one
+#           after the other must be closed in the reverse order).
+#
+#           The scanning rectangles are global state of the library, which the tracker sets and resets to
+#           the full image (0, 0, 100, 100) for the active symbologies: it must not be shared by threads
+#           scanning at the same time, and replaces any scanning rectangles configured before.
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+
+import time
+
+import BarcodeScanner as MWB
+import MWResult as MWR
+import MWRegions
+from DecoderConfig import appliedSetting, applySettings
+
+_FULL_RECT = (0.0, 0.0, 100.0, 100.0)
+
+# A barcode followed from frame to frame
+class Track:
+
+    __slots__ = ('key', 'rect', 'hits', 'misses')
+
+    def __init__(self, key, rect):
+        self.key = key
+        self.rect = rect
+        self.hits = 1
+        self.misses = 0
+
+# Identity of a result (barcodes with the same type and contents are the same barcode)
+def _resultKey(result):
+    data = result.rawBytes if result.rawBytes is not None else result.text
+    return result.barcodeType, bytes(data) if data is not None else None
+
+# Bounding box of a result's location as (left, top, width, height) percentages, or None
+def _resultRect(result, width, height):
+    location = result.locationPoints
+    if location is None or width <= 0 or height <= 0:
+        return None
+    xs = location.coordinates[0::2]
+    ys = location.coordinates[1::2]
+    left = min(xs) * 100.0 / width
+    top = min(ys) * 100.0 / height
+    return left, top, max(xs) * 100.0 / width - left, max(ys) * 100.0 / height - top
+
+class BarcodeTracker:
+
+    # margin            - window around a tracked barcode, in percent of its size on each side
+    # minHits           - consecutive frames a barcode must be found on before it is tracked
+    # maxMisses         - frames a barcode may be missing before it is forgotten
+    # probeInterval     - scan the full frame at least every this many frames (new barcodes)
+    # duplicatesTimeout - seconds a barcode must have been out of view to be reported again (newResults)
+    # useRegions        - scan the windows as regions (MWBscanGrayscaleRegions, maxThreads threads) instead
+    #                     of a single scanning rectangle around all of them
+    # scanner           - function (pixels, width, height) -> (resultLen, scanResults) for the full-frame
+    #                     scans, e.g. a RegionSet's scan (default MWB.MWBscanGrayscaleImage)
+    def __init__(self, margin = 50.0, minHits = 2, maxMisses = 2, probeInterval = 30, duplicatesTimeout = 2.0,
+                 useRegions = False, maxThreads = 1, scanner = None):
+        self.margin = margin
+        self.minHits = minHits
+        self.maxMisses = maxMisses
+        self.probeInterval = probeInterval
+        self.duplicatesTimeout = duplicatesTimeout
+        self.useRegions = useRegions
+        self.maxThreads = maxThreads
+        self.scanner = scanner or MWB.MWBscanGrayscaleImage
+
+        self.tracks = {}
+        self.reported = {}
+        self.sinceFullScan = 0
+
+        # The decoder's duplicates timeout is restored by close()
+        self.previousDuplicatesTimeout = appliedSetting('duplicatesTimeout')
+        applySettings(duplicatesTimeout=0)
+
+        # Statistics
+        self.frames = 0
+        self.trackedFrames = 0
+        self.windowMisses = 0
+        self.fullScans = 0
+
+    # Restore the duplicates timeout applied before the tracker was created (if it was applied with DecoderConfig)
+    def close(self):
+        if self.previousDuplicatesTimeout is not None:
+            applySettings(duplicatesTimeout=self.previousDuplicatesTimeout)
+            self.previousDuplicatesTimeout = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    # Fraction of the frames served by tracking (without a full-frame scan)
+    def trackedFraction(self):
+        return self.trackedFrames / self.frames if self.frames else 0.0
+
+    # The window around a tracked barcode, as (left, top, width, height) percentages
+    def _window(self, rect):
+        left, top, width, height = rect
+        marginX = width * self.margin / 100.0
+        marginY = height * self.margin / 100.0
+        left = max(0.0, left - marginX)
+        top = max(0.0, top - marginY)
+        right = min(100.0, rect[0] + width + marginX)
+        bottom = min(100.0, rect[1] + height + marginY)
+        return left, top, right - left, bottom - top
+
+    def _setScanningRect(self, rect):
+        activeCodes = MWB.MWBgetActiveCodes()
+        applySettings(scanningRect={1 << bit: rect for bit in range(24) if activeCodes & (1 << bit)})
+
+    # Scan only the windows around the tracked barcodes
+    def _scanWindows(self, pixels, width, height, tracks):
+        windows = [self._window(track.rect) for track in tracks]
+        if self.useRegions:
+            regionSet = MWRegions.RegionSet([value for window in windows for value in window])
+            return regionSet.scan(pixels, width, height, self.maxThreads)
+
+        left = min(w[0] for w in windows)
+        top = min(w[1] for w in windows)
+        right = max(w[0] + w[2] for w in windows)
+        bottom = max(w[1] + w[3] for w in windows)
+        self._setScanningRect((left, top, right - left, bottom - top))
+        try:
+            return MWB.MWBscanGrayscaleImage(pixels, width, height)
+        finally:
+            self._setScanningRect(_FULL_RECT)
+
+    # Update the tracks with the results of a scan. Returns the keys found.
+    def _update(self, resultLen, scanResults, width, height):
+        found = set()
+        if resultLen > 0:
+            for result in MWR.MWResults(scanResults, lazy=True).results:
+                rect = _resultRect(result, width, height)
+                if rect is None:
+                    continue
+                key = _resultKey(result)
+                found.add(key)
+                track = self.tracks.get(key)
+                if track is None:
+                    self.tracks[key] = Track(key, rect)
+                else:
+                    track.rect = rect
+                    track.hits += 1
+                    track.misses = 0
+        return found
+
+    # The keys of the located results of a scan, without updating the tracks
+    def _resultKeys(self, resultLen, scanResults):
+        if resultLen <= 0:
+            return set()
+        return {_resultKey(result) for result in MWR.MWResults(scanResults, lazy=True).results
+                if result.locationPoints is not None}
+
+    def _forgetMissing(self, found):
+        for key in list(self.tracks):
+            if key not in found:
+                track = self.tracks[key]
+                track.hits = 0
+                track.misses += 1
+                if track.misses > self.maxMisses:
+                    del self.tracks[key]
+
+    # Scan a frame, around the tracked barcodes if possible. Returns (resultLen, scanResults) as
+    # MWB.MWBscanGrayscaleImage.
+    def scan(self, pixels, width, height):
+        self.frames += 1
+        self.sinceFullScan += 1
+
+        # The window results update the tracks only if every tracked barcode was found; otherwise the full
+        # scan below finds them again, and they must be counted once per frame
+        tracked = [track for track in self.tracks.values() if track.hits >= self.minHits]
+        if tracked and self.sinceFullScan < self.probeInterval:
+            resultLen, scanResults = self._scanWindows(pixels, width, height, tracked)
+            keys = self._resultKeys(resultLen, scanResults)
+            if all(track.key in keys for track in tracked):
+                self.trackedFrames += 1
+                self._forgetMissing(self._update(resultLen, scanResults, width, height))
+                return resultLen, scanResults
+            self.windowMisses += 1
+
+        self.fullScans += 1
+        self.sinceFullScan = 0
+        resultLen, scanResults = self.scanner(pixels, width, height)
+        self._forgetMissing(self._update(resultLen, scanResults, width, height))
+        return resultLen, scanResults
+
+    # The results (a MWR.MWResults or list of results) that were not seen within the last
+    # duplicatesTimeout seconds
+    def newResults(self, results):
+        if hasattr(results, 'results'):
+            results = results.results
+
+        now = time.monotonic()
+        for key in [key for key, reported in self.reported.items() if now - reported > self.duplicatesTimeout]:
+            del self.reported[key]
+
+        fresh = []
+        for result in results:
+            key = _resultKey(result)
+            if key not in self.reported:
+                fresh.append(result)
+            self.reported[key] = now
+        return fresh
+
+    # The statistics as printable text
+    def report(self):
+        return ("Tracking: %d of %d frames (%.1f%%) served by tracking, %d window misses, %d full-frame scans, %d barcode(s) tracked" %
+                (self.trackedFrames, self.frames, 100.0 * self.trackedFraction(), self.windowMisses, self.fullScans,
+                 len(self.tracks)))
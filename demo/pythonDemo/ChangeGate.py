@@ -0,0 +1,102 @@
+#
+# File      ChangeGate.py
+#
+# Brief     Skip decoding live frames that did not change
+#
+# Details   When the line is idle the camera keeps delivering the same scene, and decoding every frame at
+#           full effort only finds the same barcodes (or none) again. ChangeGate computes a cheap signature
+#           of each frame, the mean gray level of each cell of a coarse grid, measured on a subsampled view
+#           of the image (NumPy-vectorized, a fraction of a millisecond per frame). A frame is decoded only
+#           when some cell changed by more than the threshold since the last decoded frame; otherwise the
+#           result of that frame is returned again, without scanning:
+#
+#               gate = ChangeGate(threshold=8)
+#               resultLen, scanResults = gate.scan(pixels, width, height)
+#               ...
+#               print(gate.report())
+#
+#           Comparing with the last decoded frame, rather than the previous one, keeps slow changes (an
+#           object creeping into view, exposure drift) from slipping through in small steps.
+#
+#           Requires NumPy.
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+
+import numpy as np
+
+import BarcodeScanner as MWB
+
+class ChangeGate:
+
+    # threshold  - change of a cell's mean gray level (0-255) that counts as a change: lower is more
+    #              sensitive
+    # minChanged - number of cells that must change for the frame to be decoded
+    # cells      - grid resolution (cells x cells over the image)
+    # maxSize    - the image is subsampled to at most this many pixels wide/high before measuring
+    # maxSkip    - decode at least every this many frames, changed or not (None for no limit)
+    # scanner    - function (pixels, width, height) -> (resultLen, scanResults) used to decode, e.g. a
+    #              BarcodeTracker's scan (default MWB.MWBscanGrayscaleImage)
+    def __init__(self, threshold = 8.0, minChanged = 1, cells = 32, maxSize = 256, maxSkip = None, scanner = None):
+        self.threshold = threshold
+        self.minChanged = minChanged
+        self.cells = cells
+        self.maxSize = maxSize
+        self.maxSkip = maxSkip
+        self.scanner = scanner or MWB.MWBscanGrayscaleImage
+
+        # Signature and result of the last decoded frame
+        self.signature = None
+        self.lastResult = None
+        self.sinceDecode = 0
+
+        # Statistics
+        self.frames = 0
+        self.skipped = 0
+
+    # Mean gray level per cell, as a (cells x cells) float32 array
+    def frameSignature(self, pixels, width, height):
+        image = np.frombuffer(pixels, dtype=np.uint8, count=width * height).reshape(height, width)
+
+        # Subsample (strided view, no copy) to bound the work for large images
+        step = max(1, -(-max(width, height) // self.maxSize))
+        image = image[::step, ::step]
+
+        rows = np.linspace(0, image.shape[0], self.cells + 1).astype(np.intp)
+        columns = np.linspace(0, image.shape[1], self.cells + 1).astype(np.intp)
+        sums = np.add.reduceat(np.add.reduceat(image, rows[:-1], axis=0, dtype=np.int64), columns[:-1], axis=1)
+        counts = np.outer(np.diff(rows), np.diff(columns))
+        return (sums / np.maximum(counts, 1)).astype(np.float32)
+
+    # Number of cells that changed between two signatures
+    def changedCells(self, signature, reference):
+        if reference is None or signature.shape != reference.shape:
+            return signature.size
+        return int(np.count_nonzero(np.abs(signature - reference) > self.threshold))
+
+    # Scan a frame if it changed since the last decoded frame, or return the result of that frame again.
+    # Returns (resultLen, scanResults) as MWB.MWBscanGrayscaleImage.
+    def scan(self, pixels, width, height):
+        self.frames += 1
+        signature = self.frameSignature(pixels, width, height)
+
+        if self.lastResult is not None and (self.maxSkip is None or self.sinceDecode < self.maxSkip) and \
+           self.changedCells(signature, self.signature) < self.minChanged:
+            self.skipped += 1
+            self.sinceDecode += 1
+            return self.lastResult
+
+        self.lastResult = self.scanner(pixels, width, height)
+        self.signature = signature
+        self.sinceDecode = 0
+        return self.lastResult
+
+    # Forget the last decoded frame, so that the next frame is decoded
+    def reset(self):
+        self.signature = None
+        self.lastResult = None
+
+    # The statistics as printable text
+    def report(self):
+        return ("Change gate: %d of %d frames (%.1f%%) skipped as unchanged" %
+                (self.skipped, self.frames, 100.0 * self.skipped / self.frames if self.frames else 0.0))
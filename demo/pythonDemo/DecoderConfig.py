@@ -0,0 +1,300 @@
+#
+# File      DecoderConfig.py
+#
+# Brief     Declarative decoder configuration, applied to the barcode scanner library in one call
+#
+# Details   Instead of a sequence of MWBsetActiveCodes, MWBsetDirection, MWBsetLevel, ... calls, a DecoderConfig
+#           holds all the settings and applies them with apply(). The library's configuration is global, so
+#           apply() remembers what was last applied in this process and only calls the library for the
+#           settings that differ: switching between a few configurations (e.g. one per production line)
+#           costs only the delta. Settings a previous configuration changed that a configuration does not
+#           mention are restored to the library's value from before they were changed, as far as the library
+#           can read them back (all but the level, code priorities, minimum lengths and duplicates timeout:
+#           give each configuration those it needs).
+#
+#           Configurations can be built from keyword arguments or a dict (the keys of configureScanner in
+#           ScannerPool.py), or loaded from a JSON or TOML file, in which masks and parameter values may be
+#           given by name (without the MWB_CODE_MASK_, MWB_SUBC_MASK_, MWB_SCANDIRECTION_, MWB_CFG_,
+#           MWB_PAR_ID_, MWB_PAR_VALUE_ or MWB_RESULT_TYPE_ prefix) and combined with '|':
+#
+#               {
+#                   "activeCodes": "DM|QR|128",
+#                   "activeSubcodes": {"QR": "QR_STANDARD"},
+#                   "direction": "HORIZONTAL|VERTICAL",
+#                   "level": 2,
+#                   "flags": {"0": "GLOBAL_ENABLE_MULTI"},
+#                   "params": [["128", "SAFE_ZONE_SCALE", 100]],
+#                   "scanningRect": {"DM": [0, 25, 100, 50]}
+#               }
+#
+#           DecoderConfig objects are plain data: they compare by value and pickle cheaply, so worker
+#           processes can be initialized with them (see ScannerPool.py).
+#
+#           Calling the MWBset* functions directly bypasses the record of the applied configuration. Code
+#           that changes settings while scanning (EffortScheduler, BarcodeTracker, ...) uses applySettings()
+#           instead; otherwise call forgetApplied() afterwards, or apply(force=True).
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+
+import json
+import ctypes
+from os import path
+
+import BarcodeScanner as MWB
+
+# Settings in the order they are applied (active codes before subcodes and priorities, etc.), with the
+# name prefixes of their values and whether they are a mapping of code mask -> value
+_SETTINGS = (
+    ('registrationKey', None, False),
+    ('activeCodes', 'MWB_CODE_MASK_', False),
+    ('activeSubcodes', 'MWB_SUBC_MASK_', True),
+    ('codePriority', None, True),
+    ('direction', 'MWB_SCANDIRECTION_', False),
+    ('level', None, False),
+    ('flags', 'MWB_CFG_', True),
+    ('params', 'MWB_PAR_VALUE_', True),
+    ('minLength', None, True),
+    ('scanningRect', None, True),
+    ('resultType', 'MWB_RESULT_TYPE_', False),
+    ('duplicatesTimeout', None, False),
+)
+
+_SETTING_NAMES = tuple(name for name, prefix, mapping in _SETTINGS)
+
+# Settings last applied to the library in this process, by (name, code mask or None), and the last
+# MWBregisterSDK status
+_applied = {}
+_registerStatus = MWB.MWB_RTREG_OK
+
+# Library values of the settings from before a configuration first changed them, for those that can be
+# read back (restored when a configuration does not mention them)
+_original = {}
+
+# Forget what was applied, so that the next apply() sets everything again
+def forgetApplied():
+    _applied.clear()
+
+# The value of a setting (for a code mask, or (code mask, parameter id) for params) as last applied in this
+# process, None if unknown
+def appliedSetting(name, key = None):
+    return _applied.get((name, key))
+
+# Apply some settings (e.g. only the level) without restoring the others, keeping the record of the applied
+# configuration up to date
+def applySettings(**settings):
+    return DecoderConfig(resultType=None, **settings).apply(partial=True)
+
+# Read a setting back from the library; None if it cannot be read
+def _read(name, key):
+    if name == 'activeCodes':
+        return MWB.MWBgetActiveCodes()
+    if name == 'direction':
+        return MWB.MWBgetDirection()
+    if name == 'resultType':
+        return MWB.MWBgetResultType()
+    if name == 'activeSubcodes':
+        value = MWB.MWBgetActiveSubcodes(key)
+    elif name == 'flags':
+        value = MWB.MWBgetFlags(key)
+    elif name == 'params':
+        value = MWB.MWBgetParam(key[0], key[1])
+    elif name == 'scanningRect':
+        rect = [ctypes.c_float() for i in range(4)]
+        if MWB.MWBgetScanningRect(key, *[ctypes.byref(value) for value in rect]) != MWB.MWB_RT_OK:
+            return None
+        return tuple(value.value for value in rect)
+    else:
+        return None
+
+    # The getters return a (negative) error for symbologies without the setting
+    return value if value >= 0 else None
+
+# Write a setting to the library
+def _write(name, key, value):
+    global _registerStatus
+
+    if name == 'registrationKey':
+        _registerStatus = MWB.MWBregisterSDK(value)
+    elif name == 'activeCodes':
+        MWB.MWBsetActiveCodes(value)
+    elif name == 'direction':
+        MWB.MWBsetDirection(value)
+    elif name == 'level':
+        MWB.MWBsetLevel(value)
+    elif name == 'resultType':
+        MWB.MWBsetResultType(value)
+    elif name == 'duplicatesTimeout':
+        MWB.MWBsetDuplicatesTimeout(value)
+    elif name == 'activeSubcodes':
+        MWB.MWBsetActiveSubcodes(key, value)
+    elif name == 'codePriority':
+        MWB.MWBsetCodePriority(key, value)
+    elif name == 'flags':
+        MWB.MWBsetFlags(key, value)
+    elif name == 'params':
+        MWB.MWBsetParam(key[0], key[1], value)
+    elif name == 'minLength':
+        MWB.MWBsetMinLength(key, value)
+    elif name == 'scanningRect':
+        MWB.MWBsetScanningRect(key, *value)
+    _applied[(name, key)] = value
+
+# Resolve a mask or value given by name(s), e.g. "DM|QR" with prefix MWB_CODE_MASK_, to its number. Names
+# are looked up first, since some are numbers themselves ("128" is MWB_CODE_MASK_128, not 128).
+def _resolve(value, prefix):
+    if not isinstance(value, str):
+        return value
+
+    result = 0
+    for part in value.split('|'):
+        part = part.strip()
+        name = part if part.upper().startswith('MWB_') or prefix is None else prefix + part
+        number = getattr(MWB, name.upper(), None)
+        if not isinstance(number, int):
+            try:
+                number = int(part, 0)
+            except ValueError:
+                raise ValueError("unknown setting value '%s'" % part)
+        result |= number
+    return result
+
+class DecoderConfig:
+
+    # Settings as keyword arguments (see configureScanner in ScannerPool.py for the names); params may be
+    # a list of (codeMask, paramId, paramValue) or a dict {(codeMask, paramId): paramValue}. resultType
+    # defaults to MWB_RESULT_TYPE_MW.
+    def __init__(self, **settings):
+        self.settings = {'resultType': MWB.MWB_RESULT_TYPE_MW}
+        for name, value in settings.items():
+            self._set(name, value)
+
+    def _set(self, name, value):
+        for settingName, prefix, mapping in _SETTINGS:
+            if settingName == name:
+                break
+        else:
+            raise ValueError("unknown decoder setting '%s'" % name)
+
+        if value is None:
+            self.settings.pop(name, None)
+        elif name == 'registrationKey':
+            self.settings[name] = value.encode() if isinstance(value, str) else bytes(value)
+        elif name == 'params':
+            items = value.items() if isinstance(value, dict) else (((m, i), v) for m, i, v in value)
+            self.settings[name] = {(_resolve(m, 'MWB_CODE_MASK_'), _resolve(i, 'MWB_PAR_ID_')): _resolve(v, prefix)
+                                   for (m, i), v in items}
+        elif mapping:
+            converted = {}
+            for codeMask, setting in value.items():
+                codeMask = _resolve(codeMask, 'MWB_CODE_MASK_')
+                converted[codeMask] = tuple(setting) if name == 'scanningRect' else _resolve(setting, prefix)
+            self.settings[name] = converted
+        else:
+            self.settings[name] = _resolve(value, prefix)
+
+    # Build a configuration from a dict of settings
+    @classmethod
+    def fromDict(cls, settings):
+        return cls(**settings)
+
+    # Load a configuration from a JSON or TOML file (TOML requires Python 3.11, or the tomli package)
+    @classmethod
+    def load(cls, fileName):
+        if path.splitext(fileName)[1].lower() == '.toml':
+            try:
+                import tomllib
+            except ImportError:
+                import tomli as tomllib
+            with open(fileName, 'rb') as f:
+                return cls.fromDict(tomllib.load(f))
+
+        with open(fileName, 'r') as f:
+            return cls.fromDict(json.load(f))
+
+    # Capture the library's current configuration, as far as it can be read back: active codes and
+    # subcodes, direction, result type, and the flags and scanning rectangles of the active codes
+    @classmethod
+    def fromLibrary(cls):
+        activeCodes = MWB.MWBgetActiveCodes()
+        codeMasks = [1 << bit for bit in range(24) if activeCodes & (1 << bit)]
+
+        config = cls(activeCodes=activeCodes, direction=MWB.MWBgetDirection(), resultType=MWB.MWBgetResultType())
+
+        # The getters return a (negative) error for symbologies without subcodes or flags
+        subcodes = {codeMask: MWB.MWBgetActiveSubcodes(codeMask) for codeMask in codeMasks}
+        config.settings['activeSubcodes'] = {codeMask: value for codeMask, value in subcodes.items() if value >= 0}
+        flags = {codeMask: MWB.MWBgetFlags(codeMask) for codeMask in [0] + codeMasks}
+        config.settings['flags'] = {codeMask: value for codeMask, value in flags.items() if value >= 0}
+
+        rects = {}
+        for codeMask in codeMasks:
+            rect = [ctypes.c_float() for i in range(4)]
+            if MWB.MWBgetScanningRect(codeMask, *[ctypes.byref(value) for value in rect]) == MWB.MWB_RT_OK:
+                rects[codeMask] = tuple(value.value for value in rect)
+        config.settings['scanningRect'] = rects
+        return config
+
+    # The settings as a dict (the form accepted by fromDict)
+    def toDict(self):
+        settings = {}
+        for name, value in self.settings.items():
+            if name == 'params':
+                settings[name] = [(codeMask, paramId, paramValue) for (codeMask, paramId), paramValue in value.items()]
+            else:
+                settings[name] = dict(value) if isinstance(value, dict) else value
+        return settings
+
+    # A copy of this configuration with some settings changed (None removes a setting)
+    def copy(self, **changes):
+        config = DecoderConfig.__new__(DecoderConfig)
+        config.settings = {name: dict(value) if isinstance(value, dict) else value for name, value in self.settings.items()}
+        for name, value in changes.items():
+            config._set(name, value)
+        return config
+
+    def __getitem__(self, name):
+        return self.settings[name]
+
+    def get(self, name, default = None):
+        return self.settings.get(name, default)
+
+    def __contains__(self, name):
+        return name in self.settings
+
+    def __eq__(self, other):
+        return isinstance(other, DecoderConfig) and self.settings == other.settings
+
+    def __repr__(self):
+        return 'DecoderConfig(%s)' % ', '.join('%s=%r' % item for item in self.settings.items())
+
+    # Apply the configuration to the library, calling it only for the settings that differ from those
+    # last applied in this process (all of them with force). Settings changed by a previous configuration
+    # and not mentioned by this one are restored (see above), unless partial is set. Returns the
+    # MWBregisterSDK status (MWB_RTREG_OK when no key is given).
+    def apply(self, force = False, partial = False):
+        if force:
+            forgetApplied()
+
+        for name in _SETTING_NAMES:
+            value = self.settings.get(name)
+            items = value.items() if isinstance(value, dict) else [] if value is None else [(None, value)]
+
+            for key, setting in items:
+                if _applied.get((name, key), _applied) == setting:
+                    continue
+                if (name, key) not in _original and name != 'registrationKey':
+                    _original[(name, key)] = _read(name, key)
+                _write(name, key, setting)
+
+            if partial:
+                continue
+            for (originalName, key), original in _original.items():
+                if originalName != name or original is None:
+                    continue
+                if (key is None and value is not None) or (isinstance(value, dict) and key in value):
+                    continue
+                if _applied.get((name, key), _applied) != original:
+                    _write(name, key, original)
+
+        return _registerStatus if 'registrationKey' in self.settings else MWB.MWB_RTREG_OK
@@ -0,0 +1,102 @@
+#
+# File      EffortScheduler.py
+#
+# Brief     Effort level escalation: scan at a low level first, and harder only when needed
+#
+# Details   Higher effort levels (MWBsetLevel) find more of the difficult codes, but cost more on every image,
+#           including the easy majority. EffortScheduler scans each image at the lowest level first and
+#           rescans the same buffer at the next level only when nothing was found, up to the highest level
+#           or until the image's time budget runs out. Easy images cost about as much as a level 1 scan,
+#           while difficult ones still get the highest level.
+#
+#           The scheduler keeps statistics on the level each success came from, and the time spent per
+#           level, to help choose the levels and budget:
+#
+#               scheduler = EffortScheduler(minLevel=1, maxLevel=5, budget=200)
+#               resultLen, scanResults = scheduler.scan(pixels, width, height)
+#               ...
+#               print(scheduler.report())
+#
+#           The effort level is global state of the library: the scheduler must not be shared by threads
+#           scanning at the same time. The level configured with DecoderConfig is restored after each image.
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+
+import time
+
+import BarcodeScanner as MWB
+from DecoderConfig import applySettings, appliedSetting
+
+class EffortScheduler:
+
+    # minLevel, maxLevel - effort levels to escalate through (1-5)
+    # budget             - time budget per image (ms); None for no limit. A level is not started when its
+    #                      average scan time (so far) would exceed what is left of the budget.
+    # scanner            - function (pixels, width, height) -> (resultLen, scanResults) used to scan, e.g.
+    #                      a RegionSet's scan (default MWB.MWBscanGrayscaleImage)
+    def __init__(self, minLevel = 1, maxLevel = 5, budget = None, scanner = None):
+        if not 1 <= minLevel <= maxLevel <= 5:
+            raise ValueError("effort levels must satisfy 1 <= minLevel <= maxLevel <= 5")
+        self.minLevel = minLevel
+        self.maxLevel = maxLevel
+        self.budget = budget
+        self.scanner = scanner or MWB.MWBscanGrayscaleImage
+
+        # Level the last image was decoded at (None if it was not decoded)
+        self.lastLevel = None
+
+        # Statistics, indexed by level
+        self.images = 0
+        self.attempts = [0] * 6
+        self.successes = [0] * 6
+        self.scanTime = [0.0] * 6
+        self.budgetStops = 0
+
+    # Average time (ms) of a scan at level
+    def averageTime(self, level):
+        return self.scanTime[level] / self.attempts[level] if self.attempts[level] else 0.0
+
+    # Scan an image, escalating the effort level until something is found. Returns (resultLen,
+    # scanResults) of the last scan, as MWB.MWBscanGrayscaleImage.
+    def scan(self, pixels, width, height):
+        self.images += 1
+        self.lastLevel = None
+        starTime = time.perf_counter()
+
+        # The configured level is restored afterwards, for the scans made without the scheduler
+        configuredLevel = appliedSetting('level')
+        try:
+            for level in range(self.minLevel, self.maxLevel + 1):
+                if level > self.minLevel and self.budget is not None:
+                    elapsed = (time.perf_counter() - starTime) * 1000
+                    if elapsed + self.averageTime(level) > self.budget:
+                        self.budgetStops += 1
+                        break
+
+                levelTime = time.perf_counter()
+                applySettings(level=level)
+                resultLen, scanResults = self.scanner(pixels, width, height)
+                self.attempts[level] += 1
+                self.scanTime[level] += (time.perf_counter() - levelTime) * 1000
+
+                if resultLen > 0:
+                    self.successes[level] += 1
+                    self.lastLevel = level
+                    break
+        finally:
+            if configuredLevel is not None:
+                applySettings(level=configuredLevel)
+
+        return resultLen, scanResults
+
+    # The statistics as printable text, one line per level
+    def report(self):
+        decoded = sum(self.successes)
+        lines = ["Effort escalation: %d of %d images decoded, %d stopped by the time budget" %
+                 (decoded, self.images, self.budgetStops)]
+        for level in range(self.minLevel, self.maxLevel + 1):
+            lines.append("  level %d: %d scans, %d decoded (%.1f%% of decoded), %.2f ms average" %
+                         (level, self.attempts[level], self.successes[level],
+                          100.0 * self.successes[level] / decoded if decoded else 0.0, self.averageTime(level)))
+        return "\n".join(lines)
@@ -0,0 +1,113 @@
+#
+# File      ImageLoader.py
+#
+# Brief     Helper functions for loading images as 8-bit grayscale for the barcode scanner library
+#
+# Details   The scanner library works on 8-bit grayscale images; these helpers load an image file with the
+#           Python Image Library (Pillow), converting it to grayscale, and return the pixels together with
+#           the image dimensions ready to pass to MWBscanGrayscaleImage/MWBscanGrayscaleRegions.
+#
+#           Draft loading: large JPEGs can be decoded at 1/2, 1/4 or 1/8 scale directly by the JPEG decoder
+#           (Image.draft, which scales in the DCT domain and decodes only the luminance channel for 'L'). This
+#           is several times faster than a full decode followed by convert('L'), and the decoder has fewer
+#           pixels to search. The scale is chosen from the smallest module size (in full resolution pixels)
+#           expected in the images, so that modules remain at least DRAFT_MIN_MODULE_PIXELS wide. Results of
+#           a reduced scan must be mapped back to full resolution with scaleResults(); callers should retry
+#           at full resolution when the reduced scan finds nothing.
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+
+from PIL import Image
+
+# loadGrayscale
+#
+# Load an image file, converting it to grayscale.
+#
+# This function returns a tuple:
+#  pixels - The grayscale pixels (bytes, width * height)
+#  width  - Image width (pixels)
+#  height - Image height (pixels)
+#
+def loadGrayscale(fileName):
+    grayScale = Image.open(fileName).convert('L')
+    return grayScale.tobytes(), grayScale.width, grayScale.height
+
+# Smallest module size (pixels) the reduced images are allowed to have
+DRAFT_MIN_MODULE_PIXELS = 2.0
+
+# JPEG draft scales supported by Pillow, largest first
+_DRAFT_SCALES = (8, 4, 2)
+
+# draftScale
+#
+# Pick the largest draft scale (8, 4, 2, or 1 for full resolution) that keeps modules of minModuleSize
+# pixels at least DRAFT_MIN_MODULE_PIXELS wide.
+#
+def draftScale(minModuleSize):
+    for scale in _DRAFT_SCALES:
+        if minModuleSize / scale >= DRAFT_MIN_MODULE_PIXELS:
+            return scale
+    return 1
+
+# openGrayscaleDraft
+#
+# Open an image file as a grayscale image, reduced according to minModuleSize (see draftScale) when the
+# file is a JPEG. Other formats are loaded at full resolution.
+#
+# This function returns a tuple:
+#  grayScale - The grayscale image (PIL Image)
+#  scaleX    - Full resolution width / grayScale.width (1.0 when not reduced)
+#  scaleY    - Full resolution height / grayScale.height
+#
+def openGrayscaleDraft(fileName, minModuleSize):
+    image = Image.open(fileName)
+    fullWidth, fullHeight = image.size
+
+    scale = draftScale(minModuleSize)
+    if scale > 1:
+        # Pillow picks the largest scale that still gives at least the requested size, and its reduced
+        # size is rounded up: request the rounded down size, or odd dimensions would not be reduced as far
+        image.draft('L', (max(1, fullWidth // scale), max(1, fullHeight // scale)))
+
+    grayScale = image.convert('L')
+    return grayScale, fullWidth / grayScale.width, fullHeight / grayScale.height
+
+# loadGrayscaleDraft
+#
+# As loadGrayscale, using draft loading (see openGrayscaleDraft).
+#
+# This function returns a tuple:
+#  pixels - The grayscale pixels (bytes, width * height)
+#  width  - Image width (pixels, reduced)
+#  height - Image height (pixels, reduced)
+#  scaleX - Full resolution width / width
+#  scaleY - Full resolution height / height
+#
+def loadGrayscaleDraft(fileName, minModuleSize):
+    grayScale, scaleX, scaleY = openGrayscaleDraft(fileName, minModuleSize)
+    return grayScale.tobytes(), grayScale.width, grayScale.height, scaleX, scaleY
+
+# scaleResults
+#
+# Map the results of scanning a reduced image back to full resolution: location points, image size,
+# module size and barcode size are scaled in place. results is an MWResults object or a list of MWResult.
+#
+def scaleResults(results, scaleX, scaleY):
+    if hasattr(results, 'results'):
+        results = results.results
+
+    for result in results:
+        location = result.locationPoints
+        if location is not None:
+            coordinates = location.coordinates
+            for i in range(0, 8, 2):
+                coordinates[i] *= scaleX
+                coordinates[i + 1] *= scaleY
+
+        result.imageWidth = int(round(result.imageWidth * scaleX))
+        result.imageHeight = int(round(result.imageHeight * scaleY))
+        result.moduleSizeX *= scaleX
+        result.moduleSizeY *= scaleY
+        result.barcodeWidth *= scaleX
+        result.barcodeHeight *= scaleY
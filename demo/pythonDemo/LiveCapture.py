@@ -0,0 +1,536 @@
+#
+# File      LiveCapture.py
+#
+# Brief     Allocation-free frame capture and threaded live decoding
+#
+# Details   Capturing with frame = cap.read() and converting with cv2.cvtColor(frame, ...) allocates new image
+#           buffers for every frame (several MB per frame at HD resolution, hundreds of MB/s at 30-60 fps).
+#           FrameRing preallocates a small ring of color frames and grayscale images once, reads each frame
+#           into the next buffer of the ring (cap.read(frame)) and converts it to grayscale in place
+#           (cv2.cvtColor(..., dst=)). The grayscale images are contiguous NumPy arrays, which the scan
+#           functions accept directly (no copy, see BarcodeScanner.py):
+#
+#               ring = FrameRing(cap)
+#               while True:
+#                   ok, frame, pixels = ring.read()
+#                   height, width = pixels.shape
+#                   resultLen, scanResults = MWB.MWBscanGrayscaleImage(pixels, width, height)
+#
+#           A buffer is reused after 'size' more frames have been read, so the caller may hold on to (e.g.
+#           display) a frame and its grayscale image while up to size - 1 further frames are captured. Buffers
+#           that are still in use for longer can be held (hold(index)), and are skipped until released.
+#
+#           LiveDecoder splits live decoding into stages on their own threads: a capture thread that keeps
+#           reading frames and always keeps only the newest one, decoder thread(s) that take the newest frame
+#           when they are ready for it (older frames are dropped, not queued), and the display stage, run by
+#           the caller on the main thread (cv2.imshow needs it):
+#
+#               live = LiveDecoder(cap, scanner)
+#               live.start()
+#               for item in live.results():
+#                   ... item.results, item.frame ...
+#               live.stop()
+#               print(live.report())
+#
+#           A slow decode then no longer stalls capture, and no camera backlog builds up: the latency from
+#           capture to result stays below about one frame interval plus one decode time, and is reported.
+#
+#           Several cameras can share one LiveDecoder (addSource): each source has its own capture thread,
+#           scanner and decoder configuration, while all of them share the fixed number of decoder threads,
+#           which take the sources' newest frames in turn. The CPU used for decoding is bounded by the
+#           decoder threads however many cameras are added; each camera's latency is reported separately.
+#
+#           With sharedFrames, the grayscale images are kept in shared memory (a SharedFrameRing, see
+#           SharedFrames.py), so that a scanner decoding in other processes (SharedScanner) reads them in place
+#           instead of receiving a copy of every frame.
+#
+#           For testing without a camera, VideoFileSource plays a video file at its frame rate and
+#           SyntheticSource generates moving frames from an image (see openSource).
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+
+import time
+import threading
+import collections
+
+import cv2
+import numpy as np
+
+import BarcodeScanner as MWB
+import MWResult as MWR
+
+class FrameRing:
+
+    # cap    - cv2.VideoCapture (or any object with a compatible read(image) method)
+    # size   - number of buffers in the ring
+    # shared - allocate the grayscale images in shared memory (a SharedFrameRing, see SharedFrames.py)
+    def __init__(self, cap, size = 3, shared = False):
+        self.cap = cap
+        self.size = size
+        self.shared = shared
+        self.sharedRing = None
+        self.index = 0
+        self.frames = []
+        self.grays = []
+
+        # Buffers in use elsewhere (not to be overwritten), and the index of the last buffer read
+        self.held = set()
+        self.lastIndex = None
+        self.lock = threading.Lock()
+
+    # Keep the buffers at index from being reused until released
+    def hold(self, index):
+        with self.lock:
+            self.held.add(index)
+
+    def release(self, index):
+        with self.lock:
+            self.held.discard(index)
+
+    # Index of the next buffer that is not held
+    def _nextIndex(self):
+        with self.lock:
+            for i in range(self.size):
+                index = (self.index + i) % self.size
+                if index not in self.held:
+                    self.index = (index + 1) % self.size
+                    return index
+        raise BufferError("all " + str(self.size) + " frame buffers are held")
+
+    def _allocate(self, frame):
+        height, width = frame.shape[0:2]
+        self.frames = [np.empty_like(frame) for i in range(self.size)]
+        if self.shared:
+            from SharedFrames import SharedFrameRing
+
+            # The previous ring's frames may still be in use: they stay mapped until released
+            if self.sharedRing is not None:
+                self.sharedRing.close()
+            self.sharedRing = SharedFrameRing(self.size, width * height)
+            self.grays = [self.sharedRing.slot(i, width, height) for i in range(self.size)]
+        else:
+            self.grays = [np.empty((height, width), dtype=np.uint8) for i in range(self.size)]
+
+    # Free the shared memory (if any); frames still in use elsewhere remain valid
+    def close(self):
+        if self.sharedRing is not None:
+            self.grays = []
+            self.sharedRing.close()
+            self.sharedRing = None
+
+    # Capture the next frame. Returns (ok, frame, pixels): the BGR frame and its grayscale image, both
+    # buffers of the ring (None if no frame could be read).
+    def read(self):
+        index = self._nextIndex()
+
+        if self.frames:
+            ok, frame = self.cap.read(self.frames[index])
+        else:
+            ok, frame = self.cap.read()
+        if not ok or frame is None:
+            return False, None, None
+
+        # First frame, or the capture size changed: (re)allocate the ring to match. Sources that return a
+        # new image rather than filling the one given are copied into the ring.
+        if not self.frames or frame.shape != self.frames[index].shape or frame.dtype != self.frames[index].dtype:
+            self._allocate(frame)
+        if frame is not self.frames[index]:
+            self.frames[index][...] = frame
+            frame = self.frames[index]
+
+        gray = self.grays[index]
+        if frame.ndim == 2:
+            gray[...] = frame
+        else:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+        self.lastIndex = index
+        return True, frame, gray
+
+# Wait until the time a frame is due, for sources that would otherwise deliver frames as fast as they are read
+class _Pacer:
+
+    def __init__(self, fps):
+        self.interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self.due = None
+
+    def wait(self):
+        now = time.perf_counter()
+        if self.due is None or now - self.due > self.interval:
+            # First frame, or reading fell behind by more than a frame: restart the schedule (like a camera,
+            # the frames missed meanwhile are gone)
+            self.due = now
+        elif self.due > now:
+            time.sleep(self.due - now)
+        self.due += self.interval
+
+# A video file played at its frame rate (or fps), like a camera; with loop, restarted at the end
+class VideoFileSource:
+
+    def __init__(self, fileName, fps = None, loop = False):
+        self.cap = cv2.VideoCapture(fileName)
+        self.loop = loop
+        self.pacer = _Pacer(fps or self.cap.get(cv2.CAP_PROP_FPS) or 30)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self, image = None):
+        self.pacer.wait()
+        ok, frame = self.cap.read(image)
+        if not ok and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.cap.read(image)
+        return ok, frame
+
+    def release(self):
+        self.cap.release()
+
+# Frames generated from an image (BGR or grayscale), moved by shift (x, y) pixels per frame, at fps frames
+# per second; count frames (None for no limit)
+class SyntheticSource:
+
+    def __init__(self, image, fps = 30, count = None, shift = (2, 1)):
+        self.image = image
+        self.count = count
+        self.shift = shift
+        self.number = 0
+        self.pacer = _Pacer(fps)
+
+    def isOpened(self):
+        return self.image is not None
+
+    def read(self, image = None):
+        if self.count is not None and self.number >= self.count:
+            return False, None
+        self.pacer.wait()
+
+        shiftX = self.shift[0] * self.number % self.image.shape[1]
+        shiftY = self.shift[1] * self.number % self.image.shape[0]
+        self.number += 1
+
+        if image is None or image.shape != self.image.shape or image.dtype != self.image.dtype:
+            image = np.empty_like(self.image)
+        np.copyto(image, np.roll(self.image, (shiftY, shiftX), axis=(0, 1)))
+        return True, image
+
+    def release(self):
+        pass
+
+# Open a frame source: a camera index ("0"), "synthetic:<image file>" or a video file name
+def openSource(source, fps = None, loop = False):
+    source = str(source)
+    if source.isdigit():
+        return cv2.VideoCapture(int(source))
+    if source.lower().startswith("synthetic:"):
+        return SyntheticSource(cv2.imread(source[len("synthetic:"):]), fps or 30)
+    return VideoFileSource(source, fps, loop)
+
+# A frame on its way through LiveDecoder: captured (source, number, captureTime, frame, pixels), then
+# decoded (resultLen, scanResults, results, decodeTime, latency)
+class LiveFrame:
+
+    __slots__ = ('source', 'number', 'index', 'captureTime', 'frame', 'pixels',
+                 'resultLen', 'scanResults', 'results', 'decodeTime', 'latency')
+
+    def __init__(self, source, number, index, captureTime, frame, pixels):
+        self.source = source
+        self.number = number
+        self.index = index
+        self.captureTime = captureTime
+        self.frame = frame
+        self.pixels = pixels
+        self.resultLen = 0
+        self.scanResults = None
+        self.results = None
+        self.decodeTime = 0.0
+        self.latency = 0.0
+
+# A frame source of a LiveDecoder, with its scanner, configuration, frames in progress and statistics
+class LiveSource:
+
+    def __init__(self, name, source, scanner, config, sequential, ringSize, history, sharedFrames = False):
+        self.name = name
+        self.source = source
+        self.scanner = scanner or MWB.MWBscanGrayscaleImage
+        self.config = config
+        self.sequential = sequential
+        self.ring = FrameRing(source, ringSize, sharedFrames)
+
+        self.captureDone = False
+        self.latest = None
+        self.output = None
+        self.decoding = 0
+
+        # Statistics
+        self.captured = 0
+        self.decoded = 0
+        self.dropped = 0
+        self.resultsDropped = 0
+        self.latencies = collections.deque(maxlen=history)
+        self.decodeTimes = collections.deque(maxlen=history)
+
+    # Whether a decoder may take the newest frame now
+    def ready(self):
+        return self.latest is not None and not (self.sequential and self.decoding)
+
+    # Latency (ms) at the given percentile of the recent frames
+    def latencyPercentile(self, percentile):
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+
+    # The statistics as printable text, for frames captured over elapsed seconds
+    def report(self, elapsed):
+        lines = ["%s: %d frames captured, %d decoded, %d dropped before decoding, %d results not displayed" %
+                 (self.name, self.captured, self.decoded, self.dropped, self.resultsDropped)]
+        if elapsed > 0:
+            lines.append("  %.1f fps captured, %.1f fps decoded" % (self.captured / elapsed, self.decoded / elapsed))
+        if self.latencies:
+            lines.append("  capture to result latency: %.2f ms median, %.2f ms p90, %.2f ms max; decode %.2f ms average" %
+                         (self.latencyPercentile(50), self.latencyPercentile(90), max(self.latencies),
+                          sum(self.decodeTimes) / len(self.decodeTimes)))
+        return lines
+
+class LiveDecoder:
+
+    # source   - frame source: cv2.VideoCapture, VideoFileSource, SyntheticSource (see openSource); more
+    #            sources can be added with addSource
+    # scanner  - function (pixels, width, height) -> (resultLen, scanResults) used to decode, e.g. a
+    #            RegionSet's scan (default MWB.MWBscanGrayscaleImage)
+    # decoders - number of decoder threads, shared by all sources. The scan functions may be called from
+    #            several threads, but the SDK's configuration is global: scanners that change it
+    #            (EffortScheduler, ...) need 1.
+    # history  - number of frames kept for the latency statistics
+    # sharedFrames - capture the grayscale images into shared memory, for scanners decoding in worker
+    #            processes (SharedFrames.SharedScanner); the decoder threads then only wait for the workers
+    def __init__(self, source = None, scanner = None, decoders = 1, history = 1000, sharedFrames = False):
+        self.decoders = decoders
+        self.history = history
+        self.sharedFrames = sharedFrames
+        self.sources = []
+
+        self.condition = threading.Condition()
+        self.threads = []
+        self.running = False
+        self.error = None
+
+        # Decoder scheduling: the source whose turn is next, the configuration applied to the library and
+        # the number of scans in progress
+        self.turn = 0
+        self.displayTurn = 0
+        self.config = None
+        self.scanning = 0
+
+        self.starTime = None
+        self.stopTime = None
+
+        if source is not None:
+            self.addSource(source, scanner)
+
+    # Add a frame source (before start). Returns its LiveSource.
+    #  scanner    - as for the constructor; each source may have its own (e.g. its own tiles)
+    #  config     - DecoderConfig applied before decoding the source's frames (active codes, effort level,
+    #               ...), or None to decode with whatever is configured. Sources with different configurations
+    #               are not decoded at the same time: give all of them the same settings.
+    #  sequential - decode the source's frames one at a time, in order, for scanners that learn from one frame
+    #               to the next (RegionPlanner, BarcodeTracker, ChangeGate)
+    #  name       - name for the results and the statistics (default "source <n>")
+    def addSource(self, source, scanner = None, config = None, sequential = False, name = None):
+        # Buffers in use at once: one being captured, the newest frame, one per decoder, the newest
+        # result and the one being displayed
+        liveSource = LiveSource(name or "source " + str(len(self.sources)), source, scanner, config, sequential,
+                                self.decoders + 4, self.history, self.sharedFrames)
+        self.sources.append(liveSource)
+        return liveSource
+
+    def start(self):
+        self.running = True
+        self.starTime = time.perf_counter()
+        self.threads = [threading.Thread(target=self._capture, args=(source,), name="capture " + source.name, daemon=True)
+                        for source in self.sources]
+        self.threads += [threading.Thread(target=self._decode, name="decoder" + str(i), daemon=True)
+                         for i in range(self.decoders)]
+        for thread in self.threads:
+            thread.start()
+
+    # Stop capturing and decoding (frames not yet decoded are dropped), and free the sources' shared memory
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
+        self.stopTime = time.perf_counter()
+        for source in self.sources:
+            source.ring.close()
+
+    # Capture thread (one per source): read frames continuously, replacing the newest frame if it was not
+    # taken yet
+    def _capture(self, source):
+        ring = source.ring
+        try:
+            while self.running:
+                ok, frame, pixels = ring.read()
+                if not ok:
+                    break
+                item = LiveFrame(source.name, source.captured, ring.lastIndex, time.perf_counter(), frame, pixels)
+
+                with self.condition:
+                    source.captured += 1
+                    if source.latest is not None:
+                        source.dropped += 1
+                        ring.release(source.latest.index)
+                    ring.hold(item.index)
+                    source.latest = item
+                    self.condition.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            with self.condition:
+                source.captureDone = True
+                self.condition.notify_all()
+
+    # The source to decode next: the first one with a frame ready, in turn after the last one served
+    # (round robin, so that every source gets its share of the decoders however fast the others deliver
+    # frames). None if no source has a frame ready.
+    def _nextSource(self):
+        count = len(self.sources)
+        for i in range(count):
+            source = self.sources[(self.turn + i) % count]
+            if source.ready():
+                return source
+        return None
+
+    def _finished(self):
+        return all(source.captureDone and source.latest is None and source.decoding == 0 for source in self.sources)
+
+    # Decoder thread: decode the newest frame of the sources, in turn
+    def _decode(self):
+        while True:
+            with self.condition:
+                while True:
+                    if not self.running:
+                        return
+                    source = self._nextSource()
+                    if source is None:
+                        if all(s.captureDone and s.latest is None for s in self.sources):
+                            return
+                    elif source.config is None or source.config == self.config or self.scanning == 0:
+                        break
+                    # No frame ready, or the source in turn needs another configuration: wait (for the scans
+                    # in progress to finish)
+                    self.condition.wait()
+
+                self.turn = (self.sources.index(source) + 1) % len(self.sources)
+                item = source.latest
+                source.latest = None
+                source.decoding += 1
+                self.scanning += 1
+
+                # No other scan is in progress when the configuration changes
+                if source.config is not None and source.config != self.config:
+                    source.config.apply()
+                    self.config = source.config
+
+            try:
+                starTime = time.perf_counter()
+                height, width = item.pixels.shape
+                item.resultLen, item.scanResults = source.scanner(item.pixels, width, height)
+                if item.resultLen > 0:
+                    item.results = MWR.MWResults(item.scanResults)
+                doneTime = time.perf_counter()
+                item.decodeTime = (doneTime - starTime) * 1000
+                item.latency = (doneTime - item.captureTime) * 1000
+            except Exception as e:
+                self.error = e
+
+            with self.condition:
+                source.decoding -= 1
+                self.scanning -= 1
+                if self.error is not None:
+                    self.running = False
+                    source.ring.release(item.index)
+                    self.condition.notify_all()
+                    return
+
+                source.decoded += 1
+                source.latencies.append(item.latency)
+                source.decodeTimes.append(item.decodeTime)
+
+                # Keep only the newest result of each source (decoders may finish out of order)
+                if source.output is not None and source.output.number > item.number:
+                    source.resultsDropped += 1
+                    source.ring.release(item.index)
+                else:
+                    if source.output is not None:
+                        source.resultsDropped += 1
+                        source.ring.release(source.output.index)
+                    source.output = item
+                self.condition.notify_all()
+
+    # The next source with a result to display, in turn
+    def _nextOutput(self):
+        count = len(self.sources)
+        for i in range(count):
+            source = self.sources[(self.displayTurn + i) % count]
+            if source.output is not None:
+                self.displayTurn = (self.displayTurn + i + 1) % count
+                return source
+        return None
+
+    # Display stage: yield the decoded frames (LiveFrame; item.source is the source's name), the newest of
+    # each source, skipping those decoded while the previous one was being displayed. A frame's buffers
+    # stay valid until the next one is requested.
+    def results(self):
+        item = None
+        ring = None
+        try:
+            while True:
+                with self.condition:
+                    if item is not None:
+                        ring.release(item.index)
+                        item = None
+                    source = self._nextOutput()
+                    while source is None and self.running and not self._finished():
+                        self.condition.wait()
+                        source = self._nextOutput()
+                    if self.error is not None:
+                        raise self.error
+                    if source is None:
+                        return
+                    item = source.output
+                    ring = source.ring
+                    source.output = None
+                yield item
+        finally:
+            if item is not None:
+                ring.release(item.index)
+
+    # Statistics over all sources
+    @property
+    def captured(self):
+        return sum(source.captured for source in self.sources)
+
+    @property
+    def decoded(self):
+        return sum(source.decoded for source in self.sources)
+
+    @property
+    def dropped(self):
+        return sum(source.dropped for source in self.sources)
+
+    # The statistics as printable text (per source if there are several)
+    def report(self):
+        elapsed = (self.stopTime or time.perf_counter()) - self.starTime if self.starTime else 0.0
+        if len(self.sources) == 1:
+            lines = self.sources[0].report(elapsed)
+            lines[0] = "Live decoding: " + lines[0][len(self.sources[0].name) + 2:]
+            return "\n".join(lines)
+
+        lines = ["Live decoding: %d sources, %d decoder threads; %d frames captured, %d decoded, %d dropped before decoding" %
+                 (len(self.sources), self.decoders, self.captured, self.decoded, self.dropped)]
+        for source in self.sources:
+            lines += ["  " + line for line in source.report(elapsed)]
+        return "\n".join(lines)
@@ -0,0 +1,231 @@
+#
+# File      MWRegions.py
+#
+# Brief     Reusable region definitions for MWBscanGrayscaleRegions
+#
+# Details   Regions are passed to the scanner library as a packed array of float32 values (left, top, width,
+#           height per region, in percentages of the image size). Creating them with MWBcreateRegionsFromTiles
+#           and packing them again for every scan is wasted work when scanning many images or video frames
+#           with the same layout, so a RegionSet holds the packed buffer, ready to pass straight to the
+#           library, and regionsFromTiles() memoizes one RegionSet per (tilesX, tilesY, overlap):
+#
+#               regionSet = regionsFromTiles(6, 6, 6)          # once
+#               ...
+#               resultLen, scanResults = regionSet.scan(pixels, width, height, maxThreads)   # per frame
+#
+#           RegionSets are immutable, so the cached instances can be shared freely.
+#
+#           RegionPlanner adapts the regions to where barcodes have actually been found. It keeps a heat map
+#           (a coarse grid over the image, in percentages) of the locations of recent results, and scans
+#           only a few regions around the hot areas. When those regions miss (or find fewer barcodes than the
+#           last full scan did, with multi-code), the frame is scanned again with the full tile grid, so
+#           nothing is lost compared to always using the grid; on steady traffic
+#           (e.g. a conveyor, where codes land in a predictable band) most scans only cover a fraction of
+#           the image:
+#
+#               planner = RegionPlanner(tilesX=6, tilesY=6, overlap=6)
+#               resultLen, scanResults = planner.scan(pixels, width, height, maxThreads)   # per frame
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+
+import struct
+import functools
+
+import BarcodeScanner as MWB
+import MWResult as MWR
+
+class RegionSet:
+    __slots__ = ('count', 'regions', 'packed')
+
+    # regions - sequence of floats, 4 per region (left, top, width, height in percentages)
+    # count   - number of regions (default len(regions) / 4)
+    def __init__(self, regions, count = None):
+        self.regions = tuple(regions)
+        self.count = len(self.regions) // 4 if count is None else count
+        self.packed = struct.pack("%df" % len(self.regions), *self.regions)
+
+    def __len__(self):
+        return self.count
+
+    # Region index as (left, top, width, height)
+    def region(self, index):
+        return self.regions[index * 4:index * 4 + 4]
+
+    # Scan an image using these regions (see MWB.MWBscanGrayscaleRegions)
+    def scan(self, pixels, width, height, maxThreads):
+        return MWB.MWBscanGrayscaleRegions(pixels, width, height, self.packed, self.count, maxThreads)
+
+# regionsFromTiles
+#
+# The RegionSet created by MWBcreateRegionsFromTiles for tilesX by tilesY tiles with overlap (percentage);
+# the most recently used layouts are cached.
+#
+@functools.lru_cache(maxsize=32)
+def regionsFromTiles(tilesX, tilesY, overlap):
+    regionCount, regionData = MWB.MWBcreateRegionsFromTiles(tilesX, tilesY, overlap)
+    return RegionSet(regionData, regionCount)
+
+# connectedAreas
+#
+# Group the cells set in hot (a row-major list of columns x rows cells) into connected areas. Returns a
+# list of (weight, left, top, right, bottom) tuples, hottest first, where weight is the sum of the weights
+# of the area's cells and left/top/right/bottom are its bounding box in cells (right and bottom exclusive).
+#
+def connectedAreas(hot, weights, columns, rows):
+    hot = list(hot)
+    areas = []
+    for start in range(len(hot)):
+        if not hot[start]:
+            continue
+        hot[start] = False
+        stack = [start]
+        weight = 0.0
+        left, top, right, bottom = columns, rows, 0, 0
+        while stack:
+            cell = stack.pop()
+            y, x = divmod(cell, columns)
+            weight += weights[cell]
+            left, right = min(left, x), max(right, x)
+            top, bottom = min(top, y), max(bottom, y)
+            for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                if 0 <= nx < columns and 0 <= ny < rows and hot[ny * columns + nx]:
+                    hot[ny * columns + nx] = False
+                    stack.append(ny * columns + nx)
+        areas.append((weight, left, top, right + 1, bottom + 1))
+
+    areas.sort(reverse=True)
+    return areas
+
+# areaRegions
+#
+# The RegionSet for the (at most maxRegions) hottest areas found by connectedAreas on a columns x rows
+# grid, each grown by margin (percentage of the image size).
+#
+def areaRegions(areas, columns, rows, margin, maxRegions):
+    regions = []
+    for weight, left, top, right, bottom in areas[:maxRegions]:
+        x1 = max(left * 100.0 / columns - margin, 0.0)
+        y1 = max(top * 100.0 / rows - margin, 0.0)
+        x2 = min(right * 100.0 / columns + margin, 100.0)
+        y2 = min(bottom * 100.0 / rows + margin, 100.0)
+        regions += [x1, y1, x2 - x1, y2 - y1]
+    return RegionSet(regions)
+
+class RegionPlanner:
+
+    # tilesX, tilesY, overlap - full tile grid used until enough is known, and whenever the hot regions miss
+    # cells         - heat map resolution (cells x cells over the image)
+    # decay         - weight of the existing heat map when adding a new scan (older results fade out)
+    # threshold     - fraction of the hottest cell's heat for a cell to be scanned
+    # margin        - percentage added around the hot areas (at least the size of the barcodes scanned)
+    # maxRegions    - maximum number of hot regions (the hottest are kept)
+    # warmup        - number of scans with results needed before planning regions
+    # probeInterval - scan every n'th image with the full grid anyway, to find codes in new places (0 = never)
+    # minResults    - a hot scan finding fewer results than this counts as a miss (default: as many as the
+    #                 last full-grid scan found, at least 1)
+    def __init__(self, tilesX = 6, tilesY = 6, overlap = 6, cells = 20, decay = 0.95, threshold = 0.05,
+                 margin = 5.0, maxRegions = 4, warmup = 5, probeInterval = 100, minResults = None):
+        self.fullGrid = regionsFromTiles(tilesX, tilesY, overlap)
+        self.cells = cells
+        self.decay = decay
+        self.threshold = threshold
+        self.margin = margin
+        self.maxRegions = maxRegions
+        self.warmup = warmup
+        self.probeInterval = probeInterval
+        self.minResults = minResults
+
+        self.heat = [0.0] * (cells * cells)
+        self.recorded = 0
+        self.plan = None
+
+        # Number of results of the last full-grid scan
+        self.lastFullCount = 0
+
+        # Statistics
+        self.scans = 0
+        self.hotScans = 0
+        self.hotHits = 0
+        self.fullScans = 0
+
+    # Fraction of the scans answered by the hot regions alone
+    @property
+    def hitRate(self):
+        return self.hotHits / self.scans if self.scans else 0.0
+
+    # Add the locations of the results of a scan to the heat map
+    def record(self, results):
+        if hasattr(results, 'results'):
+            results = results.results
+
+        cells = self.cells
+        heat = self.heat
+        found = False
+        for result in results:
+            location = result.locationPoints
+            if location is None or result.imageWidth <= 0 or result.imageHeight <= 0:
+                continue
+            if not found:
+                found = True
+                for i in range(len(heat)):
+                    heat[i] *= self.decay
+
+            # Cells covered by the barcode's bounding box
+            xs = location.coordinates[0::2]
+            ys = location.coordinates[1::2]
+            left = self._cell(min(xs) / result.imageWidth)
+            right = self._cell(max(xs) / result.imageWidth)
+            top = self._cell(min(ys) / result.imageHeight)
+            bottom = self._cell(max(ys) / result.imageHeight)
+            for y in range(top, bottom + 1):
+                for x in range(left, right + 1):
+                    heat[y * cells + x] += 1.0
+
+        if found:
+            self.recorded += 1
+            self.plan = None
+
+    def _cell(self, fraction):
+        return min(max(int(fraction * self.cells), 0), self.cells - 1)
+
+    # The RegionSet covering the hot areas of the heat map (None until warmed up)
+    def hotRegions(self):
+        if self.recorded < self.warmup:
+            return None
+        if self.plan is None:
+            self.plan = self._planRegions()
+        return self.plan
+
+    def _planRegions(self):
+        limit = max(self.heat) * self.threshold
+        hot = [h > limit for h in self.heat]
+        areas = connectedAreas(hot, self.heat, self.cells, self.cells)
+        return areaRegions(areas, self.cells, self.cells, self.margin, self.maxRegions)
+
+    # Scan an image with the hot regions, falling back to the full tile grid when they miss; the results
+    # are added to the heat map. Returns (resultLen, scanResults) as MWB.MWBscanGrayscaleRegions.
+    def scan(self, pixels, width, height, maxThreads):
+        self.scans += 1
+        regionSet = self.hotRegions()
+        probe = self.probeInterval > 0 and self.scans % self.probeInterval == 0
+
+        if regionSet is not None and not probe:
+            self.hotScans += 1
+            resultLen, scanResults = regionSet.scan(pixels, width, height, maxThreads)
+            if resultLen > 0:
+                results = MWR.MWResults(scanResults, lazy=True)
+                minResults = self.minResults if self.minResults is not None else max(1, self.lastFullCount)
+                if results.count >= minResults:
+                    self.hotHits += 1
+                    self.record(results)
+                    return resultLen, scanResults
+
+        self.fullScans += 1
+        resultLen, scanResults = self.fullGrid.scan(pixels, width, height, maxThreads)
+        self.lastFullCount = 0
+        if resultLen > 0:
+            results = MWR.MWResults(scanResults, lazy=True)
+            self.lastFullCount = results.count
+            self.record(results)
+        return resultLen, scanResults
@@ -11,30 +11,141 @@
 #
 
 from ctypes import *
+from array import array
 import struct
 import sys
+import base64
 
 import BarcodeScanner as MWB
+
+# Descriptive names of the FOUND_* barcode types
+_TYPE_NAMES = {
+    MWB.FOUND_25_INTERLEAVED: "Code 25 Interleaved",
+    MWB.FOUND_25_STANDARD: "Code 25 Standard",
+    MWB.FOUND_128: "Code 128",
+    MWB.FOUND_128_GS1: "Code 128 GS1",
+    MWB.FOUND_39: "Code 39",
+    MWB.FOUND_32: "Code 32",
+    MWB.FOUND_93: "Code 93",
+    MWB.FOUND_AZTEC: "AZTEC",
+    MWB.FOUND_DM: "Datamatrix",
+    MWB.FOUND_QR: "QR",
+    MWB.FOUND_EAN_13: "EAN 13",
+    MWB.FOUND_EAN_8: "EAN 8",
+    MWB.FOUND_NONE: "None",
+    MWB.FOUND_RSS_14: "Databar 14",
+    MWB.FOUND_RSS_14_STACK: "Databar 14 Stacked",
+    MWB.FOUND_RSS_EXP: "Databar Expanded",
+    MWB.FOUND_RSS_LIM: "Databar Limited",
+    MWB.FOUND_UPC_A: "UPC A",
+    MWB.FOUND_UPC_E: "UPC E",
+    MWB.FOUND_PDF: "PDF417",
+    MWB.FOUND_CODABAR: "Codabar",
+    MWB.FOUND_DOTCODE: "Dotcode",
+    MWB.FOUND_11: "Code 11",
+    MWB.FOUND_MSI: "MSI Plessey",
+    MWB.FOUND_25_IATA: "IATA Code 25",
+    MWB.FOUND_ITF14: "ITF 14",
+    MWB.FOUND_25_MATRIX: "Code 2/5 Matrix",
+    MWB.FOUND_25_COOP: "Code 2/5 COOP",
+    MWB.FOUND_25_INVERTED: "Code 2/5 Inverted",
+    MWB.FOUND_MAXICODE: "Maxicode",
+    MWB.FOUND_QR_MICRO: "Micro QR",
+    MWB.FOUND_POSTNET: "Postnet",
+    MWB.FOUND_PLANET: "Planet",
+    MWB.FOUND_IMB: "Intelligent mail",
+    MWB.FOUND_ROYALMAIL: "Royal mail",
+    MWB.FOUND_MICRO_PDF: "Micro PDF417",
+    MWB.FOUND_AUSTRALIAN: "Australian",
+    MWB.FOUND_TELEPEN: "Telepen"
+}
+
 class PointF:
+    __slots__ = ('x', 'y')
     
     def __init__(self, _x = 0.0, _y = 0.0):
         self.x = float(_x)
         self.y = float(_y)
         
+# A corner point of an MWLocation: reads and writes its x and y in the location's coordinates
+class _LocationPoint(PointF):
+    __slots__ = ('_coordinates', '_index')
+
+    def __init__(self, coordinates, index):
+        self._coordinates = coordinates
+        self._index = index * 2
+
+    @property
+    def x(self):
+        return self._coordinates[self._index]
+
+    @x.setter
+    def x(self, value):
+        self._coordinates[self._index] = value
+
+    @property
+    def y(self):
+        return self._coordinates[self._index + 1]
+
+    @y.setter
+    def y(self, value):
+        self._coordinates[self._index + 1] = value
+
+    # A copy is a plain PointF
+    def __reduce__(self):
+        return PointF, (self.x, self.y)
+
+# MWLocation
+#
+# The four corner points of a barcode, stored as a single array of 8 floats (x1, y1, ... x4, y4). The
+# points (and p1 - p4) are created as PointF objects when first accessed; they read and write the
+# coordinates, so changing a point changes the location (change the coordinates in place, too).
+#
 class MWLocation:
+    __slots__ = ('coordinates', '_points')
+
     def __init__(self, _points):
-        
-        self.points = []
-        for i in range(4):
-            p = PointF(_points[i*2],_points[i*2+1])
-            self.points.append(p)
-            
-        self.p1 = self.points[0]
-        self.p2 = self.points[1]
-        self.p3 = self.points[2]
-        self.p4 = self.points[3]
+        self.coordinates = array('f', _points[0:8])
+        self._points = None
+
+    def __getstate__(self):
+        return self.coordinates
+
+    def __setstate__(self, state):
+        self.coordinates = state
+        self._points = None
+
+    def point(self, index):
+        return self.points[index]
+
+    @property
+    def points(self):
+        if self._points is None:
+            self._points = [_LocationPoint(self.coordinates, i) for i in range(4)]
+        return self._points
+
+    @property
+    def p1(self):
+        return self.points[0]
+
+    @property
+    def p2(self):
+        return self.points[1]
+
+    @property
+    def p3(self):
+        return self.points[2]
+
+    @property
+    def p4(self):
+        return self.points[3]
         
 class MWResult:
+    __slots__ = ('text', 'textEncoding', 'typeName', 'rawBytes', 'bytesLength', 'barcodeType', 'subtype',
+                 'barcodeSubtype', 'imageWidth', 'imageHeight', 'isGS1', 'locationPoints', 'parserInput',
+                 'modulesCountX', 'modulesCountY', 'moduleSizeX', 'moduleSizeY', 'skew', 'iskanji',
+                 'barcodeWidth', 'barcodeHeight', 'pdfRows', 'pdfColumns', 'pdfIsTruncated', 'pdfECLevel',
+                 'pdfCodewords')
     
     def __init__(self):
         self.text = None
@@ -44,6 +155,7 @@ class MWResult:
         self.bytesLength = int(0)
         self.barcodeType = int(0)
         self.subtype = int(0)
+        self.barcodeSubtype = int(0)
         self.imageWidth = int(0)
         self.imageHeight = int(0)
         self.isGS1 = False
@@ -68,195 +180,229 @@ class MWResult:
     
         
     def setTypeName(self, barcodeType):
-        switcher = {
-            MWB.FOUND_25_INTERLEAVED: "Code 25 Interleaved",
-            MWB.FOUND_25_STANDARD: "Code 25 Standard",
-            MWB.FOUND_128: "Code 128",
-            MWB.FOUND_128_GS1: "Code 128 GS1",
-            MWB.FOUND_39: "Code 39",
-            MWB.FOUND_32: "Code 32",
-            MWB.FOUND_93: "Code 93",
-            MWB.FOUND_AZTEC: "AZTEC",
-            MWB.FOUND_DM: "Datamatrix",
-            MWB.FOUND_QR: "QR",
-            MWB.FOUND_EAN_13: "EAN 13",
-            MWB.FOUND_EAN_8: "EAN 8",
-            MWB.FOUND_NONE: "None",
-            MWB.FOUND_RSS_14: "Databar 14",
-            MWB.FOUND_RSS_14_STACK: "Databar 14 Stacked",
-            MWB.FOUND_RSS_EXP: "Databar Expanded",
-            MWB.FOUND_RSS_LIM: "Databar Limited",
-            MWB.FOUND_UPC_A: "UPC A",
-            MWB.FOUND_UPC_E: "UPC E",
-            MWB.FOUND_PDF: "PDF417",
-            MWB.FOUND_CODABAR: "Codabar",
-            MWB.FOUND_DOTCODE: "Dotcode",
-            MWB.FOUND_11: "Code 11",
-            MWB.FOUND_MSI: "MSI Plessey",
-            MWB.FOUND_25_IATA: "IATA Code 25",
-            MWB.FOUND_ITF14: "ITF 14",
-            MWB.FOUND_25_MATRIX: "Code 2/5 Matrix",
-            MWB.FOUND_25_COOP: "Code 2/5 COOP",
-            MWB.FOUND_25_INVERTED: "Code 2/5 Inverted",
-            MWB.FOUND_MAXICODE: "Maxicode",
-            MWB.FOUND_QR_MICRO: "Micro QR",
-            MWB.FOUND_POSTNET: "Postnet",
-            MWB.FOUND_PLANET: "Planet",
-            MWB.FOUND_IMB: "Intelligent mail",
-            MWB.FOUND_ROYALMAIL: "Royal mail",
-            MWB.FOUND_MICRO_PDF: "Micro PDF417",
-            MWB.FOUND_AUSTRALIAN: "Australian",
-            MWB.FOUND_TELEPEN: "Telepen"
-        }
-        self.typeName = switcher.get(barcodeType,"Unknown")
+        self.typeName = _TYPE_NAMES.get(barcodeType, "Unknown")
         return
+
+    # The result as a dict of JSON-serializable values (byte fields base64 encoded; location as the 8
+    # coordinates x1, y1, ... x4, y4; PDF417 fields only for PDF417 codes)
+    def toDict(self):
+        result = {
+            'type': self.barcodeType,
+            'typeName': self.typeName,
+            'subtype': self.barcodeSubtype,
+            'text': self.text,
+            'textEncoding': self.textEncoding,
+            'bytes': base64.b64encode(self.rawBytes).decode('ascii') if self.rawBytes is not None else None,
+            'isGS1': self.isGS1,
+            'location': list(self.locationPoints.coordinates) if self.locationPoints is not None else None,
+            'imageWidth': self.imageWidth,
+            'imageHeight': self.imageHeight,
+            'modulesCountX': self.modulesCountX,
+            'modulesCountY': self.modulesCountY,
+            'moduleSizeX': self.moduleSizeX,
+            'moduleSizeY': self.moduleSizeY,
+            'skew': self.skew,
+            'barcodeWidth': self.barcodeWidth,
+            'barcodeHeight': self.barcodeHeight,
+        }
+        if self.parserInput is not None:
+            result['parserInput'] = base64.b64encode(self.parserInput).decode('ascii')
+        if self.pdfRows:
+            result.update(pdfRows=self.pdfRows, pdfColumns=self.pdfColumns, pdfIsTruncated=self.pdfIsTruncated,
+                          pdfECLevel=self.pdfECLevel, pdfCodewords=self.pdfCodewords)
+        return result
         
         
+#
+# Field decoders
+#
+#  Each MWR field is decoded by a function taking the buffer (a memoryview of unsigned bytes), the position
+#  of the field's content and the content length. The struct formats are compiled once; integers and floats
+#  are stored in the native byte order, while the 2 byte content length is always little endian.
+#
+_UINT16 = struct.Struct('<H')
+_UINT32 = struct.Struct('=I')
+_FLOAT = struct.Struct('=f')
+_LOCATION = struct.Struct('=8f')
+
+def _decodeText(mv, pos, length):
+    return str(mv[pos:pos+length], 'utf-8')
+
+def _decodeBytes(mv, pos, length):
+    return bytes(mv[pos:pos+length])
+
+def _decodeInt(mv, pos, length):
+    if length == 4:
+        return _UINT32.unpack_from(mv, pos)[0]
+    return int.from_bytes(mv[pos:pos+length], sys.byteorder)
+
+def _decodeBool(mv, pos, length):
+    return _decodeInt(mv, pos, length) > 0
+
+def _decodeFloat(mv, pos, length):
+    return _FLOAT.unpack_from(mv, pos)[0]
+
+# Barcode location (4 points, as floating point pixel coordinates), all 8 floats in one unpack
+def _decodeLocation(mv, pos, length):
+    return MWLocation(_LOCATION.unpack_from(mv, pos))
+
+# PDF417 codewords: a list of 32-bit values, the first being the number of codewords that follow
+def _decodeCodewords(mv, pos, length):
+    return list(struct.unpack_from('=%dI' % (length // 4), mv, pos))
+
+# Field type -> (MWResult attribute, decoder)
+_FIELD_DECODERS = {
+    MWB.MWB_RESULT_FT_TEXT: ('text', _decodeText),
+    MWB.MWB_RESULT_FT_TEXT_ENCODING: ('textEncoding', _decodeText),
+    MWB.MWB_RESULT_FT_TYPE: ('barcodeType', _decodeInt),
+    MWB.MWB_RESULT_FT_SUBTYPE: ('barcodeSubtype', _decodeInt),
+    MWB.MWB_RESULT_FT_ISGS1: ('isGS1', _decodeBool),
+    MWB.MWB_RESULT_FT_IMAGE_WIDTH: ('imageWidth', _decodeInt),
+    MWB.MWB_RESULT_FT_IMAGE_HEIGHT: ('imageHeight', _decodeInt),
+    MWB.MWB_RESULT_FT_LOCATION: ('locationPoints', _decodeLocation),
+    MWB.MWB_RESULT_FT_BYTES: ('rawBytes', _decodeBytes),
+    MWB.MWB_RESULT_FT_PARSER_BYTES: ('parserInput', _decodeBytes),
+    MWB.MWB_RESULT_FT_MODULES_COUNT_X: ('modulesCountX', _decodeInt),
+    MWB.MWB_RESULT_FT_MODULES_COUNT_Y: ('modulesCountY', _decodeInt),
+    MWB.MWB_RESULT_FT_MODULE_SIZE_X: ('moduleSizeX', _decodeFloat),
+    MWB.MWB_RESULT_FT_MODULE_SIZE_Y: ('moduleSizeY', _decodeFloat),
+    MWB.MWB_RESULT_FT_SKEW: ('skew', _decodeFloat),
+    MWB.MWB_RESULT_FT_KANJI: ('iskanji', _decodeBool),
+    MWB.MWB_RESULT_FT_BARCODE_WIDTH: ('barcodeWidth', _decodeFloat),
+    MWB.MWB_RESULT_FT_BARCODE_HEIGHT: ('barcodeHeight', _decodeFloat),
+    MWB.MWB_RESULT_FT_PDF_ROWS: ('pdfRows', _decodeInt),
+    MWB.MWB_RESULT_FT_PDF_COLUMNS: ('pdfColumns', _decodeInt),
+    MWB.MWB_RESULT_FT_PDF_TRUNCATED: ('pdfIsTruncated', _decodeInt),
+    MWB.MWB_RESULT_FT_PDF_ECLEVEL: ('pdfECLevel', _decodeInt),
+    MWB.MWB_RESULT_FT_PDF_CODEWORDS: ('pdfCodewords', _decodeCodewords),
+}
+
+# Attribute -> field type, for the attributes decoded on demand by MWLazyResult
+_ATTRIBUTE_FIELDS = {decoder[0]: fieldType for fieldType, decoder in _FIELD_DECODERS.items()}
+
+# Attribute values of a result without any fields
+_EMPTY_RESULT = MWResult()
+_RESULT_DEFAULTS = {name: getattr(_EMPTY_RESULT, name) for name in MWResult.__slots__}
+
+# A plain MWResult with the given attribute values (unpickled MWLazyResult)
+def _decodedResult(values):
+    result = MWResult.__new__(MWResult)
+    for name, value in values.items():
+        setattr(result, name, value)
+    return result
+
+# MWLazyResult
+#
+# Result whose fields are decoded on first access. The MWResults lazy pass only records where each field's
+# content is in the buffer; reading an attribute decodes that one field (and caches it), so the cost of a
+# result scales with the fields actually used. The result keeps the MWR buffer alive.
+#
+# Pickling (e.g. passing the result to another process or a multiprocessing queue) decodes all the fields:
+# the copy is a plain MWResult, independent of the buffer.
+#
+class MWLazyResult(MWResult):
+    __slots__ = ('_buffer', '_fields')
+
+    def __init__(self, buffer, fields):
+        self._buffer = buffer
+        self._fields = fields
+
+    def __reduce__(self):
+        return _decodedResult, ({name: getattr(self, name) for name in MWResult.__slots__},)
+
+    # Only called for attributes that have not been decoded (or defaulted) yet
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        if name == 'typeName':
+            value = _TYPE_NAMES.get(self.barcodeType, "Unknown") if MWB.MWB_RESULT_FT_TYPE in self._fields else None
+        else:
+            fieldType = _ATTRIBUTE_FIELDS.get(name)
+            field = self._fields.get(fieldType)
+            if field is not None:
+                value = _FIELD_DECODERS[fieldType][1](self._buffer, field[0], field[1])
+            elif name in _RESULT_DEFAULTS:
+                value = _RESULT_DEFAULTS[name]
+            else:
+                raise AttributeError("'MWLazyResult' object has no attribute '" + name + "'")
+
+        setattr(self, name, value)
+        return value
+
 class MWResults:
     
-    def __init__(self, buffer):
+    # buffer may be the ctypes string buffer returned by the scan functions or any other bytes-like
+    # object holding an MWR structure (e.g. bytes received from a worker process). With lazy set, the
+    # results are MWLazyResult objects that decode their fields on first access from the buffer.
+    def __init__(self, buffer, lazy = False):
         self.version = 0
         self.count = 0
         self.results = []
         
+        mv = memoryview(buffer).cast('B')
+
         # First 3 characters of the buffer must be 'MWR'
-        if buffer.value[0] != ord('M') or buffer.value[1] != ord('W') or buffer.value[2] != ord('R'):
+        if len(mv) < 5 or mv[0:3] != b'MWR':
             return
     
         # 4th character is the structure version
-        self.version = ord(buffer[3])
+        self.version = mv[3]
         
         # 5th character is the number of results
-        self.count = ord(buffer[4])
+        self.count = mv[4]
         
         # The returned fields start at the 6th byte
-        pos = 5
+        if lazy:
+            self._indexResults(mv, 5)
+        else:
+            self._decodeResults(mv, 5)
+            mv.release()
+
+    # Each field consists of 5 values:
+    #    fieldType - 1 byte
+    #    fieldNameLength - 1 byte
+    #    fieldName - fieldNameLength bytes (not used/stored in the results class)
+    #    fieldContentLength - 2 bytes
+    #    content - fieldContentLenght bytes
+    def _decodeResults(self, mv, pos):
         for i in range(self.count):
             result = MWResult()
     
-            fieldCount = ord(buffer[pos])
+            fieldCount = mv[pos]
             pos += 1
             for f in range(fieldCount):
-                # Each field consists of 5 values:
-                #    fieldType - 1 byte
-                #    fieldNameLength - 1 byte
-                #    fieldName - fieldNameLength bytes
-                #    fieldContentLength - 2 bytes
-                #    content - fieldContentLenght bytes
-                fieldType = ord(buffer[pos])
-                fieldNameLength = ord(buffer[pos + 1])
-                fieldContentLength = (256 * (ord(buffer[pos + 3 + fieldNameLength]) & 0xFF)) + (ord(buffer[pos + 2 + fieldNameLength]) & 0xFF)
+                fieldType = mv[pos]
+                fieldNameLength = mv[pos + 1]
+                fieldContentLength = _UINT16.unpack_from(mv, pos + 2 + fieldNameLength)[0]
                 contentPos = pos + 4 + fieldNameLength
     
-                # Not actually used/stored in the results class
-                if fieldNameLength > 0:
-                    fieldName = buffer[pos+2:pos+2+fieldNameLength].decode("ascii")
-                    
-                # Barcode contents (as UTF8 string)
-                if fieldType == MWB.MWB_RESULT_FT_TEXT:
-                    result.text = buffer[contentPos:contentPos+fieldContentLength].decode("utf-8")
-            
-                # Text Encoding (currenlty only used by QR codes)
-                elif fieldType == MWB.MWB_RESULT_FT_TEXT_ENCODING:
-                    result.textEncoding = buffer[contentPos:contentPos+fieldContentLength].decode("utf-8")
-                    
-                # Barcode Type (symbology)
-                elif fieldType == MWB.MWB_RESULT_FT_TYPE:
-                    result.barcodeType = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
-                    result.setTypeName(result.barcodeType)
-            
-                # Barcode Subtype (symbology)
-                elif fieldType == MWB.MWB_RESULT_FT_SUBTYPE:
-                    result.barcodeSubtype = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
-            
-                # IsGs1 Code flag
-                elif fieldType == MWB.MWB_RESULT_FT_ISGS1:
-                    result.isGS1 = (int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder) > 0)
-
-                # Image width (pixels)
-                elif fieldType == MWB.MWB_RESULT_FT_IMAGE_WIDTH:
-                    result.imageWidth = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
-                
-                # Image height (pixels)
-                elif fieldType == MWB.MWB_RESULT_FT_IMAGE_HEIGHT:
-                    result.imageHeight = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
-
-                # Barcode location (4 points as floating point percentages)
-                elif fieldType == MWB.MWB_RESULT_FT_LOCATION:
-                    # Extract 8 floating point numbers
-                    locations = []
-                    for l in range(8):
-                        locations.append(struct.unpack('f', buffer[contentPos + l * 4:contentPos + l * 4 + 4])[0])
-                
-                    # Now convert to MWLocation points
-                    result.locationPoints = MWLocation(locations)
-                
-                # Barcode contents (raw bytes)
-                elif fieldType == MWB.MWB_RESULT_FT_BYTES:
-                    result.rawBytes = buffer[contentPos:contentPos+fieldContentLength]
-                
-                # Parser bytes (hex encoded string)
-                elif fieldType == MWB.MWB_RESULT_FT_PARSER_BYTES:
-                    result.parserInput = buffer[contentPos:contentPos+fieldContentLength]
-                
-                # Module count (X axis)
-                elif fieldType == MWB.MWB_RESULT_FT_MODULES_COUNT_X:
-                    result.modulesCountX = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
-                
-                # Module count (y axis)
-                elif fieldType == MWB.MWB_RESULT_FT_MODULES_COUNT_Y:
-                    result.modulesCount = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
-                
-                # Module size in pixels (x axis)
-                elif fieldType == MWB.MWB_RESULT_FT_MODULE_SIZE_X:
-                    result.moduleSizeX = struct.unpack('f', buffer[contentPos:contentPos+fieldContentLength])[0]
-                
-                # Module size in pixels (y axis)
-                elif fieldType == MWB.MWB_RESULT_FT_MODULE_SIZE_Y:
-                    result.moduleSizeY = struct.unpack('f', buffer[contentPos:contentPos+fieldContentLength])[0]
-
-                # Skew
-                elif fieldType == MWB.MWB_RESULT_FT_SKEW:
-                    result.skew = struct.unpack('f', buffer[contentPos:contentPos+fieldContentLength])[0]
-                
-                # Is Kanji Encoded flag (QR only)
-                elif fieldType == MWB.MWB_RESULT_FT_KANJI:
-                    result.kanji = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
-                
-                # Barcode width in pixels
-                elif fieldType == MWB.MWB_RESULT_FT_BARCODE_WIDTH:
-                    result.barcodeWidth = struct.unpack('f', buffer[contentPos:contentPos+fieldContentLength])[0]
-                
-                # Barcode height in pixels
-                elif fieldType == MWB.MWB_RESULT_FT_BARCODE_HEIGHT:
-                    result.barcodeHeight = struct.unpack('f', buffer[contentPos:contentPos+fieldContentLength])[0]
-                
-                # PDF417 only: number of data rows
-                elif fieldType == MWB.MWB_RESULT_FT_PDF_ROWS:
-                    result.pdfRows = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
-                
-                # PDF417 only: number of data columns
-                elif fieldType == MWB.MWB_RESULT_FT_PDF_COLUMNS:
-                    result.pdfColumns = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
-                
-                # PDF417 only: Is Truncated flag
-                elif fieldType == MWB.MWB_RESULT_FT_PDF_TRUNCATED:
-                    result.pdfTruncated = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
-                
-                # PDF417 only: ECC Level
-                elif fieldType == MWB.MWB_RESULT_FT_PDF_ECLEVEL:
-                    result.pdfECLevel = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
-                
-                # PDF417 only: Codewords
-                elif fieldType == MWB.MWB_RESULT_FT_PDF_CODEWORDS:
-                    listLength = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
-                    result.pdfCodewords = int[listLength+1]
-                    result.pdfCodewords[0] = listLength
-                
-                    for l in range(listLength):
-                        result.pdfCodewords[l+1] = int.from_bytes(buffer[contentPos + l * 4:contentPos + l * 4 + 4],sys.byteorder)
+                decoder = _FIELD_DECODERS.get(fieldType)
+                if decoder is not None:
+                    setattr(result, decoder[0], decoder[1](mv, contentPos, fieldContentLength))
+                    if fieldType == MWB.MWB_RESULT_FT_TYPE:
+                        result.setTypeName(result.barcodeType)
                         
-                pos += (fieldNameLength + fieldContentLength + 4)
+                pos = contentPos + fieldContentLength
     
             self.results.append(result)
-        
\ No newline at end of file
+
+    # Lazy pass: only record the content position and length of each field
+    def _indexResults(self, mv, pos):
+        for i in range(self.count):
+            fields = {}
+    
+            fieldCount = mv[pos]
+            pos += 1
+            for f in range(fieldCount):
+                fieldNameLength = mv[pos + 1]
+                contentPos = pos + 4 + fieldNameLength
+                fieldContentLength = _UINT16.unpack_from(mv, contentPos - 2)[0]
+                fields[mv[pos]] = (contentPos, fieldContentLength)
+                pos = contentPos + fieldContentLength
+    
+            self.results.append(MWLazyResult(mv, fields))
+
+    # The results as a dict of JSON-serializable values (see MWResult.toDict)
+    def toDict(self):
+        return {'version': self.version, 'count': self.count, 'results': [result.toDict() for result in self.results]}
@@ -0,0 +1,169 @@
+#
+# File      MWResultBatch.py
+#
+# Brief     Columnar storage for the decoded results of many scans
+#
+# Details   MWResultBatch appends the results of many MWResults objects into typed arrays (one array per
+#           field) instead of keeping millions of MWResult objects around. Text and raw bytes use an
+#           offsets + blob layout (the same layout Arrow uses for variable length data), so a whole
+#           shift's worth of scans can be exported to NumPy or Arrow without touching each result again:
+#
+#               batch = MWResultBatch()
+#               batch.append(MWR.MWResults(scanResults))
+#               ...
+#               columns = batch.toNumpy()
+#               counts = numpy.bincount(columns['barcodeType'])
+#
+#           NumPy and pyarrow are optional; they are only needed for toNumpy() and toArrow() respectively.
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Fixed width columns (int32 and float32)
+_INT_COLUMNS = ('scanIndex', 'barcodeType', 'barcodeSubtype', 'imageWidth', 'imageHeight',
+                'modulesCountX', 'modulesCountY')
+_FLOAT_COLUMNS = ('moduleSizeX', 'moduleSizeY', 'skew', 'barcodeWidth', 'barcodeHeight')
+
+# Arrow type of the fixed width columns, by array type code
+_ARROW_TYPES = {'i': 'int32', 'f': 'float32', 'b': 'int8'}
+
+# Location of results without one (NaN, which can not clash with a real pixel coordinate)
+_NO_LOCATION = array('f', [float('nan')] * 8)
+
+class MWResultBatch:
+
+    def __init__(self):
+        self.scanCount = 0
+        self.columns = {}
+        for name in _INT_COLUMNS:
+            self.columns[name] = array('i')
+        for name in _FLOAT_COLUMNS:
+            self.columns[name] = array('f')
+        self.columns['isGS1'] = array('b')
+
+        # 8 floats per result (x1, y1, ... x4, y4)
+        self.locations = array('f')
+
+        # Result i's text is textData[textOffsets[i]:textOffsets[i+1]] (UTF-8), likewise for raw bytes
+        self.textOffsets = array('q', [0])
+        self.textData = bytearray()
+        self.bytesOffsets = array('q', [0])
+        self.bytesData = bytearray()
+
+    def __len__(self):
+        return len(self.textOffsets) - 1
+
+    # Append the results of one scan (an MWResults object, or any list of MWResult objects); the results
+    # are tagged with the index of the scan in the scanIndex column. Raises BufferError, leaving the batch
+    # as it was, while arrays exported by toNumpy() are alive.
+    def append(self, results):
+        if hasattr(results, 'results'):
+            results = results.results
+
+        # Gather the new rows first, then extend each column in one call
+        scanIndex = self.scanCount
+        columns = {name: array(column.typecode) for name, column in self.columns.items()}
+        locations = array('f')
+        textOffsets = array('q')
+        textData = bytearray()
+        bytesOffsets = array('q')
+        bytesData = bytearray()
+
+        for result in results:
+            columns['scanIndex'].append(scanIndex)
+            for name in _INT_COLUMNS[1:]:
+                columns[name].append(getattr(result, name))
+            for name in _FLOAT_COLUMNS:
+                columns[name].append(getattr(result, name))
+            columns['isGS1'].append(1 if result.isGS1 else 0)
+
+            location = result.locationPoints
+            locations.extend(location.coordinates if location is not None else _NO_LOCATION)
+
+            if result.text is not None:
+                textData += result.text.encode('utf-8')
+            textOffsets.append(len(self.textData) + len(textData))
+
+            if result.rawBytes is not None:
+                bytesData += result.rawBytes
+            bytesOffsets.append(len(self.bytesData) + len(bytesData))
+
+        additions = [(self.columns[name], column) for name, column in columns.items()]
+        additions += [(self.locations, locations), (self.textOffsets, textOffsets), (self.textData, textData),
+                      (self.bytesOffsets, bytesOffsets), (self.bytesData, bytesData)]
+        extended = []
+        try:
+            for target, added in additions:
+                target.extend(added)
+                extended.append((target, len(added)))
+        except BufferError:
+            # Take back what was added to the columns that are not exported
+            for target, count in extended:
+                del target[len(target) - count:]
+            raise
+        self.scanCount += 1
+
+    def extend(self, scans):
+        for results in scans:
+            self.append(results)
+
+    def text(self, index):
+        return self.textData[self.textOffsets[index]:self.textOffsets[index + 1]].decode('utf-8')
+
+    def rawBytes(self, index):
+        return bytes(self.bytesData[self.bytesOffsets[index]:self.bytesOffsets[index + 1]])
+
+    # Export all columns as NumPy arrays. The arrays are views of the batch's storage (no copy), so the batch
+    # can not be appended to (BufferError) while they are alive. locations has shape (n, 8).
+    def toNumpy(self):
+        if np is None:
+            raise ImportError('MWResultBatch.toNumpy() requires numpy')
+
+        exported = {}
+        for name, column in self.columns.items():
+            exported[name] = np.frombuffer(column, dtype=column.typecode)
+        exported['isGS1'] = exported['isGS1'].astype(bool)
+        exported['locations'] = np.frombuffer(self.locations, dtype=np.float32).reshape(-1, 8)
+        exported['textOffsets'] = np.frombuffer(self.textOffsets, dtype=np.int64)
+        exported['textData'] = np.frombuffer(self.textData, dtype=np.uint8)
+        exported['bytesOffsets'] = np.frombuffer(self.bytesOffsets, dtype=np.int64)
+        exported['bytesData'] = np.frombuffer(self.bytesData, dtype=np.uint8)
+        return exported
+
+    # Export the columns as Arrow-compatible buffers: name -> (arrow type, offsets buffer, data buffer).
+    # Fixed width columns have no offsets buffer; text/rawBytes use 64-bit offsets (large_string and
+    # large_binary), and locations is a fixed size list of 8 float32 values.
+    def toArrowBuffers(self):
+        buffers = {}
+        for name, column in self.columns.items():
+            buffers[name] = (_ARROW_TYPES[column.typecode], None, memoryview(column))
+        buffers['locations'] = ('fixed_size_list<float32>[8]', None, memoryview(self.locations))
+        buffers['text'] = ('large_string', memoryview(self.textOffsets), memoryview(self.textData))
+        buffers['rawBytes'] = ('large_binary', memoryview(self.bytesOffsets), memoryview(self.bytesData))
+        return buffers
+
+    # Build a pyarrow.Table from the Arrow-compatible buffers (requires pyarrow); as with toNumpy(), the
+    # fixed width columns share the batch's storage
+    def toArrow(self):
+        import pyarrow as pa
+
+        count = len(self)
+        arrays = {}
+        for name, column in self.columns.items():
+            arrowType = getattr(pa, _ARROW_TYPES[column.typecode])()
+            arrays[name] = pa.Array.from_buffers(arrowType, count, [None, pa.py_buffer(column)])
+        arrays['isGS1'] = arrays['isGS1'].cast(pa.bool_())
+        points = pa.Array.from_buffers(pa.float32(), count * 8, [None, pa.py_buffer(self.locations)])
+        arrays['locations'] = pa.FixedSizeListArray.from_arrays(points, 8)
+        arrays['text'] = pa.Array.from_buffers(pa.large_string(), count,
+                                               [None, pa.py_buffer(self.textOffsets), pa.py_buffer(bytes(self.textData))])
+        arrays['rawBytes'] = pa.Array.from_buffers(pa.large_binary(), count,
+                                                   [None, pa.py_buffer(self.bytesOffsets), pa.py_buffer(bytes(self.bytesData))])
+        return pa.table(arrays)
@@ -0,0 +1,166 @@
+#
+# File      RawFrames.py
+#
+# Brief     Memory-mapped 8-bit grayscale input: raw frame dumps and binary PGM files
+#
+# Details   Cameras (line-scan cameras in particular) often dump their frames as raw 8-bit grayscale pixels,
+#           one frame after the other, optionally after a file header and with a header before each frame.
+#           These files need no decoding: RawFrames maps the file (mmap) and passes each frame's pixels to
+#           MWBscanGrayscaleImage/MWBscanGrayscaleRegions as a view of the mapping, so the decoder reads them
+#           straight from the page cache, without loading or copying the file. Large capture dumps are read
+#           at disk speed, and only the pages being scanned need to be in memory.
+#
+#           Binary PGM files (P5, up to 255 gray levels) carry their own dimensions; several PGM images may be
+#           concatenated in one file. Raw files need the frame dimensions:
+#
+#               for frame in openFrames("capture.raw", 2048, 1024, header=512):
+#                   pixels, width, height = loadGrayscale(frame)
+#                   resultLen, scanResults = MWB.MWBscanGrayscaleImage(pixels, width, height)
+#
+#           RawFrame objects are small and picklable: ScannerPool worker processes map the file themselves and
+#           scan the frame in place.
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+
+import mmap
+import threading
+import collections
+
+import ImageLoader
+
+# File extensions of the files read as raw frames (or binary PGM)
+RAW_EXTENSIONS = ('.raw', '.gray', '.pgm')
+
+# A frame of a raw or PGM file: width * height grayscale pixels at offset. index is the frame's number in
+# the file, of count frames.
+class RawFrame:
+    __slots__ = ('fileName', 'width', 'height', 'offset', 'index', 'count')
+
+    def __init__(self, fileName, width, height, offset = 0, index = 0, count = 1):
+        self.fileName = fileName
+        self.width = width
+        self.height = height
+        self.offset = offset
+        self.index = index
+        self.count = count
+
+    def __getstate__(self):
+        return (self.fileName, self.width, self.height, self.offset, self.index, self.count)
+
+    def __setstate__(self, state):
+        self.fileName, self.width, self.height, self.offset, self.index, self.count = state
+
+    def __repr__(self):
+        return "RawFrame(%r, %d, %d, %d, %d, %d)" % (self.fileName, self.width, self.height, self.offset, self.index, self.count)
+
+    # The file name, with the frame number for files holding several frames
+    def __str__(self):
+        return self.fileName if self.count == 1 else self.fileName + "[" + str(self.index) + "]"
+
+# Files mapped by this process, most recently used last (a few are kept mapped, for the frames that follow)
+_mappings = collections.OrderedDict()
+_mappingsLock = threading.Lock()
+_MAPPINGS_MAX = 8
+
+# Map a file (read-only), or return its existing mapping
+def mapFile(fileName):
+    with _mappingsLock:
+        mapping = _mappings.pop(fileName, None)
+        if mapping is None:
+            with open(fileName, 'rb') as file:
+                try:
+                    mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    raise ValueError(fileName + " is empty")
+            # The frames are mostly read in order: let the kernel read ahead
+            if hasattr(mapping, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mapping.madvise(mmap.MADV_SEQUENTIAL)
+        _mappings[fileName] = mapping
+
+        # Unmap the least recently used files, except those with frames still in use
+        for name in list(_mappings)[0:max(0, len(_mappings) - _MAPPINGS_MAX)]:
+            try:
+                _mappings[name].close()
+                del _mappings[name]
+            except BufferError:
+                pass
+        return mapping
+
+# Parse the header of the binary PGM image at pos. Returns (width, height, maxValue, pixel offset).
+def _pgmHeader(mapping, pos):
+    if mapping[pos:pos + 2] != b'P5':
+        raise ValueError("not a binary PGM image (P5)")
+
+    values = []
+    i = pos + 2
+    while len(values) < 3:
+        c = mapping[i:i + 1]
+        if c == b'':
+            raise ValueError("truncated PGM header")
+        if c == b'#':
+            end = mapping.find(b'\n', i)
+            i = len(mapping) if end < 0 else end + 1
+        elif c.isspace():
+            i += 1
+        elif c.isdigit():
+            start = i
+            while mapping[i:i + 1].isdigit():
+                i += 1
+            values.append(int(mapping[start:i]))
+        else:
+            raise ValueError("invalid PGM header")
+
+    # A single whitespace character separates the header from the pixels
+    return values[0], values[1], values[2], i + 1
+
+# openFrames
+#
+# List the frames of a binary PGM file (one or more concatenated images), or of a raw file of frames of
+# width * height pixels, after a file header of 'header' bytes and each preceded by 'frameHeader' bytes. An
+# incomplete frame at the end of a raw file (e.g. a capture that was cut off) is ignored. Raises ValueError
+# for files that cannot be read this way (ASCII or 16-bit PGM, a raw file without dimensions).
+#
+def openFrames(fileName, width = None, height = None, header = 0, frameHeader = 0):
+    mapping = mapFile(fileName)
+
+    if mapping[0:2] == b'P5':
+        frames = []
+        pos = 0
+        while pos < len(mapping) - 1 and mapping[pos:pos + 2] == b'P5':
+            frameWidth, frameHeight, maxValue, offset = _pgmHeader(mapping, pos)
+            if maxValue > 255:
+                raise ValueError(fileName + ": 16-bit PGM images are not supported")
+            if offset + frameWidth * frameHeight > len(mapping):
+                break
+            frames.append(RawFrame(fileName, frameWidth, frameHeight, offset, len(frames)))
+            pos = offset + frameWidth * frameHeight
+            while pos < len(mapping) and mapping[pos:pos + 1].isspace():
+                pos += 1
+    else:
+        if mapping[0:1] == b'P' and fileName.lower().endswith('.pgm'):
+            raise ValueError(fileName + ": only binary PGM images (P5) can be mapped")
+        if not width or not height:
+            raise ValueError(fileName + ": the frame width and height of raw files must be given")
+        frameSize = frameHeader + width * height
+        frames = [RawFrame(fileName, width, height, header + i * frameSize + frameHeader, i)
+                  for i in range(max(0, (len(mapping) - header) // frameSize))]
+
+    for frame in frames:
+        frame.count = len(frames)
+    return frames
+
+# The pixels of a frame, as a view of the file's mapping (no copy). Release the view (or drop it) when done;
+# the file stays mapped while views of it exist.
+def framePixels(frame):
+    return memoryview(mapFile(frame.fileName))[frame.offset:frame.offset + frame.width * frame.height]
+
+# loadGrayscale
+#
+# As ImageLoader.loadGrayscale, also accepting a RawFrame, whose pixels are returned as a view of the
+# mapped file.
+#
+def loadGrayscale(image):
+    if isinstance(image, RawFrame):
+        return framePixels(image), image.width, image.height
+    return ImageLoader.loadGrayscale(image)
@@ -0,0 +1,123 @@
+#
+# File      RoiDetector.py
+#
+# Brief     Cheap region-of-interest pre-detection before decoding
+#
+# Details   Barcodes are areas of dense, high-contrast edges; most backgrounds (pallets, paper, walls) are
+#           not. RoiDetector measures the gradient energy of a downsampled copy of the image on a coarse grid
+#           of cells (NumPy-vectorized, typically well under a millisecond per megapixel), then turns the
+#           connected groups of high-energy cells into a few percentage rectangles:
+#
+#               detector = RoiDetector()
+#               regionSet = detector.detect(pixels, width, height)      # MWRegions.RegionSet, or None
+#               resultLen, scanResults = detector.scan(pixels, width, height, maxThreads)
+#
+#           The rectangles are either scanned as regions (MWBscanGrayscaleRegions), or merged into a single
+#           rectangle for MWBsetScanningRect (see scanningRect). When nothing stands out, or the candidates
+#           cover most of the image anyway, the image is scanned in full as before.
+#
+#           The pre-detection only pays off when the candidates are right: optionally (fallback), the full
+#           image is scanned as well when the regions yield nothing, so that a missed candidate costs time
+#           rather than barcodes, but every miss then costs the detection, the region scan and a full scan,
+#           more than the full scan alone. benchRoi.py measures both on your images.
+#
+#           Requires NumPy.
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+
+import numpy as np
+
+import BarcodeScanner as MWB
+import MWRegions
+
+class RoiDetector:
+
+    # cells       - grid resolution (cells x cells over the image)
+    # maxSize     - the image is subsampled to at most this many pixels wide/high before measuring
+    # threshold   - fraction of the busiest cell's energy for a cell to be a candidate
+    # minEnergy   - minimum mean gradient (gray levels per pixel) of a candidate cell, so that flat or
+    #               noise-only images produce no candidates
+    # margin      - percentage added around each candidate area (quiet zones, edges of the code)
+    # maxRegions  - maximum number of regions (the highest energy areas are kept)
+    # maxCoverage - scan the full image when the regions would cover more than this fraction of it
+    # fallback    - rescan the full image when the regions find nothing (no missed codes, but images
+    #               without any code are scanned twice, and a miss costs more than a full scan)
+    def __init__(self, cells = 24, maxSize = 512, threshold = 0.25, minEnergy = 8.0, margin = 4.0,
+                 maxRegions = 6, maxCoverage = 0.6, fallback = False):
+        self.cells = cells
+        self.maxSize = maxSize
+        self.threshold = threshold
+        self.minEnergy = minEnergy
+        self.margin = margin
+        self.maxRegions = maxRegions
+        self.maxCoverage = maxCoverage
+        self.fallback = fallback
+
+    # Mean gradient energy per cell, as a (rows x columns) float32 array: cells x cells, or fewer cells for
+    # images smaller than the grid (after subsampling), so that each cell averages at least one pixel. None
+    # if the image is too thin to measure (e.g. a single line-scan line).
+    def energy(self, pixels, width, height):
+        image = np.frombuffer(pixels, dtype=np.uint8, count=width * height).reshape(height, width)
+
+        # Subsample (strided view, no copy) to bound the work for large images
+        step = max(1, -(-max(width, height) // self.maxSize))
+        image = image[::step, ::step].astype(np.int16)
+
+        gradient = np.abs(np.diff(image, axis=1))[:-1, :] + np.abs(np.diff(image, axis=0))[:, :-1]
+        if gradient.size == 0:
+            return None
+
+        # Mean per cell (cell boundaries rounded to whole pixels)
+        rows = np.linspace(0, gradient.shape[0], min(self.cells, gradient.shape[0]) + 1).astype(np.intp)
+        columns = np.linspace(0, gradient.shape[1], min(self.cells, gradient.shape[1]) + 1).astype(np.intp)
+        sums = np.add.reduceat(np.add.reduceat(gradient, rows[:-1], axis=0, dtype=np.int64), columns[:-1], axis=1)
+        counts = np.outer(np.diff(rows), np.diff(columns))
+        return (sums / np.maximum(counts, 1)).astype(np.float32)
+
+    # The candidate regions as an MWRegions.RegionSet, or None if the full image should be scanned
+    def detect(self, pixels, width, height):
+        energy = self.energy(pixels, width, height)
+        if energy is None:
+            return None
+        limit = max(float(energy.max()) * self.threshold, self.minEnergy)
+        hot = energy > limit
+        if not hot.any():
+            return None
+
+        rows, columns = energy.shape
+        areas = MWRegions.connectedAreas(hot.ravel().tolist(), energy.ravel().tolist(), columns, rows)
+        regionSet = MWRegions.areaRegions(areas, columns, rows, self.margin, self.maxRegions)
+
+        coverage = 0.0
+        for i in range(regionSet.count):
+            left, top, regionWidth, regionHeight = regionSet.region(i)
+            coverage += regionWidth * regionHeight / 10000.0
+        if coverage > self.maxCoverage:
+            return None
+        return regionSet
+
+    # The bounding rectangle of all candidates as (left, top, width, height) percentages for
+    # MWBsetScanningRect, or None if the full image should be scanned
+    def scanningRect(self, pixels, width, height):
+        regionSet = self.detect(pixels, width, height)
+        if regionSet is None:
+            return None
+
+        regions = [regionSet.region(i) for i in range(regionSet.count)]
+        left = min(r[0] for r in regions)
+        top = min(r[1] for r in regions)
+        right = max(r[0] + r[2] for r in regions)
+        bottom = max(r[1] + r[3] for r in regions)
+        return left, top, right - left, bottom - top
+
+    # Scan the candidate regions of an image (the full image if there are none, or with fallback if the
+    # regions find nothing). Returns (resultLen,
+    # scanResults) as MWB.MWBscanGrayscaleImage.
+    def scan(self, pixels, width, height, maxThreads):
+        regionSet = self.detect(pixels, width, height)
+        if regionSet is not None:
+            resultLen, scanResults = regionSet.scan(pixels, width, height, maxThreads)
+            if resultLen > 0 or not self.fallback:
+                return resultLen, scanResults
+        return MWB.MWBscanGrayscaleImage(pixels, width, height)
@@ -0,0 +1,220 @@
+#
+# File      ScanPipeline.py
+#
+# Brief     Streaming pipeline overlapping image loading and barcode decoding
+#
+# Details   Loading an image (disk I/O, JPEG decoding and the grayscale conversion) often takes as long as
+#           decoding its barcodes. ScanPipeline runs the two as separate stages connected by bounded queues:
+#
+#               images -> [load queue] -> loader threads -> [scan queue] -> scanner threads -> results
+#
+#           Pillow releases the GIL while decoding images and ctypes releases it during the library call,
+#           so the stages overlap. The queue depths bound the memory in use (decoded images waiting to be
+#           scanned) and provide backpressure: when the scanners fall behind, the loaders block, and when the
+#           consumer falls behind, the scanners block.
+#
+#           The library must be configured in this process before running the pipeline (all scanner threads
+#           share its configuration). Use a single scanner thread unless the library is known to be reentrant
+#           for your configuration (see ScannerPool.py).
+#
+#               pipeline = ScanPipeline(loadWorkers=4, loadDepth=16, scanDepth=4)
+#               for item in pipeline.run(glob.glob('*.jpg')):
+#                   print(item.image, item.results.count, item.loadTime, item.scanTime)
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+
+import time
+import queue
+import threading
+
+import BarcodeScanner as MWB
+import MWResult as MWR
+import ImageLoader
+
+class PipelineResult:
+    __slots__ = ('index', 'image', 'resultLen', 'results', 'loadTime', 'scanTime', 'error')
+
+    def __init__(self, index, image):
+        self.index = index
+        self.image = image
+        self.resultLen = 0
+        self.results = None
+        self.loadTime = 0.0
+        self.scanTime = 0.0
+        self.error = None
+
+class ScanPipeline:
+
+    # loader      - function returning (pixels, width, height) for an image (default ImageLoader.loadGrayscale)
+    # loadWorkers - number of loader threads
+    # scanWorkers - number of scanner threads
+    # loadDepth   - maximum images waiting to be loaded
+    # scanDepth   - maximum loaded images waiting to be scanned
+    # regions     - optional (regionData, regionCount, maxThreads) to scan with MWBscanGrayscaleRegions
+    # lazy        - decode the results lazily (see MWResult.MWResults)
+    # scanner     - optional function (pixels, width, height) -> (resultLen, scanResults) used to scan instead,
+    #               e.g. EffortScheduler.scan
+    # release     - optional function called with each loaded (pixels, width, height) once the pipeline is
+    #               done with it: scanned (or failed), or dropped when the pipeline stops early. E.g. to
+    #               return a SharedFrameRing slot taken by the loader.
+    def __init__(self, loader = None, loadWorkers = 4, scanWorkers = 1, loadDepth = 8, scanDepth = 4,
+                 regions = None, lazy = False, scanner = None, release = None):
+        self.loader = loader or ImageLoader.loadGrayscale
+        self.loadWorkers = loadWorkers
+        self.scanWorkers = scanWorkers
+        self.loadDepth = loadDepth
+        self.scanDepth = scanDepth
+        self.regions = regions
+        self.lazy = lazy
+        self.scanner = scanner
+        self.release = release
+
+    # Run the pipeline over the images, yielding a PipelineResult per image (in completion order, or in input
+    # order if ordered is set). Load or scan errors are reported in PipelineResult.error rather than raised;
+    # an error of the images iterable itself is raised once the images before it are done. Closing the
+    # generator early stops all the stages.
+    def run(self, images, ordered = False):
+        loadQueue = queue.Queue(self.loadDepth)
+        scanQueue = queue.Queue(self.scanDepth)
+        outputQueue = queue.Queue(self.scanWorkers * 2)
+        stopped = threading.Event()
+        activeLoaders = [self.loadWorkers]
+        lock = threading.Lock()
+        feedError = [None]
+
+        def put(q, item):
+            while not stopped.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def get(q):
+            while not stopped.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            return None
+
+        def done(image):
+            if image is not None and self.release is not None:
+                self.release(image)
+
+        # Release the loaded images left in the scan queue once the pipeline is stopped
+        def drop():
+            while True:
+                try:
+                    entry = scanQueue.get_nowait()
+                except queue.Empty:
+                    return
+                if entry is not None:
+                    done(entry[1])
+
+        def feed():
+            try:
+                for index, image in enumerate(images):
+                    if not put(loadQueue, PipelineResult(index, image)):
+                        return
+            except BaseException as e:
+                feedError[0] = e
+            finally:
+                # Always tell the loaders, so the images fed so far are finished
+                for i in range(self.loadWorkers):
+                    put(loadQueue, None)
+
+        def load():
+            while True:
+                item = get(loadQueue)
+                if item is None:
+                    break
+                starTime = time.perf_counter()
+                try:
+                    image = self.loader(item.image)
+                except Exception as e:
+                    item.error = e
+                    image = None
+                item.loadTime = (time.perf_counter() - starTime) * 1000
+                if not put(scanQueue, (item, image)):
+                    done(image)
+                    drop()
+                    return
+
+            if stopped.is_set():
+                drop()
+                return
+
+            # The last loader to finish tells the scanners
+            with lock:
+                activeLoaders[0] -= 1
+                last = activeLoaders[0] == 0
+            if last:
+                for i in range(self.scanWorkers):
+                    put(scanQueue, None)
+
+        def scan():
+            while True:
+                entry = get(scanQueue)
+                if entry is None:
+                    if stopped.is_set():
+                        drop()
+                        return
+                    break
+                item, image = entry
+                if image is not None:
+                    pixels, width, height = image
+                    starTime = time.perf_counter()
+                    try:
+                        if self.scanner is not None:
+                            item.resultLen, scanResults = self.scanner(pixels, width, height)
+                        elif self.regions is not None:
+                            item.resultLen, scanResults = MWB.MWBscanGrayscaleRegions(pixels, width, height, *self.regions)
+                        else:
+                            item.resultLen, scanResults = MWB.MWBscanGrayscaleImage(pixels, width, height)
+                        item.results = MWR.MWResults(scanResults, lazy=self.lazy)
+                    except Exception as e:
+                        item.error = e
+                    item.scanTime = (time.perf_counter() - starTime) * 1000
+
+                # Don't hold on to the image while waiting for the consumer
+                done(image)
+                entry = image = pixels = None
+                if not put(outputQueue, item):
+                    return
+            put(outputQueue, None)
+
+        threads = [threading.Thread(target=feed, daemon=True)]
+        threads += [threading.Thread(target=load, daemon=True) for i in range(self.loadWorkers)]
+        threads += [threading.Thread(target=scan, daemon=True) for i in range(self.scanWorkers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            finished = 0
+            nextIndex = 0
+            waiting = {}
+            while finished < self.scanWorkers:
+                item = get(outputQueue)
+                if item is None:
+                    if stopped.is_set():
+                        break
+                    finished += 1
+                    continue
+                if not ordered:
+                    yield item
+                    continue
+
+                # Hold results back until all the earlier images are done
+                waiting[item.index] = item
+                while nextIndex in waiting:
+                    yield waiting.pop(nextIndex)
+                    nextIndex += 1
+
+            if feedError[0] is not None:
+                raise feedError[0]
+        finally:
+            stopped.set()
+            drop()
@@ -0,0 +1,306 @@
+#!/usr/bin/python3
+#
+# File      ScanServer.py
+# Brief     Long-running local scan server with warm decoders
+#
+# Details   Starting a process to scan an image loads the barcode scanner library, registers the SDK and
+#           applies the configuration, which costs hundreds of milliseconds before the first image is even
+#           decoded. ScanServer does this once: it keeps a ScannerPool of configured decoder processes (or
+#           threads) and serves scan requests over a Unix domain socket or a localhost HTTP port. The requests
+#           are HTTP/1.1 with keep-alive, so a client pays only for the request itself (see scanClient.py):
+#
+#               POST /scan      {"path": "/images/code.jpg"}                        image file, loaded by the worker
+#               POST /scan      {"shm": name, "width": w, "height": h, "offset": 0} grayscale pixels in shared memory
+#               POST /scan?width=w&height=h                                         grayscale pixels in the body
+#                               (Content-Type: application/octet-stream)
+#               GET  /status
+#
+#           Scan replies are the MWResults as JSON (see MWResult.toDict), with the decoder's resultLen and the
+#           worker's scanTime (ms). Errors are replied as {"error": message} with status 400 (bad request) or
+#           500.
+#
+#           The server reads image files and shared memory by name on behalf of its clients: it only listens
+#           locally (a Unix domain socket, or 127.0.0.1), and should run as a user allowed to read the images.
+#
+#           usage: ScanServer [-Cfile] [-En] [-Bn | -Nn] [-Uaddress] [-S]
+#
+#               -Cfile      Decoder configuration file (JSON or TOML, see DecoderConfig.py), applied on top of the
+#                           defaults of pythonDemo.py (DEFAULT_CONFIG)
+#               -En         Effort level (1-5), overriding the configuration's
+#               -Bn         Number of decoder processes (default: number of CPUs)
+#               -Nn         Decode in n threads of the server process instead of worker processes
+#               -Uaddress   Unix domain socket to listen on (default: scanServer.sock in the temp directory), or the
+#                           [127.0.0.1:]port of a localhost HTTP port to listen on instead
+#               -S          Suppress the request log
+#
+#           The option letters mean the same as in the other demos: -B worker processes and -N decoder threads
+#           as in pythonDemo.py and liveDecode.py, -S suppressed output, and -U the server address as in
+#           scanClient.py.
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+import os
+import sys
+import json
+import stat
+import time
+import socket
+import threading
+import socketserver
+import http.server
+from urllib.parse import urlsplit, parse_qs
+
+import BarcodeScanner as MWB
+import MWResult as MWR
+import ImageLoader
+from DecoderConfig import DecoderConfig
+from ScannerPool import ScannerPool, SharedImage
+from scanClient import DEFAULT_SOCKET, DEFAULT_PORT, parseAddress
+
+# The configuration pythonDemo.py scans with, so that scanClient.py gives the same results by default
+DEFAULT_CONFIG = DecoderConfig(registrationKey=b'<your key here>',
+                               activeCodes=MWB.MWB_CODE_MASK_DM,
+                               direction=MWB.MWB_SCANDIRECTION_HORIZONTAL | MWB.MWB_SCANDIRECTION_VERTICAL,
+                               level=4,
+                               resultType=MWB.MWB_RESULT_TYPE_MW)
+
+class _ScanHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "ScanServer/1.0"
+
+    def setup(self):
+        super().setup()
+        # Small requests and replies on a kept alive connection: do not wait to coalesce them
+        if self.connection.family != getattr(socket, 'AF_UNIX', None):
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def address_string(self):
+        return "local" if isinstance(self.client_address, (str, bytes)) else self.client_address[0]
+
+    def log_message(self, format, *args):
+        if self.server.scanServer.verbose:
+            super().log_message(format, *args)
+
+    def _reply(self, status, document):
+        body = json.dumps(document).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlsplit(self.path).path == "/status":
+            self._reply(200, self.server.scanServer.status())
+        else:
+            self._reply(404, {'error': "unknown path " + self.path})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if url.path != "/scan":
+            self._reply(404, {'error': "unknown path " + self.path})
+            return
+
+        try:
+            if self.headers.get("Content-Type", "").startswith("application/octet-stream"):
+                query = parse_qs(url.query)
+                width = int(query['width'][0])
+                height = int(query['height'][0])
+                if len(body) < width * height:
+                    raise ValueError("expected " + str(width * height) + " bytes of pixels, got " + str(len(body)))
+                image = (body, width, height)
+            else:
+                request = json.loads(body)
+                if 'path' in request:
+                    image = str(request['path'])
+                elif 'shm' in request:
+                    image = SharedImage(str(request['shm']), int(request['width']), int(request['height']),
+                                        int(request.get('offset', 0)))
+                else:
+                    raise ValueError("request needs a 'path' or 'shm'")
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, {'error': "bad request: " + str(e)})
+            return
+
+        try:
+            self._reply(200, self.server.scanServer.scan(image))
+        except (OSError, ValueError) as e:
+            self._reply(400, {'error': str(e)})
+        except Exception as e:
+            self._reply(500, {'error': repr(e)})
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+# Remove the socket left at path by a server that is no longer running. Raises FileExistsError if path is
+# not a socket, or if a server still answers on it.
+def removeStaleSocket(path):
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(path + " exists and is not a socket")
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        pass
+    else:
+        raise FileExistsError("a server is already listening on " + path)
+    finally:
+        probe.close()
+    os.unlink(path)
+
+class ScanServer:
+
+    # config     - DecoderConfig or dict applied to the decoders (see ScannerPool.configureScanner; default
+    #              DEFAULT_CONFIG)
+    # workers    - number of decoder processes/threads (default: number of CPUs)
+    # mode       - 'process' or 'thread' (see ScannerPool.py)
+    # tiles      - optional (tilesX, tilesY, overlap, maxThreads) to scan using tiled regions
+    # draft      - optional minimum module size for draft loading of image files (see ImageLoader.py)
+    # socketPath - Unix domain socket to listen on (the default, unless a port is given). A socket left by a
+    #              server that is no longer running is replaced; FileExistsError is raised if the path is
+    #              not a socket, or if a server is still listening on it.
+    # port       - localhost HTTP port to listen on (0 for any free port)
+    # verbose    - log every request
+    def __init__(self, config = None, workers = None, mode = 'process', tiles = None, draft = None,
+                 socketPath = None, port = None, verbose = False):
+        self.verbose = verbose
+        self.socketPath = None
+
+        if port is not None or not hasattr(socket, 'AF_UNIX'):
+            self.server = http.server.ThreadingHTTPServer(("127.0.0.1", DEFAULT_PORT if port is None else port), _ScanHandler)
+            self.address = "%s:%d" % self.server.server_address[0:2]
+        else:
+            removeStaleSocket(socketPath or DEFAULT_SOCKET)
+            self.server = _UnixHTTPServer(socketPath or DEFAULT_SOCKET, _ScanHandler)
+            self.socketPath = self.address = socketPath or DEFAULT_SOCKET
+        self.server.scanServer = self
+
+        try:
+            self.pool = ScannerPool(DEFAULT_CONFIG if config is None else config, workers, mode, tiles, draft)
+        except BaseException:
+            self.server.server_close()
+            if self.socketPath is not None:
+                os.unlink(self.socketPath)
+            raise
+        self.thread = None
+
+        # Statistics
+        self.lock = threading.Lock()
+        self.starTime = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.scanTime = 0.0
+
+    # Scan an image (file name, (pixels, width, height) or SharedImage) with the pool; returns the reply
+    def scan(self, image):
+        try:
+            resultLen, scanResult, scanTime, scale = self.pool.submit(image).result()
+        except Exception:
+            with self.lock:
+                self.errors += 1
+            raise
+
+        results = MWR.MWResults(scanResult)
+        if scale != (1.0, 1.0):
+            ImageLoader.scaleResults(results, *scale)
+        with self.lock:
+            self.requests += 1
+            self.scanTime += scanTime
+
+        reply = results.toDict()
+        reply['resultLen'] = resultLen
+        reply['scanTime'] = scanTime
+        return reply
+
+    def status(self):
+        with self.lock:
+            return {'sdkVersion': MWB.MWBgetLibVersionText().decode(), 'address': self.address,
+                    'mode': self.pool.mode, 'workers': self.pool.workers, 'uptime': time.time() - self.starTime,
+                    'requests': self.requests, 'errors': self.errors,
+                    'averageScanTime': self.scanTime / self.requests if self.requests else 0.0}
+
+    # Serve requests until shutdown() (or Ctrl-C)
+    def serveForever(self):
+        self.server.serve_forever()
+
+    # Serve requests on a background thread (e.g. for tests)
+    def start(self):
+        self.thread = threading.Thread(target=self.serveForever, name="ScanServer", daemon=True)
+        self.thread.start()
+        return self
+
+    def shutdown(self):
+        self.server.shutdown()
+
+    def close(self):
+        if self.thread is not None:
+            self.shutdown()
+            self.thread.join()
+        self.server.server_close()
+        self.pool.close()
+        if self.socketPath is not None and os.path.exists(self.socketPath):
+            os.unlink(self.socketPath)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+def main():
+    configFile = None
+    effortLevel = None
+    workers = None
+    mode = 'process'
+    socketPath = None
+    port = None
+    verbose = True
+
+    for arg in sys.argv[1:]:
+        if arg[0:2].upper() == "-C":
+            configFile = arg[2:]
+        elif arg[0:2].upper() == "-E":
+            effortLevel = int(arg[2:])
+        elif arg[0:2].upper() == "-B":
+            workers = int(arg[2:] or 0) or None
+            mode = 'process'
+        elif arg[0:2].upper() == "-N":
+            workers = int(arg[2:] or 0) or None
+            mode = 'thread'
+        elif arg[0:2].upper() == "-U":
+            socketPath, host, port = parseAddress(arg[2:])
+            if host not in (None, "127.0.0.1", "localhost"):
+                print("The scan server only listens on 127.0.0.1")
+                exit()
+        elif arg[0:2].upper() == "-S":
+            verbose = False
+
+    config = DEFAULT_CONFIG
+    if configFile:
+        config = config.copy(**DecoderConfig.load(configFile).toDict())
+    if effortLevel is not None:
+        config = config.copy(level=effortLevel)
+
+    try:
+        server = ScanServer(config, workers, mode, socketPath=socketPath, port=port, verbose=verbose)
+    except OSError as e:
+        print("Unable to start the scan server: " + str(e))
+        exit()
+
+    with server:
+        print("Scan server - SDK Version " + str(MWB.MWBgetLibVersionText()) + ", " + str(server.pool.workers) + " " +
+              mode + " worker(s), listening on " + server.address)
+        try:
+            server.serveForever()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+#
+# File      ScannerPool.py
+#
+# Brief     Parallel decoding of many images with the barcode scanner library
+#
+# Details   All decoder configuration (MWBsetActiveCodes, MWBsetLevel, MWBsetFlags, ...) is global state of
+#           the library, and the SDK does not document whether concurrent MWBscanGrayscaleImage calls are
+#           safe. ScannerPool therefore supports two modes:
+#
+#             process - (default) each worker process loads the library, registers the SDK and applies the
+#                       configuration once (a picklable DecoderConfig or dict; see configureScanner), then
+#                       scans the images it is given. Workers load image files themselves, so only file names and
+#                       the MWR result bytes cross the process boundary. Throughput scales with the number
+#                       of cores.
+#             thread  - the images are scanned by a thread pool in this process. ctypes releases the GIL
+#                       during the library call, so this only pays off if the library is reentrant for
+#                       your configuration; all threads share this process's configuration.
+#
+#           Example:
+#
+#               with ScannerPool({'activeCodes': MWB.MWB_CODE_MASK_DM, 'level': 2}) as pool:
+#                   for image, resultLen, results, scanTime, error in pool.map(glob.glob('*.jpg')):
+#                       ...
+#
+#           Images already in memory can be placed in shared memory (multiprocessing.shared_memory) and passed
+#           as SharedImage: the workers scan them in place, and only the name, size and offset are pickled.
+#           Each worker keeps the last few blocks it scanned mapped, so that a ring of frames in one block
+#           (see SharedFrames.py) is mapped once rather than for every frame. Likewise, frames of raw image
+#           files (RawFrames.RawFrame) are scanned in place in the workers' mapping of the file.
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+
+import os
+import time
+import threading
+import collections
+import concurrent.futures
+from multiprocessing import shared_memory, resource_tracker
+
+import BarcodeScanner as MWB
+import MWResult as MWR
+import ImageLoader
+import RawFrames
+import MWRegions
+from DecoderConfig import DecoderConfig
+
+# configureScanner
+#
+# Apply a configuration (a DecoderConfig, or a dict of settings) to the library. Supported keys (all
+# optional):
+#
+#   registrationKey - license key passed to MWBregisterSDK (bytes)
+#   activeCodes     - MWBsetActiveCodes mask
+#   activeSubcodes  - {codeMask: subMask} for MWBsetActiveSubcodes
+#   codePriority    - {codeMask: priority} for MWBsetCodePriority
+#   direction       - MWBsetDirection mask
+#   level           - effort level (1-5) for MWBsetLevel
+#   flags           - {codeMask: flags} for MWBsetFlags (code mask 0 for the global flags)
+#   params          - list of (codeMask, paramId, paramValue) for MWBsetParam
+#   minLength       - {codeMask: minLength} for MWBsetMinLength
+#   scanningRect    - {codeMask: (left, top, width, height)} for MWBsetScanningRect
+#   resultType      - MWBsetResultType value (default MWB_RESULT_TYPE_MW)
+#   duplicatesTimeout - MWBsetDuplicatesTimeout value (ms)
+#
+# Only the settings that differ from the configuration last applied in this process reach the library
+# (see DecoderConfig.py). Returns the MWBregisterSDK status (MWB_RTREG_OK when no key is given).
+#
+def configureScanner(config):
+    if not isinstance(config, DecoderConfig):
+        config = DecoderConfig.fromDict(config)
+    return config.apply()
+
+# An image in a shared memory block (multiprocessing.shared_memory): width * height grayscale pixels at
+# offset. Workers scan the image in place, so only these few values cross the process boundary.
+class SharedImage:
+    __slots__ = ('name', 'width', 'height', 'offset')
+
+    def __init__(self, name, width, height, offset = 0):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.offset = offset
+
+    def __getstate__(self):
+        return (self.name, self.width, self.height, self.offset)
+
+    def __setstate__(self, state):
+        self.name, self.width, self.height, self.offset = state
+
+    def __repr__(self):
+        return "SharedImage(%r, %d, %d, %d)" % (self.name, self.width, self.height, self.offset)
+
+# Attach to an existing shared memory block. Before Python 3.13 attaching also registers the block with the
+# resource tracker, which would then unlink it (and warn) when this process exits although it belongs
+# to another process. Unregistering it afterwards is no cure: processes started by multiprocessing share
+# their parent's tracker, and would drop the registration of a block the parent created. Keep the block
+# from being registered instead.
+_attachLock = threading.Lock()
+
+def attachSharedMemory(name):
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        pass
+
+    with _attachLock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name)
+        finally:
+            resource_tracker.register = register
+
+# Scan settings of a pool: (regions, draftModuleSize), with regions the (regionData, regionCount,
+# maxThreads) to scan with tiles (None for the whole image), and draftModuleSize the minimum module size for
+# draft loading of image files (None to load at full resolution)
+def _scanSettings(tiles, draft):
+    regions = None
+    if tiles is not None:
+        tilesX, tilesY, overlap, maxThreads = tiles
+        regionSet = MWRegions.regionsFromTiles(tilesX, tilesY, overlap)
+        regions = (regionSet.packed, regionSet.count, maxThreads)
+    return regions, draft
+
+# Scan settings of this worker process (each worker process belongs to a single pool)
+_workerSettings = (None, None)
+
+def _initWorker(config, tiles, draft = None):
+    global _workerSettings
+
+    configureScanner(config)
+    _workerSettings = _scanSettings(tiles, draft)
+
+# _scanImage
+#
+# Scan one image: either an image file name, a tuple of (pixels, width, height) with the pixels in any
+# C-contiguous buffer, a SharedImage or a RawFrame. With draft loading, image files are scanned at reduced resolution first and again at
+# full resolution if nothing was found. settings are the pool's scan settings (see _scanSettings), by
+# default those of this worker process.
+#
+# This function returns a tuple:
+#  resultLen  - Negative for an error, otherwise the # of bytes in scanResult
+#  scanResult - The MWR bytes (empty if nothing was found)
+#  scanTime   - Time to load (if needed) and scan the image (ms)
+#  scale      - (scaleX, scaleY) from the scanned image to full resolution (see ImageLoader.scaleResults)
+#
+def _scanImage(image, settings = None):
+    regions, draftModuleSize = settings or _workerSettings
+    starTime = time.perf_counter()
+    scaleX = scaleY = 1.0
+    if isinstance(image, SharedImage):
+        resultLen, scanResults = _scanShared(image, regions)
+    elif isinstance(image, RawFrames.RawFrame):
+        pixels = RawFrames.framePixels(image)
+        try:
+            resultLen, scanResults = _scanPixels(pixels, image.width, image.height, regions)
+        finally:
+            pixels.release()
+    else:
+        if isinstance(image, tuple):
+            pixels, width, height = image
+        elif draftModuleSize is not None:
+            pixels, width, height, scaleX, scaleY = ImageLoader.loadGrayscaleDraft(image, draftModuleSize)
+        else:
+            pixels, width, height = ImageLoader.loadGrayscale(image)
+
+        resultLen, scanResults = _scanPixels(pixels, width, height, regions)
+        if resultLen <= 0 and (scaleX != 1.0 or scaleY != 1.0):
+            pixels, width, height = ImageLoader.loadGrayscale(image)
+            scaleX = scaleY = 1.0
+            resultLen, scanResults = _scanPixels(pixels, width, height, regions)
+
+    scanTime = (time.perf_counter() - starTime) * 1000
+    return resultLen, scanResults.raw[0:resultLen] if resultLen > 0 else b'', scanTime, (scaleX, scaleY)
+
+# Shared memory blocks mapped by this process, most recently used last. A block removed by its owner stays
+# mapped (its memory allocated) until evicted, so only a few are kept.
+_attached = collections.OrderedDict()
+_attachedLock = threading.Lock()
+_ATTACHED_MAX = 4
+
+def _scanShared(image, regions):
+    with _attachedLock:
+        sharedMemory = _attached.pop(image.name, None)
+        if sharedMemory is None:
+            sharedMemory = attachSharedMemory(image.name)
+        _attached[image.name] = sharedMemory
+        pixels = sharedMemory.buf[image.offset:image.offset + image.width * image.height]
+
+        # Evict the least recently used blocks, except those still being scanned by another thread
+        for name in list(_attached)[0:max(0, len(_attached) - _ATTACHED_MAX)]:
+            try:
+                _attached[name].close()
+                del _attached[name]
+            except BufferError:
+                pass
+
+    try:
+        return _scanPixels(pixels, image.width, image.height, regions)
+    finally:
+        pixels.release()
+
+def _scanPixels(pixels, width, height, regions):
+    if regions is not None:
+        return MWB.MWBscanGrayscaleRegions(pixels, width, height, *regions)
+    return MWB.MWBscanGrayscaleImage(pixels, width, height)
+
+class ScannerPool:
+
+    # config  - DecoderConfig or dict applied to the library (see configureScanner)
+    # workers - number of worker processes/threads (default: number of CPUs)
+    # mode    - 'process' or 'thread' (see above)
+    # tiles   - optional (tilesX, tilesY, overlap, maxThreads) to scan using tiled regions
+    # draft   - optional minimum module size (full resolution pixels) to load image files at reduced
+    #           resolution (see ImageLoader.loadGrayscaleDraft)
+    def __init__(self, config = None, workers = None, mode = 'process', tiles = None, draft = None):
+        self.config = config if isinstance(config, DecoderConfig) else DecoderConfig.fromDict(config or {})
+        self.workers = workers or os.cpu_count() or 1
+        self.mode = mode
+
+        # Scan settings passed with each image in thread mode (worker processes keep their own)
+        self.settings = None
+
+        if mode == 'process':
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers, initializer=_initWorker,
+                                                                   initargs=(self.config, tiles, draft))
+        elif mode == 'thread':
+            configureScanner(self.config)
+            self.settings = _scanSettings(tiles, draft)
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+        else:
+            raise ValueError("mode must be 'process' or 'thread'")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self, wait = True):
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    # Queue an image (file name, (pixels, width, height), SharedImage or RawFrame); returns a Future of
+    # (resultLen, MWR bytes, scanTime, scale), see _scanImage
+    def submit(self, image):
+        return self.executor.submit(_scanImage, image, self.settings)
+
+    # Scan all images, yielding (image, resultLen, MWResults, scanTime, error) tuples. An image that can not be
+    # scanned (e.g. a missing or unreadable file) is yielded with the exception as error, no results and a
+    # resultLen of -1, and the other images are scanned as usual. With ordered=False the results
+    # are yielded as they complete rather than in input order. At most 'window' images are queued at a time
+    # (default 4 per worker), so very long image lists are not all submitted up front. With lazy the results
+    # decode their fields on first access (see MWLazyResult); pickling them decodes all the fields.
+    def map(self, images, ordered = True, window = None, lazy = False):
+        window = window or self.workers * 4
+        pending = {}
+        order = []
+        images = iter(images)
+
+        while True:
+            while len(pending) < window:
+                image = next(images, None)
+                if image is None:
+                    break
+                future = self.submit(image)
+                pending[future] = image
+                order.append(future)
+
+            if not pending:
+                return
+
+            if ordered:
+                future = order.pop(0)
+            else:
+                future = next(concurrent.futures.as_completed(pending))
+                order.remove(future)
+
+            image = pending.pop(future)
+            try:
+                resultLen, scanResult, scanTime, scale = future.result()
+            except Exception as e:
+                yield image, -1, MWR.MWResults(b''), 0.0, e
+                continue
+            results = MWR.MWResults(scanResult, lazy=lazy)
+            if scale != (1.0, 1.0):
+                ImageLoader.scaleResults(results, *scale)
+            yield image, resultLen, results, scanTime, None
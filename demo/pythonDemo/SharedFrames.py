@@ -0,0 +1,234 @@
+#
+# File      SharedFrames.py
+#
+# Brief     Shared memory frame transport between capture (or image loading) and decoder processes
+#
+# Details   Passing frames to ScannerPool worker processes as (pixels, width, height) pickles every frame and
+#           copies it twice on its way to the worker (several MB per HD frame). SharedFrameRing instead keeps a
+#           ring of fixed-size slots in one shared memory block (multiprocessing.shared_memory): the capture
+#           side writes each frame into a slot (FrameRing converts camera frames to grayscale straight into
+#           it), the workers scan the slot in place, and only the slot's SharedImage (block name, size and
+#           offset) and the MWR result bytes cross the process boundary. The workers keep the block mapped
+#           from one frame to the next (see ScannerPool.py), so the per-frame cost of the transport is a small
+#           message each way, whatever the frame size.
+#
+#           SharedScanner has the usual scan(pixels, width, height) -> (resultLen, scanResults) interface, so
+#           it can decode for LiveDecoder, ScanPipeline or ChangeGate; it finds the slot holding the pixels
+#           and submits it to the pool:
+#
+#               ring = SharedFrameRing(slots=8, slotSize=1920 * 1080)
+#               with ScannerPool(config, workers=4) as pool:
+#                   scanner = SharedScanner(pool, release=True)
+#                   pixels, width, height = ring.load("code.jpg")        # loads into a free slot
+#                   resultLen, scanResults = scanner.scan(pixels, width, height)
+#               ring.close()
+#
+#           In a ScanPipeline, the slots are returned by the pipeline instead (release=ring.releaseImage), so
+#           that images dropped when it stops early, or that fail, do not keep their slots:
+#
+#               pipeline = ScanPipeline(loader=ring.load, scanner=SharedScanner(pool).scan,
+#                                       release=ring.releaseImage)
+#
+#           Images that are not in a ring (e.g. larger than its slots) are passed to the pool as a copy, and
+#           counted in the report.
+#
+#           Requires NumPy.
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+
+import atexit
+import ctypes
+import threading
+import collections
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import ImageLoader
+from ScannerPool import SharedImage
+
+# The rings open in this process (searched by SharedScanner for the slot holding an image)
+_rings = []
+_ringsLock = threading.Lock()
+
+# Blocks that could not be closed yet because frames were still referenced (closed again at exit)
+_unclosed = []
+
+@atexit.register
+def _closeUnclosed():
+    for sharedMemory in _unclosed:
+        try:
+            sharedMemory.close()
+        except BufferError:
+            pass
+    _unclosed.clear()
+
+# Address of the first pixel of an image, None if it is not a contiguous buffer
+def _address(pixels):
+    if isinstance(pixels, np.ndarray):
+        return pixels.ctypes.data if pixels.flags.c_contiguous else None
+    try:
+        return np.frombuffer(pixels, dtype=np.uint8).ctypes.data
+    except (TypeError, ValueError, BufferError):
+        return None
+
+class SharedFrameRing:
+
+    # slots    - number of slots
+    # slotSize - size of a slot (bytes): the largest width * height to be stored
+    def __init__(self, slots, slotSize):
+        self.slots = slots
+        self.slotSize = slotSize
+        self.sharedMemory = shared_memory.SharedMemory(create=True, size=max(1, slots * slotSize))
+        self.name = self.sharedMemory.name
+        self.buffer = np.ndarray(slots * slotSize, dtype=np.uint8, buffer=self.sharedMemory.buf)
+        self.address = self.buffer.ctypes.data
+
+        # Slots not in use (see acquire)
+        self.free = collections.deque(range(slots))
+        self.condition = threading.Condition()
+        self.closed = False
+
+        # Statistics
+        self.loaded = 0
+        self.oversized = 0
+
+        with _ringsLock:
+            _rings.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # Take a free slot, waiting for one to be released if all are in use. Returns the slot index.
+    def acquire(self):
+        with self.condition:
+            while not self.free:
+                if self.closed:
+                    raise ValueError("shared frame ring is closed")
+                self.condition.wait()
+            if self.closed:
+                raise ValueError("shared frame ring is closed")
+            return self.free.popleft()
+
+    def release(self, index):
+        with self.condition:
+            self.free.append(index)
+            self.condition.notify()
+
+    # Release the slot holding an image returned by load (nothing for images that are not in a slot).
+    # image is (pixels, width, height).
+    def releaseImage(self, image):
+        index = self.slotOf(*image)
+        if index is not None:
+            self.release(index)
+
+    # The slot at index as a (height, width) grayscale NumPy array (a view of the shared memory)
+    def slot(self, index, width, height):
+        if width * height > self.slotSize:
+            raise ValueError("a %d x %d image does not fit in a slot of %d bytes" % (width, height, self.slotSize))
+        offset = index * self.slotSize
+        return self.buffer[offset:offset + width * height].reshape(height, width)
+
+    # The image in the slot at index, to be passed to a worker process
+    def sharedImage(self, index, width, height):
+        return SharedImage(self.name, width, height, index * self.slotSize)
+
+    # Index of the slot holding pixels (width * height from the slot's first byte, as sharedImage passes
+    # them), None if they are not in this ring
+    def slotOf(self, pixels, width, height):
+        address = _address(pixels)
+        if address is None or self.closed:
+            return None
+        offset = address - self.address
+        if offset < 0 or offset >= self.slots * self.slotSize or offset % self.slotSize != 0 or width * height > self.slotSize:
+            return None
+        return offset // self.slotSize
+
+    # Load an image file (default ImageLoader.loadGrayscale) into a free slot. Returns (pixels, width,
+    # height) with pixels the slot, to be released after scanning (SharedScanner with release does).
+    # Images larger than a slot are returned as loaded, without taking a slot.
+    def load(self, fileName, loader = None):
+        pixels, width, height = (loader or ImageLoader.loadGrayscale)(fileName)
+        if width * height > self.slotSize:
+            self.oversized += 1
+            return pixels, width, height
+
+        index = self.acquire()
+        try:
+            slot = self.slot(index, width, height)
+            slot.reshape(-1)[...] = np.frombuffer(pixels, dtype=np.uint8, count=width * height)
+        except BaseException:
+            self.release(index)
+            raise
+        self.loaded += 1
+        return slot, width, height
+
+    # Remove the shared memory block. Frames still referenced elsewhere (e.g. one being displayed) keep
+    # their memory mapped until they are released.
+    def close(self):
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.condition.notify_all()
+        with _ringsLock:
+            _rings.remove(self)
+
+        self.buffer = None
+        self.sharedMemory.unlink()
+        try:
+            self.sharedMemory.close()
+        except BufferError:
+            _unclosed.append(self.sharedMemory)
+
+# The ring and slot index holding pixels, (None, None) if they are in none of the rings of this process
+def findSlot(pixels, width, height):
+    with _ringsLock:
+        rings = list(_rings)
+    for ring in rings:
+        index = ring.slotOf(pixels, width, height)
+        if index is not None:
+            return ring, index
+    return None, None
+
+class SharedScanner:
+
+    # pool    - ScannerPool decoding the images (in 'process' mode for the shared memory transport)
+    # release - release the image's slot after scanning it (for images loaded with SharedFrameRing.load
+    #           and scanned directly; a ScanPipeline releases them itself, and FrameRing manages its own
+    #           slots)
+    def __init__(self, pool, release = False):
+        self.pool = pool
+        self.release = release
+
+        # Statistics
+        self.scans = 0
+        self.copied = 0
+
+    # Scan an image with the pool. Returns (resultLen, scanResults) as MWB.MWBscanGrayscaleImage, with the
+    # results in a new ctypes buffer.
+    def scan(self, pixels, width, height):
+        ring, index = findSlot(pixels, width, height)
+        if ring is not None:
+            image = ring.sharedImage(index, width, height)
+        else:
+            image = (pixels, width, height)
+            self.copied += 1
+
+        try:
+            resultLen, scanResult, scanTime, scale = self.pool.submit(image).result()
+        finally:
+            if ring is not None and self.release:
+                ring.release(index)
+        self.scans += 1
+        return resultLen, ctypes.create_string_buffer(scanResult, len(scanResult))
+
+    # The statistics as printable text
+    def report(self):
+        return ("Shared frames: %d images scanned by %d worker processes, %d passed by copy (not in shared memory)" %
+                (self.scans, self.pool.workers, self.copied))
@@ -0,0 +1,245 @@
+#
+# File      SymbologyProfiler.py
+#
+# Brief     Symbology auto-tuning from the barcodes actually scanned
+#
+# Details   Every active symbology (MWBsetActiveCodes) slows every scan, so production configurations that
+#           enable "everything we might see" pay for symbologies that rarely or never appear. SymbologyProfiler
+#           records the barcode types (MWResult.barcodeType, FOUND_*) found over a rolling window of scans
+#           and recommends a narrower configuration: only the symbologies and subcodes seen, with the most
+#           frequent ones given the highest priority (MWBsetCodePriority).
+#
+#           With autoApply, the recommendation is applied to the library once enough scans are recorded and
+#           refreshed as the traffic changes. Every probeInterval'th scan still uses the full configuration,
+#           so new symbologies are noticed (and added straight away).
+#
+#           The scan time of each configuration is measured, and report() shows the speedup of the
+#           narrowed configurations over the full one:
+#
+#               profiler = SymbologyProfiler(autoApply=True)    # full configuration = current library state
+#               resultLen, scanResults = profiler.scan(pixels, width, height)
+#               ...
+#               print(profiler.report())
+#
+#           The active codes are global state of the library: the profiler must not be shared by threads
+#           scanning at the same time.
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+
+import time
+from collections import deque
+
+import BarcodeScanner as MWB
+import MWResult as MWR
+from DecoderConfig import applySettings
+
+# Code mask and subcode mask (0 for symbologies without subcodes) of each barcode type
+_FOUND_CODES = {
+    MWB.FOUND_DM: (MWB.MWB_CODE_MASK_DM, 0),
+    MWB.FOUND_39: (MWB.MWB_CODE_MASK_39, 0),
+    MWB.FOUND_32: (MWB.MWB_CODE_MASK_39, 0),
+    MWB.FOUND_RSS_14: (MWB.MWB_CODE_MASK_RSS, MWB.MWB_SUBC_MASK_RSS_14),
+    MWB.FOUND_RSS_14_STACK: (MWB.MWB_CODE_MASK_RSS, MWB.MWB_SUBC_MASK_RSS_14_STACK),
+    MWB.FOUND_RSS_LIM: (MWB.MWB_CODE_MASK_RSS, MWB.MWB_SUBC_MASK_RSS_LIM),
+    MWB.FOUND_RSS_EXP: (MWB.MWB_CODE_MASK_RSS, MWB.MWB_SUBC_MASK_RSS_EXP),
+    MWB.FOUND_EAN_13: (MWB.MWB_CODE_MASK_EANUPC, MWB.MWB_SUBC_MASK_EANUPC_EAN_13),
+    MWB.FOUND_EAN_8: (MWB.MWB_CODE_MASK_EANUPC, MWB.MWB_SUBC_MASK_EANUPC_EAN_8),
+    MWB.FOUND_UPC_A: (MWB.MWB_CODE_MASK_EANUPC, MWB.MWB_SUBC_MASK_EANUPC_UPC_A),
+    MWB.FOUND_UPC_E: (MWB.MWB_CODE_MASK_EANUPC, MWB.MWB_SUBC_MASK_EANUPC_UPC_E | MWB.MWB_SUBC_MASK_EANUPC_UPC_E1),
+    MWB.FOUND_128: (MWB.MWB_CODE_MASK_128, 0),
+    MWB.FOUND_128_GS1: (MWB.MWB_CODE_MASK_128, 0),
+    MWB.FOUND_PDF: (MWB.MWB_CODE_MASK_PDF, MWB.MWB_SUBC_MASK_PDF_STANDARD),
+    MWB.FOUND_MICRO_PDF: (MWB.MWB_CODE_MASK_PDF, MWB.MWB_SUBC_MASK_PDF_MICRO),
+    MWB.FOUND_QR: (MWB.MWB_CODE_MASK_QR, MWB.MWB_SUBC_MASK_QR_STANDARD),
+    MWB.FOUND_QR_MICRO: (MWB.MWB_CODE_MASK_QR, MWB.MWB_SUBC_MASK_QR_MICRO),
+    MWB.FOUND_AZTEC: (MWB.MWB_CODE_MASK_AZTEC, 0),
+    MWB.FOUND_25_INTERLEAVED: (MWB.MWB_CODE_MASK_25, MWB.MWB_SUBC_MASK_C25_INTERLEAVED),
+    MWB.FOUND_25_STANDARD: (MWB.MWB_CODE_MASK_25, MWB.MWB_SUBC_MASK_C25_STANDARD),
+    MWB.FOUND_ITF14: (MWB.MWB_CODE_MASK_25, MWB.MWB_SUBC_MASK_C25_ITF14),
+    MWB.FOUND_25_IATA: (MWB.MWB_CODE_MASK_25, MWB.MWB_SUBC_MASK_C25_IATA),
+    MWB.FOUND_25_MATRIX: (MWB.MWB_CODE_MASK_25, MWB.MWB_SUBC_MASK_C25_MATRIX),
+    MWB.FOUND_25_COOP: (MWB.MWB_CODE_MASK_25, MWB.MWB_SUBC_MASK_C25_COOP),
+    MWB.FOUND_25_INVERTED: (MWB.MWB_CODE_MASK_25, MWB.MWB_SUBC_MASK_C25_INVERTED),
+    MWB.FOUND_93: (MWB.MWB_CODE_MASK_93, 0),
+    MWB.FOUND_CODABAR: (MWB.MWB_CODE_MASK_CODABAR, 0),
+    MWB.FOUND_DOTCODE: (MWB.MWB_CODE_MASK_DOTCODE, 0),
+    MWB.FOUND_11: (MWB.MWB_CODE_MASK_11, 0),
+    MWB.FOUND_MSI: (MWB.MWB_CODE_MASK_MSI, 0),
+    MWB.FOUND_MAXICODE: (MWB.MWB_CODE_MASK_MAXICODE, 0),
+    MWB.FOUND_POSTNET: (MWB.MWB_CODE_MASK_POSTAL, MWB.MWB_SUBC_MASK_POSTAL_POSTNET),
+    MWB.FOUND_PLANET: (MWB.MWB_CODE_MASK_POSTAL, MWB.MWB_SUBC_MASK_POSTAL_PLANET),
+    MWB.FOUND_IMB: (MWB.MWB_CODE_MASK_POSTAL, MWB.MWB_SUBC_MASK_POSTAL_IM),
+    MWB.FOUND_ROYALMAIL: (MWB.MWB_CODE_MASK_POSTAL, MWB.MWB_SUBC_MASK_POSTAL_ROYAL),
+    MWB.FOUND_AUSTRALIAN: (MWB.MWB_CODE_MASK_POSTAL, MWB.MWB_SUBC_MASK_POSTAL_AUSTRALIAN),
+    MWB.FOUND_TELEPEN: (MWB.MWB_CODE_MASK_TELEPEN, 0),
+}
+
+# Symbologies with subcodes
+_SUBCODE_MASKS = (MWB.MWB_CODE_MASK_RSS, MWB.MWB_CODE_MASK_QR, MWB.MWB_CODE_MASK_PDF, MWB.MWB_CODE_MASK_25,
+                  MWB.MWB_CODE_MASK_POSTAL, MWB.MWB_CODE_MASK_EANUPC)
+
+class SymbologyProfiler:
+
+    # fullCodes     - the full configuration's active codes (default: as currently set in the library)
+    # window        - number of recent scans the recommendation is based on
+    # minScans      - scans recorded (with the full configuration) before anything is recommended
+    # probeInterval - scan every n'th image with the full configuration (0 = never)
+    # autoApply     - apply the recommendation (otherwise every scan uses the full configuration)
+    # scanner       - function (pixels, width, height) -> (resultLen, scanResults) used to scan
+    #                 (default MWB.MWBscanGrayscaleImage)
+    def __init__(self, fullCodes = None, window = 1000, minScans = 100, probeInterval = 50, autoApply = False,
+                 scanner = None):
+        self.fullCodes = MWB.MWBgetActiveCodes() if fullCodes is None else fullCodes
+        self.fullSubcodes = {}
+        for codeMask in _SUBCODE_MASKS:
+            if self.fullCodes & codeMask:
+                self.fullSubcodes[codeMask] = MWB.MWBgetActiveSubcodes(codeMask)
+
+        # The full configuration gives all its symbologies the same priority (the library's default), so
+        # that the priorities of a narrowed configuration do not stay in effect
+        self.fullPriority = {1 << bit: 0 for bit in range(24) if self.fullCodes & (1 << bit)}
+
+        self.window = deque(maxlen=window)
+        self.minScans = minScans
+        self.probeInterval = probeInterval
+        self.autoApply = autoApply
+        self.scanner = scanner or MWB.MWBscanGrayscaleImage
+
+        # Barcodes found in the window, by type (and the types' names)
+        self.typeCounts = {}
+        self.typeNames = {}
+
+        # Recommended configuration in use (None until applied), and the configuration last set in the
+        # library (None = full; the full configuration is set on the first scan if given explicitly)
+        self.current = None
+        self.applied = None if fullCodes is None else False
+
+        # Statistics: active codes -> [scans, total scan time (ms), barcodes found]
+        self.scans = 0
+        self.timings = {}
+
+    # Add the barcode types found by a scan to the window
+    def record(self, results):
+        if hasattr(results, 'results'):
+            results = results.results
+
+        types = []
+        for result in results:
+            if result.barcodeType in _FOUND_CODES:
+                types.append(result.barcodeType)
+                self.typeNames[result.barcodeType] = result.typeName
+        types = tuple(types)
+        if len(self.window) == self.window.maxlen:
+            for barcodeType in self.window[0]:
+                self.typeCounts[barcodeType] -= 1
+        self.window.append(types)
+        for barcodeType in types:
+            self.typeCounts[barcodeType] = self.typeCounts.get(barcodeType, 0) + 1
+        return types
+
+    # The recommended configuration (a configureScanner() dict with activeCodes, activeSubcodes and
+    # codePriority), or None until minScans scans were recorded or if nothing was found
+    def recommend(self):
+        if len(self.window) < min(self.minScans, self.window.maxlen):
+            return None
+
+        codeCounts = {}
+        subcodes = {}
+        for barcodeType, count in self.typeCounts.items():
+            if count <= 0:
+                continue
+            codeMask, subMask = _FOUND_CODES[barcodeType]
+            if not codeMask & self.fullCodes:
+                continue
+            codeCounts[codeMask] = codeCounts.get(codeMask, 0) + count
+            if subMask:
+                subcodes[codeMask] = subcodes.get(codeMask, 0) | subMask
+
+        if not codeCounts:
+            return None
+
+        # The most frequent symbologies get the highest priority
+        ranked = sorted(codeCounts, key=codeCounts.get, reverse=True)
+        activeCodes = 0
+        for codeMask in ranked:
+            activeCodes |= codeMask
+        return {
+            'activeCodes': activeCodes,
+            'activeSubcodes': subcodes,
+            'codePriority': {codeMask: len(ranked) - rank for rank, codeMask in enumerate(ranked)},
+        }
+
+    # Set a configuration (None for the full one) in the library, unless it already is
+    def _apply(self, config):
+        if config is self.applied:
+            return
+
+        if config is None:
+            applySettings(activeCodes=self.fullCodes, activeSubcodes=self.fullSubcodes, codePriority=self.fullPriority)
+        else:
+            applySettings(**config)
+        self.applied = config
+
+    # Scan an image with the current configuration (the full one for probes and until the recommendation
+    # is applied). Returns (resultLen, scanResults) as MWB.MWBscanGrayscaleImage.
+    def scan(self, pixels, width, height):
+        self.scans += 1
+        probe = self.current is None or (self.probeInterval > 0 and self.scans % self.probeInterval == 0)
+        config = None if probe else self.current
+        self._apply(config)
+        activeCodes = self.fullCodes if config is None else config['activeCodes']
+
+        starTime = time.perf_counter()
+        resultLen, scanResults = self.scanner(pixels, width, height)
+        scanTime = (time.perf_counter() - starTime) * 1000
+
+        types = ()
+        if resultLen > 0:
+            types = self.record(MWR.MWResults(scanResults, lazy=True))
+        else:
+            self.record(())
+
+        timing = self.timings.setdefault(activeCodes, [0, 0.0, 0])
+        timing[0] += 1
+        timing[1] += scanTime
+        timing[2] += len(types)
+
+        if self.autoApply:
+            # Refresh the recommendation periodically, and at once when a probe finds a new symbology
+            newCodes = self.current is not None and any(not _FOUND_CODES[t][0] & self.current['activeCodes'] for t in types)
+            if newCodes or self.current is None or self.scans % self.window.maxlen == 0:
+                recommended = self.recommend()
+                if recommended is not None:
+                    self.current = recommended
+
+        return resultLen, scanResults
+
+    # Names of the symbologies in a code mask
+    @staticmethod
+    def codeNames(codeMask):
+        names = [name[14:] for name, value in vars(MWB).items()
+                 if name.startswith("MWB_CODE_MASK_") and name not in ("MWB_CODE_MASK_ALL", "MWB_CODE_MASK_NONE")
+                 and value & codeMask]
+        return "|".join(names) if names else "none"
+
+    # The barcode types seen and the measured scan time of each configuration, as printable text
+    def report(self):
+        lines = ["Symbology profile (last %d scans):" % len(self.window)]
+        for barcodeType, count in sorted(self.typeCounts.items(), key=lambda item: -item[1]):
+            if count > 0:
+                lines.append("  %-22s %d" % (self.typeNames[barcodeType], count))
+
+        recommended = self.recommend()
+        lines.append("Recommended active codes: " + (self.codeNames(recommended['activeCodes']) if recommended else "(not enough data)"))
+
+        full = self.timings.get(self.fullCodes)
+        fullAverage = full[1] / full[0] if full and full[0] else None
+        for activeCodes, (scans, totalTime, found) in self.timings.items():
+            average = totalTime / scans
+            name = "full configuration" if activeCodes == self.fullCodes else self.codeNames(activeCodes)
+            line = "  %-40s %6d scans, %5d barcodes, %8.2f ms average" % (name[0:40], scans, found, average)
+            if activeCodes != self.fullCodes and fullAverage and average > 0:
+                line += " (%.1fx faster than full)" % (fullAverage / average)
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,275 @@
+#!/usr/bin/python3
+#
+# File      benchResults.py
+# Brief     Micro-benchmark for decoding MWR scan results (MWResult.py)
+#
+# Details   Times MWResult.MWResults against the original field-by-field implementation (kept below as
+#           LegacyMWResults) on recorded MWR buffers, as well as the lazy mode (MWResults(buffer,
+#           lazy=True)) reading only the text and typeName of each result. Buffers are either raw MWR
+#           dumps (.mwr files, the scanResults.raw bytes of a scan) or recorded on the fly by scanning
+#           image files with the barcode library. A single-result buffer can be replicated with -N to emulate multi-code
+#           results.
+#
+#           With -M, the memory retained by n decoded results (e.g. a day's decode history kept for
+#           reconciliation) is compared instead, measured with tracemalloc.
+#
+#           usage: benchResults [-Nn] [-In] [-Mn] [-En] [file ...]
+#
+#               -Nn         Replicate each result n times in the buffer (default 1)
+#               -In         Iterations per buffer (default 20000)
+#               -Mn         Compare the memory of n retained results (e.g. -M1000000)
+#               -En         Effort level used when recording from images (default 5)
+#               file        .mwr dumps or images to scan (default download.jpeg)
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+import gc
+import sys
+import time
+import tracemalloc
+import ctypes
+import struct
+from os import path
+
+import BarcodeScanner as MWB
+import MWResult as MWR
+
+#
+# Original implementation of the results classes, used as the baseline
+#
+class LegacyPointF:
+
+    def __init__(self, _x = 0.0, _y = 0.0):
+        self.x = float(_x)
+        self.y = float(_y)
+
+class LegacyMWLocation:
+    def __init__(self, _points):
+
+        self.points = []
+        for i in range(4):
+            p = LegacyPointF(_points[i*2],_points[i*2+1])
+            self.points.append(p)
+
+        self.p1 = self.points[0]
+        self.p2 = self.points[1]
+        self.p3 = self.points[2]
+        self.p4 = self.points[3]
+
+class LegacyMWResult:
+
+    def __init__(self):
+        self.text = None
+        self.textEncoding = None
+        self.typeName = None
+        self.rawBytes = None
+        self.bytesLength = int(0)
+        self.barcodeType = int(0)
+        self.subtype = int(0)
+        self.imageWidth = int(0)
+        self.imageHeight = int(0)
+        self.isGS1 = False
+        self.locationPoints = None
+        self.parserInput = None
+
+        self.modulesCountX = int(0)
+        self.modulesCountY = int(0)
+        self.moduleSizeX = float(0.0)
+        self.moduleSizeY = float(0.0)
+        self.skew = float(0.0)
+        self.iskanji = False
+
+        self.barcodeWidth = float(0.0)
+        self.barcodeHeight = float(0.0)
+
+        self.pdfRows = int(0)
+        self.pdfColumns = int(0)
+        self.pdfIsTruncated = int(0)
+        self.pdfECLevel = int(0)
+        self.pdfCodewords = None
+
+    def setTypeName(self, barcodeType):
+        switcher = dict(MWR._TYPE_NAMES)
+        self.typeName = switcher.get(barcodeType,"Unknown")
+        return
+
+class LegacyMWResults:
+
+    def __init__(self, buffer):
+        self.version = 0
+        self.count = 0
+        self.results = []
+
+        if buffer.value[0] != ord('M') or buffer.value[1] != ord('W') or buffer.value[2] != ord('R'):
+            return
+
+        self.version = ord(buffer[3])
+        self.count = ord(buffer[4])
+
+        pos = 5
+        for i in range(self.count):
+            result = LegacyMWResult()
+
+            fieldCount = ord(buffer[pos])
+            pos += 1
+            for f in range(fieldCount):
+                fieldType = ord(buffer[pos])
+                fieldNameLength = ord(buffer[pos + 1])
+                fieldContentLength = (256 * (ord(buffer[pos + 3 + fieldNameLength]) & 0xFF)) + (ord(buffer[pos + 2 + fieldNameLength]) & 0xFF)
+                contentPos = pos + 4 + fieldNameLength
+
+                if fieldNameLength > 0:
+                    fieldName = buffer[pos+2:pos+2+fieldNameLength].decode("ascii")
+
+                if fieldType == MWB.MWB_RESULT_FT_TEXT:
+                    result.text = buffer[contentPos:contentPos+fieldContentLength].decode("utf-8")
+                elif fieldType == MWB.MWB_RESULT_FT_TEXT_ENCODING:
+                    result.textEncoding = buffer[contentPos:contentPos+fieldContentLength].decode("utf-8")
+                elif fieldType == MWB.MWB_RESULT_FT_TYPE:
+                    result.barcodeType = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
+                    result.setTypeName(result.barcodeType)
+                elif fieldType == MWB.MWB_RESULT_FT_SUBTYPE:
+                    result.barcodeSubtype = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
+                elif fieldType == MWB.MWB_RESULT_FT_ISGS1:
+                    result.isGS1 = (int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder) > 0)
+                elif fieldType == MWB.MWB_RESULT_FT_IMAGE_WIDTH:
+                    result.imageWidth = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
+                elif fieldType == MWB.MWB_RESULT_FT_IMAGE_HEIGHT:
+                    result.imageHeight = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
+                elif fieldType == MWB.MWB_RESULT_FT_LOCATION:
+                    locations = []
+                    for l in range(8):
+                        locations.append(struct.unpack('f', buffer[contentPos + l * 4:contentPos + l * 4 + 4])[0])
+                    result.locationPoints = LegacyMWLocation(locations)
+                elif fieldType == MWB.MWB_RESULT_FT_BYTES:
+                    result.rawBytes = buffer[contentPos:contentPos+fieldContentLength]
+                elif fieldType == MWB.MWB_RESULT_FT_PARSER_BYTES:
+                    result.parserInput = buffer[contentPos:contentPos+fieldContentLength]
+                elif fieldType == MWB.MWB_RESULT_FT_MODULES_COUNT_X:
+                    result.modulesCountX = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
+                elif fieldType == MWB.MWB_RESULT_FT_MODULES_COUNT_Y:
+                    result.modulesCount = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
+                elif fieldType == MWB.MWB_RESULT_FT_MODULE_SIZE_X:
+                    result.moduleSizeX = struct.unpack('f', buffer[contentPos:contentPos+fieldContentLength])[0]
+                elif fieldType == MWB.MWB_RESULT_FT_MODULE_SIZE_Y:
+                    result.moduleSizeY = struct.unpack('f', buffer[contentPos:contentPos+fieldContentLength])[0]
+                elif fieldType == MWB.MWB_RESULT_FT_SKEW:
+                    result.skew = struct.unpack('f', buffer[contentPos:contentPos+fieldContentLength])[0]
+                elif fieldType == MWB.MWB_RESULT_FT_KANJI:
+                    result.kanji = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
+                elif fieldType == MWB.MWB_RESULT_FT_BARCODE_WIDTH:
+                    result.barcodeWidth = struct.unpack('f', buffer[contentPos:contentPos+fieldContentLength])[0]
+                elif fieldType == MWB.MWB_RESULT_FT_BARCODE_HEIGHT:
+                    result.barcodeHeight = struct.unpack('f', buffer[contentPos:contentPos+fieldContentLength])[0]
+                elif fieldType == MWB.MWB_RESULT_FT_PDF_ROWS:
+                    result.pdfRows = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
+                elif fieldType == MWB.MWB_RESULT_FT_PDF_COLUMNS:
+                    result.pdfColumns = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
+                elif fieldType == MWB.MWB_RESULT_FT_PDF_TRUNCATED:
+                    result.pdfTruncated = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
+                elif fieldType == MWB.MWB_RESULT_FT_PDF_ECLEVEL:
+                    result.pdfECLevel = int.from_bytes(buffer[contentPos:contentPos+fieldContentLength],sys.byteorder)
+
+                pos += (fieldNameLength + fieldContentLength + 4)
+
+            self.results.append(result)
+
+# Record an MWR buffer by scanning an image (with every symbology enabled)
+def recordImage(fileName, effortLevel):
+    from PIL import Image
+
+    grayScale = Image.open(fileName).convert('L')
+    MWB.MWBsetActiveCodes(MWB.MWB_CODE_MASK_ALL)
+    MWB.MWBsetLevel(effortLevel)
+    MWB.MWBsetResultType(MWB.MWB_RESULT_TYPE_MW)
+    resultLen, scanResults = MWB.MWBscanGrayscaleImage(grayScale.tobytes(), grayScale.width, grayScale.height)
+    if resultLen <= 0:
+        return None
+    return scanResults.raw[0:resultLen]
+
+# Build a buffer holding each result of the recorded buffer 'copies' times
+def replicate(recorded, copies):
+    count = recorded[4]
+    if copies <= 1 or count == 0:
+        return recorded
+    # The count is one byte: at most 255 results
+    copies = min(copies, 255 // count)
+    return recorded[0:4] + bytes([count * copies]) + recorded[5:] * copies
+
+# Lazy decode, reading only the fields most consumers use
+def decodeLazy(buffer):
+    for result in MWR.MWResults(buffer, lazy=True).results:
+        result.text
+        result.typeName
+
+# Decode the buffer until 'retain' results are held, returning the memory they use (bytes)
+def retainedMemory(decoder, buffer, retain):
+    gc.collect()
+    tracemalloc.start()
+    history = []
+    while len(history) < retain:
+        history.extend(decoder(buffer).results)
+    del history[retain:]
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used
+
+def timeDecoder(decoder, buffer, iterations):
+    starTime = time.perf_counter()
+    for i in range(iterations):
+        decoder(buffer)
+    return (time.perf_counter() - starTime) * 1000000 / iterations
+
+def main():
+    copies = 1
+    iterations = 20000
+    effortLevel = 5
+    retain = 0
+    files = []
+
+    for arg in sys.argv[1:]:
+        if arg[0:2].upper() == "-N":
+            copies = int(arg[2:])
+        elif arg[0:2].upper() == "-I":
+            iterations = int(arg[2:])
+        elif arg[0:2].upper() == "-M":
+            retain = int(arg[2:])
+        elif arg[0:2].upper() == "-E":
+            effortLevel = int(arg[2:])
+        else:
+            files.append(arg)
+
+    if not files:
+        files.append(path.join(path.dirname(path.abspath(__file__)), "download.jpeg"))
+
+    for fileName in files:
+        if fileName.lower().endswith(".mwr"):
+            with open(fileName, "rb") as f:
+                recorded = f.read()
+        else:
+            recorded = recordImage(fileName, effortLevel)
+            if recorded is None:
+                print(fileName + ": no barcodes found, skipped")
+                continue
+
+        recorded = replicate(recorded, copies)
+        ctypesBuffer = ctypes.create_string_buffer(recorded, len(recorded))
+
+        if retain > 0:
+            legacyBytes = retainedMemory(LegacyMWResults, ctypesBuffer, retain)
+            currentBytes = retainedMemory(MWR.MWResults, ctypesBuffer, retain)
+            print("%s: %d retained results" % (path.basename(fileName), retain))
+            print("  legacy  %10.1f MB  (%d bytes/result)" % (legacyBytes / 1048576, legacyBytes // retain))
+            print("  current %10.1f MB  (%d bytes/result, %.1fx smaller)" % (currentBytes / 1048576, currentBytes // retain, legacyBytes / currentBytes))
+            continue
+
+        legacyUs = timeDecoder(LegacyMWResults, ctypesBuffer, iterations)
+        currentUs = timeDecoder(MWR.MWResults, ctypesBuffer, iterations)
+        lazyUs = timeDecoder(decodeLazy, ctypesBuffer, iterations)
+        print("%s: %d result(s), %d bytes" % (path.basename(fileName), recorded[4], len(recorded)))
+        print("  legacy  %8.2f us/buffer" % legacyUs)
+        print("  current %8.2f us/buffer  (%.1fx)" % (currentUs, legacyUs / currentUs))
+        print("  lazy    %8.2f us/buffer  (%.1fx, text and typeName only)" % (lazyUs, legacyUs / lazyUs))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/python3
+#
+# File      benchRoi.py
+# Brief     Benchmark of full-frame, tiled and region-of-interest scanning (RoiDetector.py)
+#
+# Details   Scans each image in four modes and reports the average time per scan (including the ROI
+#           pre-detection, where used) and the number of barcodes found:
+#
+#               full      - MWBscanGrayscaleImage on the whole image
+#               tiled     - MWBscanGrayscaleRegions with the uniform tile grid (-X/-Y/-O)
+#               roi       - MWBscanGrayscaleRegions with the regions found by RoiDetector
+#               roi-rect  - MWBscanGrayscaleImage with a scanning rectangle around the RoiDetector regions
+#
+#           With -F, both ROI modes rescan the full image when their regions find nothing
+#           (RoiDetector.fallback), so images where the candidates miss pay for both scans.
+#
+#           usage: benchRoi [-En] [-In] [-Xn] [-Yn] [-On] [-Rn] [-F] [file ...]
+#
+#               -En         Effort level (default 4)
+#               -In         Scans per image and mode (default 5)
+#               -Xn         Tiles X dimension (default 6)
+#               -Yn         Tiles Y dimension (default 6)
+#               -On         Tiles overlap percentage (default 6)
+#               -Rn         Maximum threads for tiles/regions (default 4)
+#               -F          ROI modes: rescan the full image when the regions find nothing
+#               file        Images to scan (default: the sample images next to this script)
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+import sys
+import time
+import glob
+from os import path
+
+import BarcodeScanner as MWB
+import MWResult as MWR
+import MWRegions
+import ImageLoader
+from RoiDetector import RoiDetector
+
+# Every single-symbology code mask (scanning rectangles are set per symbology)
+_CODE_MASKS = [1 << bit for bit in range(24)]
+
+def setScanningRect(rect):
+    for codeMask in _CODE_MASKS:
+        MWB.MWBsetScanningRect(codeMask, *rect)
+
+def countResults(resultLen, scanResults):
+    if resultLen <= 0:
+        return 0
+    return MWR.MWResults(scanResults, lazy=True).count
+
+# Average time (ms) and barcodes found for scan(), called 'iterations' times
+def timeScan(scan, iterations):
+    starTime = time.perf_counter()
+    for i in range(iterations):
+        resultLen, scanResults = scan()
+    return (time.perf_counter() - starTime) * 1000 / iterations, countResults(resultLen, scanResults)
+
+def main():
+    effortLevel = 4
+    iterations = 5
+    tilesX = 6
+    tilesY = 6
+    overlap = 6
+    maxThreads = 4
+    fallback = False
+    files = []
+
+    for arg in sys.argv[1:]:
+        if arg[0:2].upper() == "-E":
+            effortLevel = int(arg[2:])
+        elif arg[0:2].upper() == "-I":
+            iterations = int(arg[2:])
+        elif arg[0:2].upper() == "-X":
+            tilesX = int(arg[2:])
+        elif arg[0:2].upper() == "-Y":
+            tilesY = int(arg[2:])
+        elif arg[0:2].upper() == "-O":
+            overlap = int(arg[2:])
+        elif arg[0:2].upper() == "-R":
+            maxThreads = int(arg[2:])
+        elif arg[0:2].upper() == "-F":
+            fallback = True
+        else:
+            files.append(arg)
+
+    if not files:
+        folder = path.dirname(path.abspath(__file__))
+        for pattern in ("*.jpg", "*.jpeg", "*.bmp", "*.png"):
+            files += sorted(glob.glob(path.join(folder, pattern)))
+
+    MWB.MWBsetActiveCodes(MWB.MWB_CODE_MASK_ALL)
+    MWB.MWBsetLevel(effortLevel)
+    MWB.MWBsetResultType(MWB.MWB_RESULT_TYPE_MW)
+
+    tiles = MWRegions.regionsFromTiles(tilesX, tilesY, overlap)
+    detector = RoiDetector(fallback=fallback)
+
+    def scanRoiRect(pixels, width, height):
+        rect = detector.scanningRect(pixels, width, height)
+        setScanningRect(rect or (0, 0, 100, 100))
+        resultLen, scanResults = MWB.MWBscanGrayscaleImage(pixels, width, height)
+        if resultLen <= 0 and rect is not None and detector.fallback:
+            setScanningRect((0, 0, 100, 100))
+            resultLen, scanResults = MWB.MWBscanGrayscaleImage(pixels, width, height)
+        return resultLen, scanResults
+
+    print("%-22s %11s %15s %15s %15s %15s" % ("image", "size", "full", "tiled", "roi", "roi-rect"))
+    totals = [0.0] * 4
+    for fileName in files:
+        pixels, width, height = ImageLoader.loadGrayscale(fileName)
+
+        # Time the pre-detection on its own, to show its share of the ROI modes
+        starTime = time.perf_counter()
+        regionSet = detector.detect(pixels, width, height)
+        detectMs = (time.perf_counter() - starTime) * 1000
+
+        timings = [timeScan(lambda: MWB.MWBscanGrayscaleImage(pixels, width, height), iterations),
+                   timeScan(lambda: tiles.scan(pixels, width, height, maxThreads), iterations),
+                   timeScan(lambda: detector.scan(pixels, width, height, maxThreads), iterations),
+                   timeScan(lambda: scanRoiRect(pixels, width, height), iterations)]
+        setScanningRect((0, 0, 100, 100))
+
+        for i in range(4):
+            totals[i] += timings[i][0]
+        print("%-22s %11s %15s %15s %15s %15s" % ((path.basename(fileName)[0:22], "%dx%d" % (width, height)) +
+              tuple("%8.2f ms (%d)" % timing for timing in timings)))
+        print("%-22s %11s   ROI: %s, detection %.2f ms" % ("", "",
+              "full image" if regionSet is None else "%d region(s)" % regionSet.count, detectMs))
+
+    print("%-22s %11s %12.2f ms %12.2f ms %12.2f ms %12.2f ms" % (("total", "") + tuple(totals)))
+
+if __name__ == '__main__':
+    main()
@@ -3,40 +3,60 @@ import time
 import cv2
 import numpy as np
 from ctypes import *
-from PIL import Image, ImageDraw
 from os import path
 
 import BarcodeScanner as MWB
 import MWParser as MWP
 import MWResult as MWR
+import MWRegions
+import LiveCapture
+from DecoderConfig import DecoderConfig
+from ScannerPool import ScannerPool
+from SharedFrames import SharedScanner
+from BarcodeTracker import BarcodeTracker
+from ChangeGate import ChangeGate
 
 effortLevel = 4
 useMultiCode = False
 useTiles = False
+useAdaptive = False
+useTracking = False
+useGate = False
+changeThreshold = 8.0
 suppressOutput = False
 writeImage = False
 tilesX = 6
 tilesY = 6
 overlap = 6
 maxThreads = 4
+sources = []
+decoderThreads = 1
+decoderProcesses = None
+showImage = True
 
 argc = len(sys.argv)
 
 # if argc < 2:
-#     print("usage: pythonDemo [-En] [-M] [-S] [-T] [-Xn] [-Yn] [-On] [-Rn] [-W] filename\n\n" +
+#     print("usage: liveDecode [-En] [-M] [-S] [-T[A]] [-Xn] [-Yn] [-On] [-Rn] [-Vsource] [-Nn] [-H] [-K] [-Qn] [-Bn]\n\n" +
 #           "    -En         Effort level (1-5, default "+str(effortLevel)+")\n" +
 #           "    -M          Enable multi-code\n" +
 #           "    -S          Suppress barcode results\n" +
 #           "    -T          Generate tiled regions\n" +
+#           "    -TA         Adaptive regions around recent barcode locations (full tile grid on a miss)\n" +
 #           "    -Xn         Tiles X dimension (default "+str(tilesX)+")\n" +
 #           "    -Yn         Tiles Y dimension (default "+str(tilesY)+")\n" +
 #           "    -On         Tiles overlap percentage  (default "+str(overlap)+")\n" +
 #           "    -Rn         Maximum threads tiles/regions (default "+str(maxThreads)+")\n" +
-#           "    -W          Write output image\n" +
-#           "    filename    Image file to scan for barcodes\n\n")
+#           "    -Vsource    Camera index, video file, or synthetic:imagefile (default camera 0); repeat for several\n" +
+#           "                sources, each optionally followed by its own ,codes=DM|QR... ,level=n ,tiles=XxY\n" +
+#           "    -Nn         Decoder threads, shared by all sources (default "+str(decoderThreads)+")\n" +
+#           "    -H          Headless: no display window\n" +
+#           "    -K          Track barcodes between frames (scan around their last location, report each once)\n" +
+#           "    -Qn         Decode only frames that changed by more than n gray levels (default "+str(changeThreshold)+")\n" +
+#           "    -Bn         Decode in n worker processes (0 = one per CPU), which read the frames from shared memory\n\n")
 #     exit()
 
-for x in range(argc-2):
+for x in range(argc-1):
     arg = sys.argv[x+1]
     
     # Effort level (assume 3rd character is 1-5)
@@ -51,9 +71,11 @@ for x in range(argc-2):
     elif arg[0:2].upper() == "-S":
         suppressOutput = True
         
-    # Enable tiles (and subsequently, multicode)?
+    # Enable tiles (and subsequently, multicode), optionally adaptive regions (scanning around where barcodes
+    # were recently found, using tiles otherwise)?
     elif arg[0:2].upper() == "-T":
         useTiles = True
+        useAdaptive = arg[2:].upper() == "A"
 
     # Set tiles X
     elif arg[0:2].upper() == "-X":
@@ -74,16 +96,55 @@ for x in range(argc-2):
     # Write image with located barcodes?
     elif arg[0:2].upper() == "-W":
         writeImage = True
-    
-# Last argument must be the image file name
-# fileName = sys.argv[argc-1]
+
+    # Frame source: camera index, video file or synthetic frames (and its own settings)
+    elif arg[0:2].upper() == "-V":
+        sources.append(arg[2:])
+
+    # Number of decoder threads
+    elif arg[0:2].upper() == "-N":
+        decoderThreads = int(arg[2:])
+
+    # Headless (no display window)?
+    elif arg[0:2].upper() == "-H":
+        showImage = False
+
+    # Track barcodes from frame to frame?
+    elif arg[0:2].upper() == "-K":
+        useTracking = True
+
+    # Skip frames that did not change (optionally with the change threshold)?
+    elif arg[0:2].upper() == "-Q":
+        useGate = True
+        if len(arg) > 2:
+            changeThreshold = float(arg[2:])
+
+    # Decode in worker processes (frames passed in shared memory)?
+    elif arg[0:2].upper() == "-B":
+        decoderProcesses = int(arg[2:] or 0)
+
+if not sources:
+    sources.append("0")
+
+# Parse a source argument, source[,codes=DM|QR...][,level=n][,tiles=XxY], into the source and a dict of its settings
+def parseSource(spec):
+    parts = spec.split(",")
+    options = {}
+    for part in parts[1:]:
+        key, sep, value = part.partition("=")
+        options[key.strip().lower()] = value.strip()
+    return parts[0], options
 
 def main():
-    # Open live view of the camera
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        print("Cannot open camera")
-        exit()
+    # Open live view of the camera(s) (or the video files or synthetic frames used for testing)
+    caps = []
+    for spec in sources:
+        source, options = parseSource(spec)
+        cap = LiveCapture.openSource(source)
+        if not cap.isOpened():
+            print("Cannot open " + ("camera " + source if source.isdigit() else source))
+            exit()
+        caps.append((source, options, cap))
     
     # Setup the SDK
     status = MWB.MWBregisterSDK(b'<your key here>')
@@ -121,75 +182,155 @@ def main():
         print("  Multi-code enabled")
     if useTiles:
         print("  Using tiles (" + str(tilesX) + " x " + str(tilesY) + ") overlap " + str(overlap) + "%, " + str(maxThreads) + " threads");
+    if decoderThreads > 1:
+        print("  " + str(decoderThreads) + " decoder threads")
+    if useAdaptive:
+        print("  Using adaptive regions")
+    if useTracking:
+        print("  Tracking barcodes between frames")
+    if useGate:
+        print("  Decoding changed frames only (threshold " + str(changeThreshold) + ")")
 
-    resultLen = int(0)
-    regionData = []
-    regionCount = int(0)
+    # Create the scanner of a source (the adaptive planner, the tracker and the change gate learn from the frames of one source)
+    #  tiles - (tilesX, tilesY) to decode with tiles, or None to decode the entire image
+    def createScanner(tiles):
+        # The tile regions are the same for every frame, so create (and pack) them once
+        if tiles is not None:
+            regionSet = MWRegions.regionsFromTiles(tiles[0], tiles[1], overlap)
+
+        # Adaptive regions: learn where the barcodes appear from the results of previous frames
+        planner = None
+        if tiles is not None and useAdaptive:
+            planner = MWRegions.RegionPlanner(tiles[0], tiles[1], overlap)
+
+        # Decode a frame (called on the decoder threads)
+        #  The grayscale frame is a contiguous NumPy array, which the SDK wrappers scan in place (no tobytes() copy)
+        def scan(pixels, width, height):
+            if tiles is not None:
+                # Tiles/regions
+                #
+                #  This feature is primarily intended for use with multicode when there exists relatively small codes within a large image, or when 
+                #  the layout/locations of the barcodes is known. By dividing the image into smaller "regions", the decoder can process them much
+                #  more efficiently, including using multiple threads, if desired. After processing all the regions, the SDK merges the results, 
+                #  eliminating duplicates (due to overlapping regions) and retursn the results as a single MWResults list.
+                # 
+                #  When using tiles, the SDK divides the image into equally sized regions based on the number of columns (tilesX) and rows (tilesY)
+                #  specified, with some overlap. Note that the overlap (expressed as a percentage of the image size) needs to be at least as large as
+                #  the largest barcode to be scanned--otherwise the possibility exists that a code could be split across adjacent tiles and then
+                #  not be detected.
+                #
+                #  Regions are defined as two pairs of X,Y coordinates as the upper left and lower right corners, in percentages of the image size.
+                #
+                #  An application can also construct its own region data, explicitly defining the coordinates of each region versus using the tiles
+                #  feature. This application only demonstrates using tiles.
+                #
+                
+                # Decode using the defined regions (multithreaded), or the planner's regions
+                if planner is not None:
+                    return planner.scan(pixels, width, height, maxThreads)
+                return regionSet.scan(pixels, width, height, maxThreads)
 
-    # Go through the main loop
-    while True:
-        ret, frame = cap.read()
-        # frame = cv2.imread('download.jpeg')
-        # Pass the frame to the cognex sdk
-        '''
-        1. Convert cv2 image to PIL image
-        2. Continue with SDK
-        '''
-        img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        frame = Image.fromarray(frame)
-        grayScale = frame.convert('L')
-        pixels = grayScale.tobytes()
-        if useTiles:
-            # Tiles/regions
-            #
-            #  This feature is primarily intended for use with multicode when there exists relatively small codes within a large image, or when 
-            #  the layout/locations of the barcodes is known. By dividing the image into smaller "regions", the decoder can process them much
-            #  more efficiently, including using multiple threads, if desired. After processing all the regions, the SDK merges the results, 
-            #  eliminating duplicates (due to overlapping regions) and retursn the results as a single MWResults list.
-            # 
-            #  When using tiles, the SDK divides the image into equally sized regions based on the number of columns (tilesX) and rows (tilesY)
-            #  specified, with some overlap. Note that the overlap (expressed as a percentage of the image size) needs to be at least as large as
-            #  the largest barcode to be scanned--otherwise the possibility exists that a code could be split across adjacent tiles and then
-            #  not be detected.
-            #
-            #  Regions are defined as two pairs of X,Y coordinates as the upper left and lower right corners, in percentages of the image size.
-            #
-            #  An application can also construct its own region data, explicitly defining the coordinates of each region versus using the tiles
-            #  feature. This application only demonstrates using tiles.
-            #
-            
-            # Create the region data
-            regionCount, regionData = MWB.MWBcreateRegionsFromTiles(tilesX, tilesY, overlap)
-            
-            # Decode using the defined regions (multithreaded)
-            resultLen, scanResults = MWB.MWBscanGrayscaleRegions(pixels, grayScale.width, grayScale.height, regionData, regionCount, maxThreads)
-        
-        else:
             # Decode using the entire image (and any defined scanning rectangle)
-            resultLen, scanResults = MWB.MWBscanGrayscaleImage(pixels, grayScale.width, grayScale.height)
+            return MWB.MWBscanGrayscaleImage(pixels, width, height)
+
+        # Worker processes: the pool decodes (with the tiles, if any) the frames the capture threads write to shared memory
+        scanner = scan if sharedScanner is None else sharedScanner.scan
+
+        # Tracking: once a barcode has been found on a few frames, scan only around its last location (and skip the
+        #  full-frame decode) while it stays there, and report it only once while it stays in view. The scanning
+        #  rectangle is global, so with several decoder threads the tracker scans regions instead.
+        tracker = None
+        if useTracking:
+            tracker = BarcodeTracker(scanner=scan, useRegions=tiles is not None or decoderThreads > 1, maxThreads=maxThreads)
+            scanner = tracker.scan
+
+        # Change gate: decode a frame only if it differs from the last decoded frame (otherwise its result is reused),
+        #  so that an idle line costs little more than the capture
+        gate = None
+        if useGate:
+            gate = ChangeGate(changeThreshold, scanner=scanner)
+            scanner = gate.scan
+        return scanner, tracker, gate
 
-        # Make sure the results did not overrun our buffer (very bad)
-        if resultLen > sizeof(scanResults):
-            print("Critical error: scanResults buffer is too small")
+    # Per-source settings: the active codes and effort level of a source are applied (as a DecoderConfig) before decoding
+    #  its frames. When one source has its own settings, every source gets a configuration with the same settings.
+    perSourceConfig = any('codes' in options or 'level' in options for source, options, cap in caps)
+    if perSourceConfig:
+        baseConfig = DecoderConfig(activeCodes=MWB.MWBgetActiveCodes(), level=effortLevel)
+
+    # Worker processes: each one applies the configuration set up above once, then decodes the frames in place in the
+    #  capture threads' shared memory; only the slot and the results cross the process boundary (see SharedFrames.py).
+    #  The configuration of the workers is fixed, and learning scanners would need the library of this process.
+    pool = None
+    sharedScanner = None
+    if decoderProcesses is not None:
+        if useAdaptive or useTracking or perSourceConfig or any('tiles' in options for source, options, cap in caps):
+            print("Worker processes (-B) cannot be combined with adaptive regions, tracking or per-source settings")
             exit()
+        pool = ScannerPool(DecoderConfig.fromLibrary().copy(registrationKey=b'<your key here>', level=effortLevel),
+                           workers=decoderProcesses, tiles=(tilesX, tilesY, overlap, maxThreads) if useTiles else None)
+        sharedScanner = SharedScanner(pool)
+        print("  Decoding in " + str(pool.workers) + " worker processes (shared memory frames)")
+
+    # All sources share the decoder threads, which decode the newest frame of each source in turn (with worker processes,
+    #  one thread per worker hands it the frames)
+    live = LiveCapture.LiveDecoder(decoders=decoderThreads if pool is None else pool.workers, sharedFrames=pool is not None)
+    trackers = {}
+    gates = {}
+    for source, options, cap in caps:
+        config = None
+        if perSourceConfig:
+            config = baseConfig.copy(activeCodes=options.get('codes', baseConfig['activeCodes']),
+                                     level=int(options.get('level', effortLevel)))
+        tiles = (tilesX, tilesY) if useTiles else None
+        if 'tiles' in options:
+            x, sep, y = options['tiles'].lower().partition('x')
+            tiles = (int(x), int(y or x))
+
+        name = source if len(caps) == 1 else str(len(live.sources)) + ": " + source
+        scanner, trackers[name], gates[name] = createScanner(tiles)
+        live.addSource(cap, scanner, config, sequential=useAdaptive or useTracking or useGate, name=name)
+        if len(caps) > 1:
+            print("  Source " + name + (": tiles " + str(tiles[0]) + " x " + str(tiles[1]) if tiles else "") +
+                  (", " + repr(config) if config else ""))
 
-        # The length returned is for the raw results buffer; we will create an MWResults object from this since
-        # it's much easier to work with!
-        #
-        if resultLen > 0:
-            # Display MWResults
-            results = MWR.MWResults(scanResults)
-            if results.count > 0:
-                print("Total barcodes detected: ", results.count)
+    # Go through the main loop
+    #  Capture, decoding and display run on separate threads (see LiveCapture.py): the capture thread keeps only
+    #  the newest frame, so a slow decode drops frames rather than delaying the following results. Frames are
+    #  captured into a ring of preallocated buffers and converted to grayscale in place, so the loop does not
+    #  allocate new images for every frame. The loop below is the display stage.
+    live.start()
+    try:
+        for item in live.results():
+            frame = item.frame
+            tracker = trackers[item.source]
+            prefix = "" if len(caps) == 1 else "[" + item.source + "] "
+            resultLen = item.resultLen
+            scanResults = item.scanResults
+
+            # Make sure the results did not overrun our buffer (very bad)
+            if resultLen > sizeof(scanResults):
+                print("Critical error: scanResults buffer is too small")
+                exit()
+
+            # The length returned is for the raw results buffer; the decoder thread created an MWResults object
+            # from this since it's much easier to work with!
+            #
+            results = item.results
+            if resultLen > 0 and results.count > 0:
+                # Display MWResults (with tracking, only the barcodes that just came into view)
+                newResults = tracker.newResults(results) if tracker else results.results
+                if newResults:
+                    print(prefix + "Total barcodes detected: ", results.count, " (latency " + "%.1f" % item.latency + " ms)")
 
                 if not(suppressOutput):
-                    for i in range(results.count):
-                        result = results.results[i]
-                        print(str(i+1) + ": (" + result.typeName+ ") " + str(result.text))
+                    for i in range(len(newResults)):
+                        result = newResults[i]
+                        print(prefix + str(i+1) + ": (" + result.typeName+ ") " + str(result.text))
                         if parserMask != MWP.MWP_PARSER_MASK_NONE:
-                            
+                                
                             parsedData = create_string_buffer(10000)
-                            
+                                
                             # Envoke the parser
                             #
                             #  The SDK provides two parsers, each returning different results:
@@ -201,50 +342,52 @@ def main():
                             if pLen > sizeof(parsedData):
                                 print("Critical error: parsedData buffer is too small")
                                 exit()
-            
+                
                             if pLen > 0:
                                 print("  Parsed Result: " + parsedData.raw[0:int(pLen)].decode("utf-8"))
 
-                                
-                # Reload the orignal image
-                im = frame
-                draw = ImageDraw.Draw(im)
-                
-                # Draw a red box around each barcode found
+                                    
+                # Draw a red box around each barcode found, straight onto the captured (BGR) frame
                 for i in range(results.count):
                     result = results.results[i]
-                    draw.line([(result.locationPoints.p1.x,result.locationPoints.p1.y),
-                            (result.locationPoints.p2.x,result.locationPoints.p2.y),
-                            (result.locationPoints.p3.x,result.locationPoints.p3.y),
-                            (result.locationPoints.p4.x,result.locationPoints.p4.y),
-                            (result.locationPoints.p1.x,result.locationPoints.p1.y)],fill=(255,0,0),width=4)
-                        
-                img = np.array(im)
-                img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-                cv2.imshow('image', img)
-
-                if cv2.waitKey(1) == ord('q'):
-                    cap.release()
-                    cv2.destroyAllWindows()
-                    exit()
-        
-        
-
-        else:
-            print("No barcodes found: decoder returned " + str(resultLen))
-            ret, frame = cap.read()
-            cv2.imshow('image', frame)
-
-            if cv2.waitKey(1) == ord('q'):
-                cap.release()
-                cv2.destroyAllWindows()
-                exit()
+                    if result.locationPoints is not None:
+                        corners = np.array(result.locationPoints.coordinates, dtype=np.float32).reshape(4, 2).astype(np.int32)
+                        cv2.polylines(frame, [corners], True, (0, 0, 255), 4)
 
+            elif resultLen <= 0:
+                print(prefix + "No barcodes found: decoder returned " + str(resultLen))
 
+            # Display the live view
+            if showImage:
+                cv2.imshow('image' if len(caps) == 1 else item.source, frame)
+                if cv2.waitKey(1) == ord('q'):
+                    break
+    except KeyboardInterrupt:
+        # Ctrl-C ends headless runs
+        pass
+    finally:
+        live.stop()
+        if pool is not None:
+            pool.close()
+        # The trackers restore the duplicates timeout, the last one created first
+        for tracker in reversed(list(trackers.values())):
+            if tracker:
+                tracker.close()
+        for source, options, cap in caps:
+            cap.release()
+        if showImage:
+            cv2.destroyAllWindows()
 
-        # Display the live view
-        
+    print(live.report())
+    if sharedScanner is not None:
+        print(sharedScanner.report())
+    for name in trackers:
+        prefix = "" if len(caps) == 1 else "[" + name + "] "
+        if trackers[name]:
+            print(prefix + trackers[name].report())
+        if gates[name]:
+            print(prefix + gates[name].report())
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -15,6 +15,21 @@
 #           specified configuration (barcode types, multicode features, etc.). This is not a comprehensive demo
 #           of all of the SDK's features, but rather an example of how to use the library to decode barcodes
 #           from an image file.
+#
+#           With -B, the application runs in batch mode instead: it scans every image given as a directory,
+#           glob pattern or @file list, fanning the images out to worker processes (see ScannerPool.py) that
+#           each initialize the library once, streams the results as they complete, and reports the aggregate
+#           throughput and per-image latency. With -P, the batch is scanned in this process instead, with
+#           image loading and decoding overlapped in a pipeline (see ScanPipeline.py). With both, the pipeline's
+#           loader threads decode the images into shared memory, where the worker processes scan them in place
+#           (see SharedFrames.py).
+#
+#           With -D, JPEG images are loaded at reduced resolution (see ImageLoader.py) when the barcodes' modules
+#           are known to be large enough, and rescanned at full resolution if nothing is found.
+#
+#           Raw 8-bit grayscale frame dumps (.raw, .gray, with the frame size given by -G) and binary PGM files
+#           are not loaded: they are memory-mapped and the frames scanned straight from the mapping (see
+#           RawFrames.py). A file holding several frames is scanned like a batch, one result per frame.
 #           
 #           This example is based on Python 3 and relies on the Python Image Library (Pillow) for image handling;
 #           it must be installed:
@@ -38,40 +53,76 @@
 # Notice    Copyright (C) Cognex Corporation 
 #
 import sys
+import glob
 import time
 from ctypes import *
 from PIL import Image, ImageDraw
-from os import path
+from os import path, listdir
 
 import BarcodeScanner as MWB
 import MWParser as MWP
 import MWResult as MWR
+import ImageLoader
+import RawFrames
+from DecoderConfig import DecoderConfig
 
 effortLevel = 4
+maxEffortLevel = None
+effortBudget = None
 useMultiCode = False
 useTiles = False
+useRoi = False
+roiFallback = False
+autoTune = False
 suppressOutput = False
 writeImage = False
 tilesX = 6
 tilesY = 6
 overlap = 6
 maxThreads = 4
+batchWorkers = None
+pipelineLoaders = None
+outputFile = None
+draftModuleSize = None
+configFile = None
+rawWidth = None
+rawHeight = None
+rawHeader = 0
+rawFrameHeader = 0
+inputs = []
 
 argc = len(sys.argv)
 
 # Display usage message
 if argc < 2:
-    print("usage: pythonDemo [-En] [-M] [-S] [-T] [-Xn] [-Yn] [-On] [-Rn] [-W] filename\n\n" +
+    print("usage: pythonDemo [-En[-n]] [-Lms] [-M] [-S] [-T] [-I[F]] [-Xn] [-Yn] [-On] [-Rn] [-Dn] [-GWxH[+n[+n]]] [-W] filename\n" +
+          "       pythonDemo -Bn|-Pn|-Bn -Pn [-Ffile] [-A] [-En[-n]] [-Lms] [-M] [-S] [-T] [-Xn] [-Yn] [-On] [-Rn] [-Dn] [-GWxH[+n[+n]]] input ...\n\n" +
           "    -En         Effort level (1-5, default "+str(effortLevel)+")\n" +
+          "    -En-n       Effort escalation: rescan at higher levels (up to the 2nd n) when nothing is found\n" +
+          "                (full image and -P without -B modes)\n" +
+          "    -Lms        Effort escalation: time budget per image (ms)\n" +
           "    -M          Enable multi-code\n" +
           "    -S          Suppress barcode results\n" +
           "    -T          Generate tiled regions\n" +
+          "    -I          Scan only the regions of interest found by a pre-pass (requires NumPy)\n" +
+          "    -IF         Likewise, rescanning the entire image when the regions yield nothing\n" +
           "    -Xn         Tiles X dimension (default "+str(tilesX)+")\n" +
           "    -Yn         Tiles Y dimension (default "+str(tilesY)+")\n" +
           "    -On         Tiles overlap percentage  (default "+str(overlap)+")\n" +
           "    -Rn         Maximum threads tiles/regions (default "+str(maxThreads)+")\n" +
+          "    -Dn         Load JPEGs at reduced resolution; n = minimum module size in pixels (not with -P)\n" +
+          "    -GWxH+n+n   Raw input (.raw, .gray): frames of W x H 8-bit pixels, after an optional file header\n" +
+          "                and frame header (bytes); the files are memory-mapped, as are binary PGM files\n" +
+          "    -Cfile      Decoder configuration file (JSON or TOML, see DecoderConfig.py) applied on top\n" +
           "    -W          Write output image\n" +
-          "    filename    Image file to scan for barcodes\n\n")
+          "    -Bn         Batch mode using n worker processes (0 = one per CPU)\n" +
+          "    -Pn         Batch mode using a load/decode pipeline with n loader threads\n" +
+          "    -Bn -Pn     Batch mode: n loader threads decode the images into shared memory, scanned in place by the\n" +
+          "                worker processes (requires NumPy)\n" +
+          "    -Ffile      Batch mode: write the results to file instead of stdout\n" +
+          "    -A          Batch mode (-P without -B): enable all symbologies, then narrow them down to those found\n" +
+          "    filename    Image file to scan for barcodes (raw and PGM files may hold several frames)\n" +
+          "    input       Batch mode: image files, directories, glob patterns or @file lists\n\n")
     exit()
 
 # Parse the parameters
@@ -79,12 +130,23 @@ if argc < 2:
 # There are much more elegant and foolproof ways to process command line arguments; but this 
 # is just a simple sample application.  :)
 #
-for x in range(argc-2):
+for x in range(argc-1):
     arg = sys.argv[x+1]
+
+    # Anything that isn't an option is an image file (or, in batch mode, any input)
+    if arg[0:1] != "-":
+        inputs.append(arg)
     
-    # Effort level (assume 3rd character is 1-5)
+    # Effort level (assume 3rd character is 1-5), optionally followed by the level to escalate to
     if arg[0:2].upper() == "-E":
-        effortLevel = int(arg[2:])
+        if "-" in arg[2:]:
+            effortLevel, maxEffortLevel = [int(level) for level in arg[2:].split("-")]
+        else:
+            effortLevel = int(arg[2:])
+
+    # Effort escalation time budget
+    elif arg[0:2].upper() == "-L":
+        effortBudget = float(arg[2:])
 
     # Enable multicode?        
     elif arg[0:2].upper() == "-M":
@@ -98,6 +160,11 @@ for x in range(argc-2):
     elif arg[0:2].upper() == "-T":
         useTiles = True
 
+    # Region of interest pre-detection (optionally falling back to the entire image)?
+    elif arg[0:2].upper() == "-I":
+        useRoi = True
+        roiFallback = arg[2:].upper() == "F"
+
     # Set tiles X
     elif arg[0:2].upper() == "-X":
         tilesX = int(arg[2:])
@@ -117,297 +184,637 @@ for x in range(argc-2):
     # Write image with located barcodes?
     elif arg[0:2].upper() == "-W":
         writeImage = True
-    
-# Last argument must be the image file name
-fileName = sys.argv[argc-1]
-
-# Does the image file exist?
-if not path.isfile(fileName):
-    print("Unable to load image " + fileName)
-    exit()
 
-print("Loading image...", end='')
-starTime = time.time()
+    # Decoder configuration file
+    elif arg[0:2].upper() == "-C":
+        configFile = arg[2:]
+
+    # Draft loading (minimum module size in pixels)
+    elif arg[0:2].upper() == "-D":
+        draftModuleSize = float(arg[2:])
+
+    # Raw frame size (WxH), optionally followed by the file header and frame header sizes (+n+n)
+    elif arg[0:2].upper() == "-G":
+        size, *headers = arg[2:].split("+")
+        rawWidth, rawHeight = [int(value) for value in size.lower().split("x")]
+        headers = [int(value) for value in headers] + [0, 0]
+        rawHeader, rawFrameHeader = headers[0:2]
+
+    # Batch mode (number of worker processes)?
+    elif arg[0:2].upper() == "-B":
+        batchWorkers = int(arg[2:] or 0)
+
+    # Batch mode using a pipeline (number of loader threads)?
+    elif arg[0:2].upper() == "-P":
+        pipelineLoaders = int(arg[2:] or 4)
+
+    # Symbology auto-tuning?
+    elif arg[0:2].upper() == "-A":
+        autoTune = True
+
+    # Batch mode output file
+    elif arg[0:2].upper() == "-F":
+        outputFile = arg[2:]
+
+# Batch mode
+#
+#  Inputs may be image files, directories (all image files in them), glob patterns or @file lists (one
+#  image file name per line). The configuration below mirrors the single image configuration further down,
+#  as a dict that each worker process applies once (see ScannerPool.configureScanner).
+#
+#  Raw and PGM files are expanded to their frames (RawFrames.RawFrame), which are scanned in place in the mapped file.
+#
+imageExtensions = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tif', '.tiff', '.pgm', '.raw', '.gray')
+
+def expandNames(inputs):
+    for item in inputs:
+        if item[0:1] == "@":
+            with open(item[1:]) as listFile:
+                for line in listFile:
+                    if line.strip():
+                        yield line.strip()
+        elif path.isdir(item):
+            for name in sorted(listdir(item)):
+                if path.splitext(name)[1].lower() in imageExtensions:
+                    yield path.join(item, name)
+        elif glob.has_magic(item):
+            yield from sorted(glob.glob(item, recursive=True))
+        else:
+            yield item
+
+def expandInputs(inputs):
+    for name in expandNames(inputs):
+        if path.splitext(name)[1].lower() not in RawFrames.RAW_EXTENSIONS:
+            yield name
+            continue
+        try:
+            yield from RawFrames.openFrames(name, rawWidth, rawHeight, rawHeader, rawFrameHeader)
+        except OSError:
+            # Reported when the file is scanned
+            yield name
+        except ValueError as e:
+            # PGM images that cannot be mapped (ASCII, 16-bit) are loaded instead
+            if name.lower().endswith('.pgm'):
+                yield name
+            else:
+                print("Unable to scan " + name + ": " + str(e))
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+# Worker processes (-B): each process loads and scans whole images
+def scanWithPool(config, tiles):
+    from ScannerPool import ScannerPool
+
+    with ScannerPool(config, workers=batchWorkers, tiles=tiles, draft=draftModuleSize) as pool:
+        for image, resultLen, results, scanTime, error in pool.map(expandInputs(inputs), ordered=False, lazy=True):
+            if error is not None:
+                print("Unable to scan " + str(image) + ": " + str(error))
+                continue
+            yield image, results, scanTime
+
+# Pipeline (-P): loader threads decode the images while this process scans them
+def scanWithPipeline(config, tiles, scheduler, profiler):
+    from ScannerPool import configureScanner
+    from ScanPipeline import ScanPipeline
+    import MWRegions
+
+    configureScanner(config)
+    regions = None
+    if tiles is not None:
+        regionSet = MWRegions.regionsFromTiles(tilesX, tilesY, overlap)
+        regions = (regionSet.packed, regionSet.count, maxThreads)
+
+    # Effort escalation and symbology auto-tuning (the level and active codes are set per scan; the pipeline
+    # has a single scanner thread)
+    scanner = None
+    if regions is not None:
+        scanner = lambda pixels, width, height: regionSet.scan(pixels, width, height, maxThreads)
+    if scheduler is not None:
+        scheduler.scanner = scanner or scheduler.scanner
+        scanner = scheduler.scan
+    if profiler is not None:
+        profiler.scanner = scanner or profiler.scanner
+        scanner = profiler.scan
+
+    pipeline = ScanPipeline(loader=RawFrames.loadGrayscale, loadWorkers=pipelineLoaders, regions=regions, lazy=True, scanner=scanner)
+    for item in pipeline.run(expandInputs(inputs)):
+        if item.error is not None:
+            print("Unable to scan " + str(item.image) + ": " + str(item.error))
+            continue
+        yield item.image, item.results, item.loadTime + item.scanTime
+
+# Worker processes fed by a pipeline (-B with -P): loader threads decode the images into the slots of a shared
+#  memory ring, and the worker processes scan them there, so that only the slot and the results cross the process
+#  boundary (see SharedFrames.py). The slots are sized for the first image; larger images are passed by copy.
+def scanWithSharedFrames(config, tiles):
+    from itertools import chain
+    from ScannerPool import ScannerPool
+    from ScanPipeline import ScanPipeline
+    from SharedFrames import SharedFrameRing, SharedScanner
+
+    images = expandInputs(inputs)
+    first = next(images, None)
+    if first is None:
+        return
+    images = chain([first], images)
+    try:
+        if isinstance(first, RawFrames.RawFrame):
+            slotSize = first.width * first.height
+        else:
+            with Image.open(first) as image:
+                slotSize = image.width * image.height
+    except OSError:
+        slotSize = 1920 * 1080
+
+    with ScannerPool(config, workers=batchWorkers, tiles=tiles) as pool:
+        # A slot per image being loaded, waiting to be scanned or being scanned
+        scanDepth = pool.workers * 2
+        scanner = SharedScanner(pool)
+        with SharedFrameRing(pipelineLoaders + scanDepth + pool.workers, slotSize) as ring:
+            pipeline = ScanPipeline(loader=lambda image: ring.load(image, RawFrames.loadGrayscale), loadWorkers=pipelineLoaders, scanWorkers=pool.workers,
+                                    scanDepth=scanDepth, lazy=True, scanner=scanner.scan, release=ring.releaseImage)
+            for item in pipeline.run(images):
+                if item.error is not None:
+                    print("Unable to scan " + str(item.image) + ": " + str(item.error))
+                    continue
+                yield item.image, item.results, item.loadTime + item.scanTime
+        print(scanner.report())
+
+def runBatch():
+    config = DecoderConfig(registrationKey=b'<your key here>',
+                           activeCodes=MWB.MWB_CODE_MASK_DM,
+                           direction=MWB.MWB_SCANDIRECTION_HORIZONTAL | MWB.MWB_SCANDIRECTION_VERTICAL,
+                           level=effortLevel,
+                           resultType=MWB.MWB_RESULT_TYPE_MW)
+    if useMultiCode:
+        config = config.copy(flags={0: MWB.MWBgetFlags(0) | MWB.MWB_CFG_GLOBAL_ENABLE_MULTI})
+    if configFile is not None:
+        config = config.copy(**DecoderConfig.load(configFile).toDict())
+    tiles = (tilesX, tilesY, overlap, maxThreads) if useTiles else None
+
+    out = open(outputFile, "w") if outputFile else sys.stdout
+    latencies = []
+    found = 0
+
+    # Effort escalation runs in this process, so only with the pipeline (without worker processes, see main)
+    inProcess = pipelineLoaders is not None and batchWorkers is None
+    scheduler = None
+    if maxEffortLevel is not None and inProcess:
+        from EffortScheduler import EffortScheduler
+        scheduler = EffortScheduler(effortLevel, maxEffortLevel, effortBudget)
+
+    # Likewise symbology auto-tuning, starting from all symbologies
+    profiler = None
+    if autoTune and inProcess:
+        from SymbologyProfiler import SymbologyProfiler
+        config = config.copy(activeCodes=MWB.MWB_CODE_MASK_ALL)
+        profiler = SymbologyProfiler(MWB.MWB_CODE_MASK_ALL, autoApply=True)
+
+    starTime = time.time()
+    if inProcess:
+        scans = scanWithPipeline(config, tiles, scheduler, profiler)
+    elif pipelineLoaders is not None:
+        scans = scanWithSharedFrames(config, tiles)
+    else:
+        scans = scanWithPool(config, tiles)
 
-# Load the image, converting to grayscale as we do
-grayScale = Image.open(fileName).convert('L')
+    # Results are written as they complete (not in input order)
+    for image, results, scanTime in scans:
+        latencies.append(scanTime)
+        found += results.count
+        out.write(str(image) + ": " + str(results.count) + " barcode(s) (%.2f ms)\n" % scanTime)
+        if not(suppressOutput):
+            for i in range(results.count):
+                result = results.results[i]
+                out.write("  " + str(i+1) + ": (" + result.typeName + ") " + str(result.text) + "\n")
+        out.flush()
+    totalTime = time.time() - starTime
+
+    if out is not sys.stdout:
+        out.close()
+
+    if not latencies:
+        print("No images to scan")
+        return
+
+    latencies.sort()
+    print("Scanned %d images (%d barcodes) in %.2f s: %.1f images/sec" % (len(latencies), found, totalTime, len(latencies) / totalTime))
+    print("Per-image latency: p50 %.2f ms, p90 %.2f ms, p99 %.2f ms, max %.2f ms" %
+          (percentile(latencies, 50), percentile(latencies, 90), percentile(latencies, 99), latencies[-1]))
+    if scheduler is not None:
+        print(scheduler.report())
+    if profiler is not None:
+        print(profiler.report())
+
+# Scan a single image (or run the batch mode)
+#
+#  The scan is only started when run as a script: in batch mode, worker processes may import this file
+#  again (on Windows, where processes are spawned) and must not start scanning themselves.
+#
+def main():
+    global pipelineLoaders
+
+    if batchWorkers is not None or pipelineLoaders is not None:
+        # Effort escalation and symbology auto-tuning change the library's settings between scans, which
+        # worker processes cannot follow
+        if batchWorkers is not None and (maxEffortLevel is not None or autoTune):
+            print("Effort escalation (-En-n) and auto-tuning (-A) are not supported with worker processes (-B); use -P without -B")
+            exit()
+        runBatch()
+        return
+
+    # Last argument must be the image file name
+    fileName = sys.argv[argc-1]
+
+    # Does the image file exist?
+    if not path.isfile(fileName):
+        print("Unable to load image " + fileName)
+        exit()
+
+    # Raw frames and binary PGM images are memory-mapped rather than loaded (see RawFrames.py); a file holding several
+    #  frames is scanned like a batch (with a single loader thread, as "loading" a frame only takes a view of the mapping)
+    rawFrame = None
+    if path.splitext(fileName)[1].lower() in RawFrames.RAW_EXTENSIONS:
+        try:
+            frames = RawFrames.openFrames(fileName, rawWidth, rawHeight, rawHeader, rawFrameHeader)
+        except ValueError as e:
+            if not fileName.lower().endswith('.pgm'):
+                print("Unable to load image " + fileName + ": " + str(e))
+                exit()
+            frames = None
+        if frames is not None and len(frames) != 1:
+            print(fileName + ": " + str(len(frames)) + " frames")
+            if frames:
+                pipelineLoaders = 1
+                runBatch()
+            return
+        rawFrame = frames[0] if frames else None
+
+    print("Loading image...", end='')
+    starTime = time.time()
+
+    # Load the image, converting to grayscale as we do (at reduced resolution for draft loading)
+    scaleX = scaleY = 1.0
+    if rawFrame is not None:
+        # The pixels are a view of the mapped file, passed to the decoder without a copy
+        pixels, width, height = RawFrames.loadGrayscale(rawFrame)
+    else:
+        if draftModuleSize is not None:
+            grayScale, scaleX, scaleY = ImageLoader.openGrayscaleDraft(fileName, draftModuleSize)
+        else:
+            grayScale = Image.open(fileName).convert('L')
 
-# Get the image as a bytes object
-pixels = grayScale.tobytes()
+        # Get the image as a bytes object
+        pixels = grayScale.tobytes()
+        width, height = grayScale.width, grayScale.height
 
-endTime = time.time()
-totalMS = (endTime - starTime) * 1000
-print(" (%.2f" % totalMS + " ms)")
+    endTime = time.time()
+    totalMS = (endTime - starTime) * 1000
+    print(" (%.2f" % totalMS + " ms)")
 
 
-# Initialize the SDK with the license key.
-#
-#   Visit https://cmbdn.cognex.com to obtain a trial license key--without a valid, active license key
-#   barcode scan results will be masked with '*' characters and some features, like multi-code, may 
-#   not be enabled at all. Replace '<your key here>' below with your license key string.
-#
-status = MWB.MWBregisterSDK(b'<your key here>')
-if status != MWB.MWB_RTREG_OK:
-    print("MWBregisterSDK returned " + str(status) + "; scan results will be masked and some features may not be available")
+    # Initialize the SDK with the license key.
+    #
+    #   Visit https://cmbdn.cognex.com to obtain a trial license key--without a valid, active license key
+    #   barcode scan results will be masked with '*' characters and some features, like multi-code, may 
+    #   not be enabled at all. Replace '<your key here>' below with your license key string.
+    #
+    status = MWB.MWBregisterSDK(b'<your key here>')
+    if status != MWB.MWB_RTREG_OK:
+        print("MWBregisterSDK returned " + str(status) + "; scan results will be masked and some features may not be available")
    
 
-# Active codes
-#
-#  You must specify which symbologies the decoder is to look for; no symbologies are enabled by default. The parameter
-#  to MWBsetActiveCodes is an ORed mask of all the symbologies to be enabled.
-#
-#  For the best performance, only enable symbologies you explicitly need to scan; enabling too many (unnecessary) symbologies
-#  can slow the decoder, especially on low-end devices.
-#
-MWB.MWBsetActiveCodes(  # MWB.MWB_CODE_MASK_QR  |
-                        MWB.MWB_CODE_MASK_DM |
-                        # MWB.MWB_CODE_MASK_RSS |
-                        # MWB.MWB_CODE_MASK_39 |
-                        # MWB.MWB_CODE_MASK_EANUPC |
-                        # MWB.MWB_CODE_MASK_128  |
-                        # MWB.MWB_CODE_MASK_PDF  |
-                        # MWB.MWB_CODE_MASK_AZTEC |
-                        # MWB.MWB_CODE_MASK_25 |
-                        # MWB.MWB_CODE_MASK_93 |
-                        # MWB.MWB_CODE_MASK_CODABAR |
-                        # MWB.MWB_CODE_MASK_DOTCODE |
-                        # MWB.MWB_CODE_MASK_11 |
-                        # MWB.MWB_CODE_MASK_MSI |
-                        # MWB.MWB_CODE_MASK_MAXICODE |
-                        # MWB.MWB_CODE_MASK_POSTAL |
-                        # MWB.MWB_CODE_MASK_TELEPEN |
-                        0x0)
-
-# 1D Scan direction
-#
-#  The decoder supports horizontal, vertical, hortizonal & vertical, or omnidirectional scanning for 1D barcodes (2D codes will 
-#  scan in any orientation and are not impacted by this setting). In most cases, using just horizontal & vertical is sufficient
-#  to locate most 1D codes; omnidirectional can be much slower.
-#
-MWB.MWBsetDirection(MWB.MWB_SCANDIRECTION_HORIZONTAL | MWB.MWB_SCANDIRECTION_VERTICAL)
-# MWB.MWBsetDirection(MWB.MWB_SCANDIRECTION_OMNI)
+    # Active codes
+    #
+    #  You must specify which symbologies the decoder is to look for; no symbologies are enabled by default. The parameter
+    #  to MWBsetActiveCodes is an ORed mask of all the symbologies to be enabled.
+    #
+    #  For the best performance, only enable symbologies you explicitly need to scan; enabling too many (unnecessary) symbologies
+    #  can slow the decoder, especially on low-end devices.
+    #
+    MWB.MWBsetActiveCodes(  # MWB.MWB_CODE_MASK_QR  |
+                            MWB.MWB_CODE_MASK_DM |
+                            # MWB.MWB_CODE_MASK_RSS |
+                            # MWB.MWB_CODE_MASK_39 |
+                            # MWB.MWB_CODE_MASK_EANUPC |
+                            # MWB.MWB_CODE_MASK_128  |
+                            # MWB.MWB_CODE_MASK_PDF  |
+                            # MWB.MWB_CODE_MASK_AZTEC |
+                            # MWB.MWB_CODE_MASK_25 |
+                            # MWB.MWB_CODE_MASK_93 |
+                            # MWB.MWB_CODE_MASK_CODABAR |
+                            # MWB.MWB_CODE_MASK_DOTCODE |
+                            # MWB.MWB_CODE_MASK_11 |
+                            # MWB.MWB_CODE_MASK_MSI |
+                            # MWB.MWB_CODE_MASK_MAXICODE |
+                            # MWB.MWB_CODE_MASK_POSTAL |
+                            # MWB.MWB_CODE_MASK_TELEPEN |
+                            0x0)
+
+    # 1D Scan direction
+    #
+    #  The decoder supports horizontal, vertical, hortizonal & vertical, or omnidirectional scanning for 1D barcodes (2D codes will 
+    #  scan in any orientation and are not impacted by this setting). In most cases, using just horizontal & vertical is sufficient
+    #  to locate most 1D codes; omnidirectional can be much slower.
+    #
+    MWB.MWBsetDirection(MWB.MWB_SCANDIRECTION_HORIZONTAL | MWB.MWB_SCANDIRECTION_VERTICAL)
+    # MWB.MWBsetDirection(MWB.MWB_SCANDIRECTION_OMNI)
 
-# Verify 1D location
-#
-#  Due to the weakness of some 1D symbologies, misreads and short reads are possible in cases of poor print quality, blurry images,
-#  extreme skew, etc. To combat this, the decoder provides a verification feature where the decoder works harder to verify the 1D
-#  barcode's edges and value. By default, this feature is on for Code 11, Code 25 (all variants), Code 39, Codabar, Code 128, and 
-#  MSI Plessey. Be aware that this setting can reduce scanning performance, especially if more than a few symoblogies are enabled.
-#
-#MWB.MWBsetParam(MWB.MWB_CODE_MASK_EANUPC, MWB.MWB_PAR_ID_VERIFY_LOCATION, MWB.MWB_PAR_VALUE_VERIFY_LOCATION_ON)
+    # Verify 1D location
+    #
+    #  Due to the weakness of some 1D symbologies, misreads and short reads are possible in cases of poor print quality, blurry images,
+    #  extreme skew, etc. To combat this, the decoder provides a verification feature where the decoder works harder to verify the 1D
+    #  barcode's edges and value. By default, this feature is on for Code 11, Code 25 (all variants), Code 39, Codabar, Code 128, and 
+    #  MSI Plessey. Be aware that this setting can reduce scanning performance, especially if more than a few symoblogies are enabled.
+    #
+    #MWB.MWBsetParam(MWB.MWB_CODE_MASK_EANUPC, MWB.MWB_PAR_ID_VERIFY_LOCATION, MWB.MWB_PAR_VALUE_VERIFY_LOCATION_ON)
 
-# Quiet zones
-#
-#  Most 1D barcode symbologies define minimum quiet zones for the barcode (whitespace around the barcode's bar/space patterns) to
-#  aid in detection and decoding. By default, the decoder only requires that 50% of this requirement be met for Code 11, Code 25,
-#  Code 39, Code 128, Codabar, and MSI Plessey (this value is not tunable for other supported symbologies). This quiet zone
-#  requirement can be tuned to be more or less strict. Keep in mind though:
-#
-#     * Less strict quiet zones can lead to misreads and short reads (not recommended)
-#     * More strict quiet zones can help reduce misreads and short reads, but may lead to some no reads.
-#
-#  Below is an example of changing Code 128 to require 100% of the specified quiet zone for the code to be read.
-#
-#MWB.MWBsetParam(MWB.MWB_CODE_MASK_128, MWB.MWB_PAR_ID_SAFE_ZONE_SCALE, 100)
+    # Quiet zones
+    #
+    #  Most 1D barcode symbologies define minimum quiet zones for the barcode (whitespace around the barcode's bar/space patterns) to
+    #  aid in detection and decoding. By default, the decoder only requires that 50% of this requirement be met for Code 11, Code 25,
+    #  Code 39, Code 128, Codabar, and MSI Plessey (this value is not tunable for other supported symbologies). This quiet zone
+    #  requirement can be tuned to be more or less strict. Keep in mind though:
+    #
+    #     * Less strict quiet zones can lead to misreads and short reads (not recommended)
+    #     * More strict quiet zones can help reduce misreads and short reads, but may lead to some no reads.
+    #
+    #  Below is an example of changing Code 128 to require 100% of the specified quiet zone for the code to be read.
+    #
+    #MWB.MWBsetParam(MWB.MWB_CODE_MASK_128, MWB.MWB_PAR_ID_SAFE_ZONE_SCALE, 100)
 
-#
-# Decoder effort level (1 - 5)
-#
-#  When scanning from a live video stream, typically use level 2 (use level 1 for very pristine codes), or level 3  
-#  for difficult or dense codes (PDF417). Levels 4 and 5 are intended for offline/batch scanning of an image where
-#  extended decode times are not an issue.
-#
-MWB.MWBsetLevel(effortLevel)
+    #
+    # Decoder effort level (1 - 5)
+    #
+    #  When scanning from a live video stream, typically use level 2 (use level 1 for very pristine codes), or level 3  
+    #  for difficult or dense codes (PDF417). Levels 4 and 5 are intended for offline/batch scanning of an image where
+    #  extended decode times are not an issue.
+    #
+    MWB.MWBsetLevel(effortLevel)
 
-# Scanning rectangle
-#
-#  You can limit the portion of the image that the SDK will search when locating a barcode. This is useful when working
-#  with large images and the general location of the barcode is known (when scanning with a mobile phone, this scenario
-#  is common as the user interface typically leads the user to center the barcode and even within a virtual bounding area
-#  on screen). This may not be the case with offline image processing (that is, the barcode may appear anywhere within
-#  the image).
-#
-#  While a different scanning rectangle can be defined for each symbology, the SDK will use a union of all defined 
-#  scanning rectangles for 1D symbologies when searching for 1D barcodes (including PDF417) and a union of all 
-#  defined scanning rectangles for 2D symbologies when searching for 2D barcodes.
-#
-#  Keep in mind that for 1D codes, a portion of the barocode that is at least the entire width of the barcode (including
-#  quiet zones) must be within the scanning rectangle for it to be decoded (the entire height of the 1D code is not 
-#  required to be within the scanning rectangle), while for 2D codes the entire code including quiet zones, must be
-#  within the scanning rectangle for it to be decoded.
-#
-#  A scanning rectangle for PDF417 is treated as a 1D symbology; however, due to PDF417's error correction capabiliies,
-#  this means that the entire width of a PDF417 may not have to be within the scanning rectangle to be decoded (since 
-#  the error correction can recover erasures). Generally this is only likely to occur when a high ECC level has been
-#  employed: otherwise expect that the entire PDF417 must be within the scanning rectangle for reliable decoding.
-#
-#  NOTE: do not use a scanning rectangle in conjunction with multi-code and regions as the results may be 
-#        unpredictable.
-#
-# MWB.MWBsetScanningRect(MWB.MWB_CODE_MASK_PDF, 0, 25, 100, 50);
+    # Scanning rectangle
+    #
+    #  You can limit the portion of the image that the SDK will search when locating a barcode. This is useful when working
+    #  with large images and the general location of the barcode is known (when scanning with a mobile phone, this scenario
+    #  is common as the user interface typically leads the user to center the barcode and even within a virtual bounding area
+    #  on screen). This may not be the case with offline image processing (that is, the barcode may appear anywhere within
+    #  the image).
+    #
+    #  While a different scanning rectangle can be defined for each symbology, the SDK will use a union of all defined 
+    #  scanning rectangles for 1D symbologies when searching for 1D barcodes (including PDF417) and a union of all 
+    #  defined scanning rectangles for 2D symbologies when searching for 2D barcodes.
+    #
+    #  Keep in mind that for 1D codes, a portion of the barocode that is at least the entire width of the barcode (including
+    #  quiet zones) must be within the scanning rectangle for it to be decoded (the entire height of the 1D code is not 
+    #  required to be within the scanning rectangle), while for 2D codes the entire code including quiet zones, must be
+    #  within the scanning rectangle for it to be decoded.
+    #
+    #  A scanning rectangle for PDF417 is treated as a 1D symbology; however, due to PDF417's error correction capabiliies,
+    #  this means that the entire width of a PDF417 may not have to be within the scanning rectangle to be decoded (since 
+    #  the error correction can recover erasures). Generally this is only likely to occur when a high ECC level has been
+    #  employed: otherwise expect that the entire PDF417 must be within the scanning rectangle for reliable decoding.
+    #
+    #  NOTE: do not use a scanning rectangle in conjunction with multi-code and regions as the results may be 
+    #        unpredictable.
+    #
+    # MWB.MWBsetScanningRect(MWB.MWB_CODE_MASK_PDF, 0, 25, 100, 50);
 
-# Multi-code
-#
-#  Multi-code can detect as many as 150 barcodes in a single image, though doing so may require significant resources. If the
-#  image(s) being decoded have specific, known regions or very dense codes, consider using tiles or defining custom regions.
-#  Multi-code requires a license key that has this feature enabled (NOTE: a trial license includes multi-code).
-#
-#  Note that when setting global decoder options (code mask == 0), OR the new flag with any existing settings.
-#
-if useMultiCode:
-    MWB.MWBsetFlags(0, MWB.MWBgetFlags(0) | MWB.MWB_CFG_GLOBAL_ENABLE_MULTI)
+    # Multi-code
+    #
+    #  Multi-code can detect as many as 150 barcodes in a single image, though doing so may require significant resources. If the
+    #  image(s) being decoded have specific, known regions or very dense codes, consider using tiles or defining custom regions.
+    #  Multi-code requires a license key that has this feature enabled (NOTE: a trial license includes multi-code).
+    #
+    #  Note that when setting global decoder options (code mask == 0), OR the new flag with any existing settings.
+    #
+    if useMultiCode:
+        MWB.MWBsetFlags(0, MWB.MWBgetFlags(0) | MWB.MWB_CFG_GLOBAL_ENABLE_MULTI)
 
-# Scan results
-#
-#  Use MWResults for all meta data as well as the scanned barcode data
-#
-MWB.MWBsetResultType(MWB.MWB_RESULT_TYPE_MW)
+    # Scan results
+    #
+    #  Use MWResults for all meta data as well as the scanned barcode data
+    #
+    MWB.MWBsetResultType(MWB.MWB_RESULT_TYPE_MW)
 
-# Parsers
-#
-#  Industry standard parsers for a variety of formats are provided for easier processing of common structured data formats. The 
-#  parsed results can either be a JSON document or formated text (see the use of the parser below). The SDK provides the following
-#  parsers:
-#      GS1 - standard data format for the exchange of global trade information
-#      IUID - Item Unique Identification marking (or UID), mandated by the US Department of Defense
-#      ISBT - global standard for the identification, labeling, and information transfer of medical products of human origin
-#      AAMVA - format used for North American driver's licenses and IDs (PDF417 barcode)
-#      HIBC - similar to IUID/UID, the Health Industry Bar Code addresse the specific safety and security needs of the 
-#             healcare industry
-#      SCM - Structured Carrier message; most commonly used in MaxiCode barcodes for shipping inforamtion 
-#
-#  See mwParser.cs for more details.
-#
-#  Use of the parsers requires a license key that has this feature enabled (NOTE: a trial license includes all parsers).
-#
-parserMask = MWP.MWP_PARSER_MASK_NONE
-#parserMask = MWP.MWP_PARSER_MASK_GS1
-parserMask = MWP.MWP_PARSER_MASK_AAMVA
-
-# Gets SDK version as a string
-sdkVersion = MWB.MWBgetLibVersionText()
-
-print("Starting decoder - SDK Version " + str(sdkVersion))
-print("  Image " + fileName + " (" + str(grayScale.height) + " X " + str(grayScale.width) + " pixels)")
-print("  Effort level: " + str(effortLevel))
-if useMultiCode:
-    print("  Multi-code enabled")
-if useTiles:
-    print("  Using tiles (" + str(tilesX) + " x " + str(tilesY) + ") overlap " + str(overlap) + "%, " + str(maxThreads) + " threads");
-
-resultLen = int(0)
-regionData = []
-regionCount = int(0)
-
-starTime = time.time()
-
-# Decode the image
-if useTiles:
-    # Tiles/regions
-    #
-    #  This feature is primarily intended for use with multicode when there exists relatively small codes within a large image, or when 
-    #  the layout/locations of the barcodes is known. By dividing the image into smaller "regions", the decoder can process them much
-    #  more efficiently, including using multiple threads, if desired. After processing all the regions, the SDK merges the results, 
-    #  eliminating duplicates (due to overlapping regions) and retursn the results as a single MWResults list.
-    # 
-    #  When using tiles, the SDK divides the image into equally sized regions based on the number of columns (tilesX) and rows (tilesY)
-    #  specified, with some overlap. Note that the overlap (expressed as a percentage of the image size) needs to be at least as large as
-    #  the largest barcode to be scanned--otherwise the possibility exists that a code could be split across adjacent tiles and then
-    #  not be detected.
-    #
-    #  Regions are defined as two pairs of X,Y coordinates as the upper left and lower right corners, in percentages of the image size.
-    #
-    #  An application can also construct its own region data, explicitly defining the coordinates of each region versus using the tiles
-    #  feature. This application only demonstrates using tiles.
+    # Configuration file
     #
-    
-    # Create the region data
-    regionCount, regionData = MWB.MWBcreateRegionsFromTiles(tilesX, tilesY, overlap)
-    
-    # Decode using the defined regions (multithreaded)
-    resultLen, scanResults = MWB.MWBscanGrayscaleRegions(pixels, grayScale.width, grayScale.height, regionData, regionCount, maxThreads)
-   
-else:
-    # Decode using the entire image (and any defined scanning rectangle)
-    resultLen, scanResults = MWB.MWBscanGrayscaleImage(pixels, grayScale.width, grayScale.height)
+    #  All of the settings above can also be given declaratively, as a JSON or TOML file loaded into a DecoderConfig (see
+    #  DecoderConfig.py); the file's settings are applied on top of the ones above.
+    #
+    if configFile is not None:
+        DecoderConfig.load(configFile).apply()
 
-endTime = time.time()
+    # Parsers
+    #
+    #  Industry standard parsers for a variety of formats are provided for easier processing of common structured data formats. The 
+    #  parsed results can either be a JSON document or formated text (see the use of the parser below). The SDK provides the following
+    #  parsers:
+    #      GS1 - standard data format for the exchange of global trade information
+    #      IUID - Item Unique Identification marking (or UID), mandated by the US Department of Defense
+    #      ISBT - global standard for the identification, labeling, and information transfer of medical products of human origin
+    #      AAMVA - format used for North American driver's licenses and IDs (PDF417 barcode)
+    #      HIBC - similar to IUID/UID, the Health Industry Bar Code addresse the specific safety and security needs of the 
+    #             healcare industry
+    #      SCM - Structured Carrier message; most commonly used in MaxiCode barcodes for shipping inforamtion 
+    #
+    #  See mwParser.cs for more details.
+    #
+    #  Use of the parsers requires a license key that has this feature enabled (NOTE: a trial license includes all parsers).
+    #
+    parserMask = MWP.MWP_PARSER_MASK_NONE
+    #parserMask = MWP.MWP_PARSER_MASK_GS1
+    parserMask = MWP.MWP_PARSER_MASK_AAMVA
 
-# Make sure the results did not overrun our buffer (very bad)
-if resultLen > sizeof(scanResults):
-    print("Critical error: scanResults buffer is too small")
-    exit()
+    # Gets SDK version as a string
+    sdkVersion = MWB.MWBgetLibVersionText()
 
-# The length returned is for the raw results buffer; we will create an MWResults object from this since
-# it's much easier to work with!
-#
-if resultLen > 0:
-    # Display MWResults
-    results = MWR.MWResults(scanResults)
-    if results.count > 0:
-        print("Total barcodes detected: ", results.count)
+    print("Starting decoder - SDK Version " + str(sdkVersion))
+    print("  Image " + fileName + " (" + str(height) + " X " + str(width) + " pixels)")
+    if maxEffortLevel is not None:
+        print("  Effort level: " + str(effortLevel) + " to " + str(maxEffortLevel))
+    else:
+        print("  Effort level: " + str(effortLevel))
+    if useMultiCode:
+        print("  Multi-code enabled")
+    if scaleX != 1.0 or scaleY != 1.0:
+        print("  Draft loading: scanning at 1/%d scale" % round(scaleX))
+    if useTiles:
+        print("  Using tiles (" + str(tilesX) + " x " + str(tilesY) + ") overlap " + str(overlap) + "%, " + str(maxThreads) + " threads");
+
+    resultLen = int(0)
+    regionData = []
+    regionCount = int(0)
+
+    starTime = time.time()
+
+    # Decode the image
+    if useTiles:
+        # Tiles/regions
+        #
+        #  This feature is primarily intended for use with multicode when there exists relatively small codes within a large image, or when 
+        #  the layout/locations of the barcodes is known. By dividing the image into smaller "regions", the decoder can process them much
+        #  more efficiently, including using multiple threads, if desired. After processing all the regions, the SDK merges the results, 
+        #  eliminating duplicates (due to overlapping regions) and retursn the results as a single MWResults list.
+        # 
+        #  When using tiles, the SDK divides the image into equally sized regions based on the number of columns (tilesX) and rows (tilesY)
+        #  specified, with some overlap. Note that the overlap (expressed as a percentage of the image size) needs to be at least as large as
+        #  the largest barcode to be scanned--otherwise the possibility exists that a code could be split across adjacent tiles and then
+        #  not be detected.
+        #
+        #  Regions are defined as two pairs of X,Y coordinates as the upper left and lower right corners, in percentages of the image size.
+        #
+        #  An application can also construct its own region data, explicitly defining the coordinates of each region versus using the tiles
+        #  feature. This application only demonstrates using tiles.
+        #
+    
+        # Create the region data
+        regionCount, regionData = MWB.MWBcreateRegionsFromTiles(tilesX, tilesY, overlap)
+    
+        # Decode using the defined regions (multithreaded)
+        resultLen, scanResults = MWB.MWBscanGrayscaleRegions(pixels, width, height, regionData, regionCount, maxThreads)
+   
+    elif useRoi:
+        # Regions of interest
+        #
+        #  A cheap pre-pass (see RoiDetector.py) looks for the areas of the image with dense, high contrast edges and only
+        #  those are decoded, as regions; when nothing stands out (or the candidates cover most of the image) the entire
+        #  image is decoded instead. With -IF the entire image is also decoded when the regions yield nothing, so that a
+        #  missed candidate costs time rather than barcodes, but a miss then costs more than decoding the entire image.
+        #
+        from RoiDetector import RoiDetector
+
+        detector = RoiDetector(fallback=roiFallback)
+        regionSet = detector.detect(pixels, width, height)
+        if regionSet is not None:
+            print("  Regions of interest: " + str(regionSet.count))
+            regionCount, regionData = regionSet.count, list(regionSet.regions)
+            resultLen, scanResults = regionSet.scan(pixels, width, height, maxThreads)
+            if resultLen <= 0 and detector.fallback:
+                print("  Nothing found in the regions of interest; rescanning the entire image")
+                regionCount, regionData = 0, []
+                resultLen, scanResults = MWB.MWBscanGrayscaleImage(pixels, width, height)
+        else:
+            resultLen, scanResults = MWB.MWBscanGrayscaleImage(pixels, width, height)
+
+    elif maxEffortLevel is not None:
+        # Effort escalation
+        #
+        #  Decode at the effort level given first, rescanning the image at each higher level (up to maxEffortLevel) only when nothing
+        #  was found, within the time budget if one is given. Easy images only pay for the low level scan.
+        #
+        from EffortScheduler import EffortScheduler
+
+        scheduler = EffortScheduler(effortLevel, maxEffortLevel, effortBudget)
+        resultLen, scanResults = scheduler.scan(pixels, width, height)
+        if scheduler.lastLevel is not None:
+            print("  Decoded at effort level " + str(scheduler.lastLevel))
 
-        if not(suppressOutput):
-            for i in range(results.count):
-                result = results.results[i]
-                print(str(i+1) + ": (" + result.typeName+ ") " + str(result.text))
-                if parserMask != MWP.MWP_PARSER_MASK_NONE:
+    else:
+        # Decode using the entire image (and any defined scanning rectangle)
+        resultLen, scanResults = MWB.MWBscanGrayscaleImage(pixels, width, height)
+
+    # Draft loading: nothing found in the reduced image? Rescan at full resolution
+    if resultLen <= 0 and (scaleX != 1.0 or scaleY != 1.0):
+        print("  Nothing found at reduced resolution; rescanning at full resolution")
+        grayScale = Image.open(fileName).convert('L')
+        pixels = grayScale.tobytes()
+        width, height = grayScale.width, grayScale.height
+        scaleX = scaleY = 1.0
+        if useTiles:
+            resultLen, scanResults = MWB.MWBscanGrayscaleRegions(pixels, width, height, regionData, regionCount, maxThreads)
+        else:
+            resultLen, scanResults = MWB.MWBscanGrayscaleImage(pixels, width, height)
+
+    endTime = time.time()
+
+    # Make sure the results did not overrun our buffer (very bad)
+    if resultLen > sizeof(scanResults):
+        print("Critical error: scanResults buffer is too small")
+        exit()
+
+    # The length returned is for the raw results buffer; we will create an MWResults object from this since
+    # it's much easier to work with!
+    #
+    if resultLen > 0:
+        # Display MWResults
+        results = MWR.MWResults(scanResults)
+
+        # Map the locations (etc.) of a reduced scan back to the full resolution image
+        if scaleX != 1.0 or scaleY != 1.0:
+            ImageLoader.scaleResults(results, scaleX, scaleY)
+
+        if results.count > 0:
+            print("Total barcodes detected: ", results.count)
+
+            if not(suppressOutput):
+                for i in range(results.count):
+                    result = results.results[i]
+                    print(str(i+1) + ": (" + result.typeName+ ") " + str(result.text))
+                    if parserMask != MWP.MWP_PARSER_MASK_NONE:
                     
-                    parsedData = create_string_buffer(10000)
+                        parsedData = create_string_buffer(10000)
                     
-                    # Envoke the parser
-                    #
-                    #  The SDK provides two parsers, each returning different results:
-                    #    JSON - parsed results are returned as a JSON document
-                    #    Text - parsed results are returned as key/value pairs (primarily for demonstration/readability purposes)
-                    #
-                    #pLen, parsedData = MWB.MWPgetJSON(parserMask, result.parserInput, len(result.parserInput))
-                    pLen, parsedData = MWB.MWPgetFormattedText(parserMask, result.parserInput, len(result.parserInput))
-                    if pLen > sizeof(parsedData):
-                        print("Critical error: parsedData buffer is too small")
-                        exit()
+                        # Envoke the parser
+                        #
+                        #  The SDK provides two parsers, each returning different results:
+                        #    JSON - parsed results are returned as a JSON document
+                        #    Text - parsed results are returned as key/value pairs (primarily for demonstration/readability purposes)
+                        #
+                        #pLen, parsedData = MWB.MWPgetJSON(parserMask, result.parserInput, len(result.parserInput))
+                        pLen, parsedData = MWB.MWPgetFormattedText(parserMask, result.parserInput, len(result.parserInput))
+                        if pLen > sizeof(parsedData):
+                            print("Critical error: parsedData buffer is too small")
+                            exit()
     
-                    if pLen > 0:
-                        print("  Parsed Result: " + parsedData.raw[0:int(pLen)].decode("utf-8"))
+                        if pLen > 0:
+                            print("  Parsed Result: " + parsedData.raw[0:int(pLen)].decode("utf-8"))
 
                         
-        # Write image with overlays?
-        if writeImage:
-            # Reload the orignal image
-            im = Image.open(fileName)
-            draw = ImageDraw.Draw(im)
+            # Write image with overlays?
+            if writeImage:
+                # Reload the orignal image (raw frames have no file format to reload: use their pixels)
+                if rawFrame is not None:
+                    im = Image.frombuffer('L', (width, height), bytes(pixels), 'raw', 'L', 0, 1).convert('RGB')
+                else:
+                    im = Image.open(fileName)
+                draw = ImageDraw.Draw(im)
             
-            # Draw a red box around each barcode found
-            for i in range(results.count):
-                result = results.results[i]
-                draw.line([(result.locationPoints.p1.x,result.locationPoints.p1.y),
-                           (result.locationPoints.p2.x,result.locationPoints.p2.y),
-                           (result.locationPoints.p3.x,result.locationPoints.p3.y),
-                           (result.locationPoints.p4.x,result.locationPoints.p4.y),
-                           (result.locationPoints.p1.x,result.locationPoints.p1.y)],fill=(255,0,0),width=4)
-            im.show()
+                # Draw a red box around each barcode found
+                for i in range(results.count):
+                    result = results.results[i]
+                    draw.line([(result.locationPoints.p1.x,result.locationPoints.p1.y),
+                               (result.locationPoints.p2.x,result.locationPoints.p2.y),
+                               (result.locationPoints.p3.x,result.locationPoints.p3.y),
+                               (result.locationPoints.p4.x,result.locationPoints.p4.y),
+                               (result.locationPoints.p1.x,result.locationPoints.p1.y)],fill=(255,0,0),width=4)
+                im.show()
             
-            # If we defined regions, draw them in yellow    
-            if regionCount > 0:
-                for i in range(regionCount):
-                    # Regions are defined as percentages X, Y, W, H
-                    x1 = (regionData[i*4] / 100 ) * grayScale.width
-                    y1 = (regionData[i*4+1] / 100 ) * grayScale.height
-                    x2 = x1 + (regionData[i*4+2] / 100 ) * grayScale.width
-                    y2 = y1 + (regionData[i*4+3] / 100 ) * grayScale.height
-
-                    # Bah; draw the rectangle using lines as older versions of Pillow do not support width= for .rectangle
-                    draw.line([(x1,y1),(x2,y1),(x2,y2),(x1,y2),(x1,y1)],fill=(255,255,0),width=4)
-
-            # Save as a new image with _out appended to the file name
-            split = path.splitext(fileName)
-            im.save(split[0]+"_out"+split[1])
-
+                # If we defined regions, draw them in yellow    
+                if regionCount > 0:
+                    for i in range(regionCount):
+                        # Regions are defined as percentages X, Y, W, H
+                        x1 = (regionData[i*4] / 100 ) * im.width
+                        y1 = (regionData[i*4+1] / 100 ) * im.height
+                        x2 = x1 + (regionData[i*4+2] / 100 ) * im.width
+                        y2 = y1 + (regionData[i*4+3] / 100 ) * im.height
+
+                        # Bah; draw the rectangle using lines as older versions of Pillow do not support width= for .rectangle
+                        draw.line([(x1,y1),(x2,y1),(x2,y2),(x1,y2),(x1,y1)],fill=(255,255,0),width=4)
+
+                # Save as a new image with _out appended to the file name
+                split = path.splitext(fileName)
+                im.save(split[0]+"_out"+(".png" if rawFrame is not None else split[1]))
+
+        else:
+            print("Failed to decode MWResults")
     else:
-        print("Failed to decode MWResults")
-else:
-    print("No barcodes found: decoder returned " + str(resultLen))
+        print("No barcodes found: decoder returned " + str(resultLen))
     
     
-totalMS = (endTime - starTime) * 1000
-print("Total decoder time %.2f" % totalMS + " ms")
+    totalMS = (endTime - starTime) * 1000
+    print("Total decoder time %.2f" % totalMS + " ms")
+
+
+if __name__ == '__main__':
+    main()
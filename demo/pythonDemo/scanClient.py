@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+#
+# File      scanClient.py
+# Brief     Command line client of the scan server (ScanServer.py)
+#
+# Details   Running pythonDemo.py for every image loads the barcode scanner library, registers the SDK and
+#           configures the decoder each time, which takes far longer than decoding a typical image. With a scan
+#           server running, this client sends the images to its warm decoders instead and prints the results;
+#           it does not load the library itself (it does not import BarcodeScanner.py).
+#
+#           usage: scanClient [-Uaddress] [-J] [-Z] [file ...]
+#
+#               -Uaddress     Address of the server: a Unix domain socket, or the [host:]port of its localhost
+#                             HTTP port (default: scanServer.sock in the temp directory)
+#               -J            Print the results as JSON
+#               -Z            Load the images here and pass them to the server in shared memory (requires
+#                             Pillow), instead of having the server load the files
+#               file          Images to scan (without any, the server status is printed)
+#
+#           The option letters mean the same as in the other demos (see ScanServer.py).
+#
+#           ScanClient can also be used from Python:
+#
+#               client = ScanClient()
+#               reply = client.scanFile("code.jpg")
+#               for result in reply['results']:
+#                   print(result['typeName'], result['text'])
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+import os
+import sys
+import json
+import time
+import socket
+import tempfile
+import http.client
+from urllib.parse import urlencode
+
+# Default server addresses
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "scanServer.sock")
+DEFAULT_PORT = 8470
+
+# Parse a server address, a Unix domain socket or [host:]port, into (socketPath, host, port)
+def parseAddress(address):
+    host, separator, port = address.rpartition(":")
+    if port.isdigit() and (separator or not os.path.exists(address)):
+        return None, host or None, int(port)
+    return address, None, None
+
+# HTTP connection over a Unix domain socket
+class _UnixConnection(http.client.HTTPConnection):
+
+    def __init__(self, socketPath, timeout = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socketPath = socketPath
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socketPath)
+
+class ScanClient:
+
+    # socketPath - Unix domain socket of the server (the default unless a port is given)
+    # host, port - HTTP address of the server
+    # timeout    - socket timeout (seconds)
+    def __init__(self, socketPath = None, host = None, port = None, timeout = None):
+        if port is not None or not hasattr(socket, 'AF_UNIX'):
+            self.connection = http.client.HTTPConnection(host or "127.0.0.1", port or DEFAULT_PORT, timeout=timeout)
+        else:
+            self.connection = _UnixConnection(socketPath or DEFAULT_SOCKET, timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self.connection.close()
+
+    # Send a request on the (kept alive) connection and return the decoded JSON reply. Errors reported by
+    # the server raise OSError.
+    def _request(self, method, path, body = None, contentType = "application/json"):
+        headers = {"Content-Type": contentType} if body is not None else {}
+        for attempt in range(2):
+            try:
+                self.connection.request(method, path, body, headers)
+                response = self.connection.getresponse()
+                reply = json.loads(response.read())
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed the idle connection: reconnect once
+                self.connection.close()
+                if attempt:
+                    raise
+
+        if response.status != 200:
+            raise OSError("scan server: " + str(reply.get('error', response.reason)))
+        return reply
+
+    # Server status (SDK version, workers, request statistics)
+    def status(self):
+        return self._request("GET", "/status")
+
+    # Scan an image file, loaded by the server
+    def scanFile(self, fileName):
+        return self._request("POST", "/scan", json.dumps({'path': os.path.abspath(fileName)}))
+
+    # Scan grayscale pixels (width * height bytes), sent in the request
+    def scanPixels(self, pixels, width, height):
+        return self._request("POST", "/scan?" + urlencode({'width': width, 'height': height}), bytes(pixels),
+                             "application/octet-stream")
+
+    # Scan grayscale pixels in a shared memory block (multiprocessing.shared_memory), at offset
+    def scanShared(self, name, width, height, offset = 0):
+        return self._request("POST", "/scan", json.dumps({'shm': name, 'width': width, 'height': height,
+                                                          'offset': offset}))
+
+    # Load an image file here and pass it to the server in shared memory
+    def scanFileShared(self, fileName):
+        from multiprocessing import shared_memory
+        import ImageLoader
+
+        pixels, width, height = ImageLoader.loadGrayscale(fileName)
+        sharedMemory = shared_memory.SharedMemory(create=True, size=max(1, width * height))
+        try:
+            sharedMemory.buf[0:width * height] = pixels
+            return self.scanShared(sharedMemory.name, width, height)
+        finally:
+            sharedMemory.close()
+            sharedMemory.unlink()
+
+def main():
+    socketPath = None
+    host = None
+    port = None
+    printJson = False
+    useShared = False
+    files = []
+
+    for arg in sys.argv[1:]:
+        if arg[0:2].upper() == "-U":
+            socketPath, host, port = parseAddress(arg[2:])
+        elif arg[0:2].upper() == "-J":
+            printJson = True
+        elif arg[0:2].upper() == "-Z":
+            useShared = True
+        else:
+            files.append(arg)
+
+    with ScanClient(socketPath, host, port) as client:
+        if not files:
+            print(json.dumps(client.status(), indent=2))
+
+        for fileName in files:
+            starTime = time.perf_counter()
+            try:
+                reply = client.scanFileShared(fileName) if useShared else client.scanFile(fileName)
+            except OSError as e:
+                print(fileName + ": " + str(e))
+                continue
+            roundTrip = (time.perf_counter() - starTime) * 1000
+
+            if printJson:
+                print(json.dumps(dict(reply, image=fileName)))
+                continue
+
+            print(fileName + ": " + str(reply['count']) + " barcode(s), decoder returned " + str(reply['resultLen']) +
+                  " (%.2f ms scan, %.2f ms round trip)" % (reply['scanTime'], roundTrip))
+            for i, result in enumerate(reply['results']):
+                print("  " + str(i+1) + ": (" + str(result['typeName']) + ") " + str(result['text']))
+
+if __name__ == '__main__':
+    main()
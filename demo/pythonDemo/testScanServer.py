@@ -0,0 +1,93 @@
+#
+# File      testScanServer.py
+#
+# Brief     Round trip tests of the scan server (ScanServer.py) and its client (scanClient.py)
+#
+# Details   The server listens on a Unix domain socket in a temporary directory, so the tests run entirely
+#           locally. Like the demos, run them from the directory the library path is relative to (the
+#           repository root):
+#
+#               python3 -m unittest discover -s demo/pythonDemo -p 'test*.py'
+#
+# Notice    Copyright (C) Cognex Corporation
+#
+
+import os
+import socket
+import tempfile
+import unittest
+
+from ScanServer import ScanServer
+from scanClient import ScanClient
+import ImageLoader
+
+_IMAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "download.jpeg")
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "needs Unix domain sockets")
+class ScanServerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.socketPath = os.path.join(cls.directory.name, "scanServer.sock")
+        cls.server = ScanServer(workers=1, mode='thread', socketPath=cls.socketPath).start()
+        cls.client = ScanClient(cls.socketPath, timeout=30)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.close()
+        cls.server.close()
+        cls.directory.cleanup()
+
+    def assertDecoded(self, reply):
+        self.assertGreater(reply['resultLen'], 0)
+        self.assertEqual(reply['count'], 1)
+        self.assertEqual(reply['results'][0]['typeName'], "Datamatrix")
+
+    def testScanFile(self):
+        self.assertDecoded(self.client.scanFile(_IMAGE))
+
+    def testScanPixels(self):
+        pixels, width, height = ImageLoader.loadGrayscale(_IMAGE)
+        self.assertDecoded(self.client.scanPixels(pixels, width, height))
+
+    def testScanShared(self):
+        self.assertDecoded(self.client.scanFileShared(_IMAGE))
+
+    def testErrors(self):
+        with self.assertRaises(OSError):
+            self.client.scanFile(os.path.join(self.directory.name, "missing.jpeg"))
+        with self.assertRaises(OSError):
+            self.client.scanPixels(b'\0' * 10, 100, 100)
+
+    def testStatus(self):
+        self.client.scanFile(_IMAGE)
+        status = self.client.status()
+        self.assertEqual(status['mode'], 'thread')
+        self.assertGreaterEqual(status['requests'], 1)
+
+    def testSocketInUse(self):
+        with self.assertRaises(FileExistsError):
+            ScanServer(workers=1, mode='thread', socketPath=self.socketPath)
+        self.assertEqual(self.client.status()['mode'], 'thread')
+
+    def testSocketPathNotSocket(self):
+        fileName = os.path.join(self.directory.name, "notASocket")
+        with open(fileName, "w") as f:
+            f.write("keep")
+        with self.assertRaises(FileExistsError):
+            ScanServer(workers=1, mode='thread', socketPath=fileName)
+        with open(fileName) as f:
+            self.assertEqual(f.read(), "keep")
+
+    def testStaleSocket(self):
+        socketPath = os.path.join(self.directory.name, "stale.sock")
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(socketPath)
+        stale.close()
+        with ScanServer(workers=1, mode='thread', socketPath=socketPath).start():
+            with ScanClient(socketPath, timeout=30) as client:
+                self.assertDecoded(client.scanFile(_IMAGE))
+
+if __name__ == '__main__':
+    unittest.main()